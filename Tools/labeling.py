@@ -0,0 +1,141 @@
+from typing import Tuple, List
+
+import numpy as np
+
+
+def findRuns(i_mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Find the runs of True values along y, for each x, as (xs, starts, ends) sorted by x then start."""
+    width, height = i_mask.shape
+    padded = np.zeros([width, height + 2], dtype=np.int8)
+    padded[:, 1:-1] = i_mask
+    edges = np.diff(padded, axis=1)
+    xs, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+    return xs, starts, ends
+
+
+def findRunPairs(i_xs: np.ndarray, i_starts: np.ndarray, i_ends: np.ndarray, i_height: int,
+                 i_connectivity: int = 4) -> Tuple[np.ndarray, np.ndarray]:
+    """Find the pairs of connected runs of findRuns(), between each line x and the line x + 1, as (runs, neighbors)."""
+    if i_connectivity not in [4, 8]:
+        raise ValueError(f"Invalid connectivity {i_connectivity}")
+    # Diagonal neighbors connect runs that touch by a corner
+    reach = 1 if i_connectivity == 8 else 0
+    # Runs are sorted by x then start, and by x then end: search both lines at once with keys x * (height + 2) + y
+    stride = i_height + 2
+    startKeys = i_xs * stride + i_starts
+    endKeys = i_xs * stride + i_ends
+    nextLine = (i_xs + 1) * stride
+    # Runs of the next line that overlap [start - reach, end + reach)
+    lows = np.searchsorted(endKeys, nextLine + i_starts - reach, side="right")
+    highs = np.searchsorted(startKeys, nextLine + i_ends + reach, side="left")
+    counts = np.maximum(highs - lows, 0)
+    runs = np.repeat(np.arange(i_xs.size), counts)
+    offsets = np.arange(runs.size) - np.repeat(np.cumsum(counts) - counts, counts)
+    return runs, np.repeat(lows, counts) + offsets
+
+
+def joinRuns(i_count: int, i_runs: np.ndarray, i_neighbors: np.ndarray) -> np.ndarray:
+    """Get the root of each of count runs, joined by pairs of connected runs: the smallest run of its region.
+
+    Vectorized union-find: each pass links the root of each pair of connected runs to the smaller one,
+    then compresses the paths.
+    """
+    runs, neighbors = i_runs, i_neighbors
+    parents = np.arange(i_count)
+    while True:
+        runRoots, neighborRoots = parents[runs], parents[neighbors]
+        # Pairs in the same region stay so, the next passes only look at the others
+        apart = runRoots != neighborRoots
+        if not np.any(apart):
+            break
+        runs, neighbors = runs[apart], neighbors[apart]
+        runRoots, neighborRoots = runRoots[apart], neighborRoots[apart]
+        # Roots only point to smaller runs, so there are no cycles. When a root has several links, any one will do.
+        parents[np.maximum(runRoots, neighborRoots)] = np.minimum(runRoots, neighborRoots)
+        while True:
+            grandParents = parents[parents]
+            if np.array_equal(grandParents, parents):
+                break
+            parents = grandParents
+    return parents
+
+
+def labelRegions(i_mask: np.ndarray, i_connectivity: int = 4) -> Tuple[np.ndarray, int]:
+    """Label the connected regions of True cells, from 1, with 0 for the False cells. Returns (labels, count).
+
+    The mask is split into runs along y, and the connected runs are joined with joinRuns().
+    """
+    width, height = i_mask.shape
+    xs, starts, ends = findRuns(i_mask)
+    runs, neighbors = findRunPairs(xs, starts, ends, height, i_connectivity)
+    parents = joinRuns(xs.size, runs, neighbors)
+
+    # Number the regions from 1, in the order of their first run. The runs are in the order of the cells of the mask.
+    roots = parents == np.arange(xs.size)
+    runLabels = np.cumsum(roots, dtype=np.int32)[parents]
+    labels = np.zeros([width, height], dtype=np.int32)
+    labels[i_mask] = np.repeat(runLabels, ends - starts)
+    return labels, int(np.count_nonzero(roots))
+
+
+def fillRegion(i_mask: np.ndarray, i_seed: Tuple[int, int]) -> np.ndarray:
+    """Get the 4-connected region of True cells that contains the seed, as a boolean mask.
+
+    The mask is split into runs of True cells along y, and the region is the runs joined to the run
+    of the seed by joinRuns(), so the cost depends on the number of runs rather than on the number of cells.
+    """
+    width, height = i_mask.shape
+    seedX, seedY = i_seed
+    if not (0 <= seedX < width and 0 <= seedY < height) or not i_mask[seedX, seedY]:
+        return np.zeros(i_mask.shape, dtype=bool)
+
+    xs, starts, ends = findRuns(i_mask)
+    runs, neighbors = findRunPairs(xs, starts, ends, height)
+    parents = joinRuns(xs.size, runs, neighbors)
+    # The run of the seed is the first one that ends after it, runs being sorted by x then y
+    seedRun = int(np.searchsorted(xs * (height + 2) + ends, seedX * (height + 2) + seedY, side="right"))
+    region = np.zeros(i_mask.shape, dtype=bool)
+    region[i_mask] = np.repeat(parents == parents[seedRun], ends - starts)
+    return region
+
+
+def findBoxes(i_mask: np.ndarray, i_density: float = 0.25) -> List[Tuple[int, int, int, int]]:
+    """Cover the True cells of a mask with disjoint (minX, maxX, minY, maxY) boxes.
+
+    Each 8-connected region gets its bounding box, or a box per run of its cells along y when it fills
+    less than a density of its bounding box. Boxes that overlap are merged.
+    """
+    labels, count = labelRegions(i_mask, 8)
+    xs, ys = np.nonzero(labels)
+    order = np.argsort(labels[xs, ys], kind="stable")
+    bounds = np.cumsum(np.bincount(labels[xs, ys], minlength=count + 1)[1:])[:-1]
+    boxes = []
+    for group in np.split(order, bounds):
+        regionXs, regionYs = xs[group], ys[group]
+        minX, maxX = int(regionXs.min()), int(regionXs.max()) + 1
+        minY, maxY = int(regionYs.min()), int(regionYs.max()) + 1
+        if group.size >= i_density * (maxX - minX) * (maxY - minY):
+            boxes.append((minX, maxX, minY, maxY))
+            continue
+        region = np.zeros([maxX - minX, maxY - minY], dtype=bool)
+        region[regionXs - minX, regionYs - minY] = True
+        runXs, starts, ends = findRuns(region)
+        boxes.extend((minX + x, minX + x + 1, minY + start, minY + end)
+                     for x, start, end in zip(runXs.tolist(), starts.tolist(), ends.tolist()))
+
+    # Bounding boxes of regions may overlap: each box takes in the earlier boxes under it
+    owners = np.full(i_mask.shape, -1, dtype=np.intp)
+    merged = []
+    for box in boxes:
+        while True:
+            under = owners[box[0]:box[1], box[2]:box[3]]
+            others = [i for i in np.unique(under[under >= 0]).tolist() if merged[i] is not None]
+            if not others:
+                break
+            for i in others:
+                other, merged[i] = merged[i], None
+                box = (min(box[0], other[0]), max(box[1], other[1]), min(box[2], other[2]), max(box[3], other[3]))
+        owners[box[0]:box[1], box[2]:box[3]] = len(merged)
+        merged.append(box)
+    return [box for box in merged if box is not None]
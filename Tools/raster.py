@@ -0,0 +1,79 @@
+from typing import Tuple
+
+import numpy as np
+
+
+def rasterSquare(i_size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Get the cells of a size x size square centered on (0, 0), as (xs, ys)."""
+    offsets = np.arange(i_size) - (i_size - 1) // 2
+    xs, ys = np.meshgrid(offsets, offsets, indexing="ij")
+    return xs.ravel(), ys.ravel()
+
+
+def rasterCircle(i_radius: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Get the cells of a disc of a radius centered on (0, 0), as (xs, ys). A radius of 0 is one cell."""
+    xs, ys = rasterSquare(2 * i_radius + 1)
+    # The half cell makes round discs, without single cells sticking out at the ends of the axes
+    inside = xs * xs + ys * ys <= i_radius * (i_radius + 1)
+    return xs[inside], ys[inside]
+
+
+def rasterLine(i_start: Tuple[int, int], i_end: Tuple[int, int]) -> Tuple[np.ndarray, np.ndarray]:
+    """Get the cells of a segment from start to end (both included), as Bresenham's algorithm: one cell
+    per step along the major axis, each cell touching the previous one. Computed for all the steps at once."""
+    dx, dy = i_end[0] - i_start[0], i_end[1] - i_start[1]
+    steps = max(abs(dx), abs(dy))
+    if steps == 0:
+        return np.array([i_start[0]]), np.array([i_start[1]])
+    t = np.arange(steps + 1)
+    # Rounding halves away from the start keeps the line symmetric
+    xs = i_start[0] + np.sign(dx) * ((2 * abs(dx) * t + steps) // (2 * steps))
+    ys = i_start[1] + np.sign(dy) * ((2 * abs(dy) * t + steps) // (2 * steps))
+    return xs, ys
+
+
+def rasterRectangle(i_corner1: Tuple[int, int], i_corner2: Tuple[int, int],
+                    i_filled: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+    """Get the cells of a rectangle between two opposite corners (both included), filled or as an outline."""
+    minX, maxX = sorted([i_corner1[0], i_corner2[0]])
+    minY, maxY = sorted([i_corner1[1], i_corner2[1]])
+    mask = np.ones([maxX - minX + 1, maxY - minY + 1], dtype=bool)
+    if not i_filled:
+        mask[1:-1, 1:-1] = False
+    xs, ys = np.nonzero(mask)
+    return xs + minX, ys + minY
+
+
+def dilate(i_xs: np.ndarray, i_ys: np.ndarray, i_offsetXs: np.ndarray, i_offsetYs: np.ndarray,
+           i_size: Tuple[int, int]) -> Tuple[int, int, np.ndarray]:
+    """Stamp a shape, given as offsets, on cells. Returns the covered cells inside an area of a size,
+    as a boolean mask at (minX, minY)."""
+    width, height = i_size
+    # Cover a bounding box, clipped to the area
+    minX = max(int(i_xs.min()) + int(i_offsetXs.min()), 0)
+    maxX = min(int(i_xs.max()) + int(i_offsetXs.max()) + 1, width)
+    minY = max(int(i_ys.min()) + int(i_offsetYs.min()), 0)
+    maxY = min(int(i_ys.max()) + int(i_offsetYs.max()) + 1, height)
+    if minX >= maxX or minY >= maxY:
+        return 0, 0, np.zeros([0, 0], dtype=bool)
+    mask = np.zeros([maxX - minX, maxY - minY], dtype=bool)
+    if i_xs.size <= i_offsetXs.size:
+        # Few cells and a large shape: paste the shape on each cell
+        shapeMinX, shapeMinY = int(i_offsetXs.min()), int(i_offsetYs.min())
+        shape = np.zeros([int(i_offsetXs.max()) - shapeMinX + 1, int(i_offsetYs.max()) - shapeMinY + 1], dtype=bool)
+        shape[i_offsetXs - shapeMinX, i_offsetYs - shapeMinY] = True
+        shapeWidth, shapeHeight = shape.shape
+        for x, y in zip(i_xs.tolist(), i_ys.tolist()):
+            x0, y0 = x + shapeMinX - minX, y + shapeMinY - minY
+            cropX0, cropY0 = max(-x0, 0), max(-y0, 0)
+            cropX1 = min(shapeWidth, maxX - minX - x0)
+            cropY1 = min(shapeHeight, maxY - minY - y0)
+            if cropX0 < cropX1 and cropY0 < cropY1:
+                mask[x0 + cropX0:x0 + cropX1, y0 + cropY0:y0 + cropY1] |= shape[cropX0:cropX1, cropY0:cropY1]
+    else:
+        # Many cells and a small shape: shift the cells by each offset
+        for offsetX, offsetY in zip(i_offsetXs.tolist(), i_offsetYs.tolist()):
+            xs, ys = i_xs + offsetX - minX, i_ys + offsetY - minY
+            inside = (xs >= 0) & (xs < maxX - minX) & (ys >= 0) & (ys < maxY - minY)
+            mask[xs[inside], ys[inside]] = True
+    return minX, minY, mask
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+from typing import Tuple, Optional
+
+import numpy as np
+
+from core.constants import CellValue
+from tools.raster import rasterSquare, rasterCircle, rasterLine, rasterRectangle, dilate
+from .commands.SetLayerMaskCommand import SetLayerMaskCommand
+from ..state import Unit
+
+# Brush shapes. Squares and circles are stamped on the cells of a stroke, the other shapes
+# are drawn between the first and the last cell of a stroke.
+SQUARE = "square"
+CIRCLE = "circle"
+LINE = "line"
+RECTANGLE = "rectangle"
+FILLED_RECTANGLE = "filledRectangle"
+BRUSH_SHAPES = [SQUARE, CIRCLE, LINE, RECTANGLE, FILLED_RECTANGLE]
+
+BRUSH_MAX_SIZE = 129
+
+
+class Brush:
+    """Shape and size of the cells set by an edit, as a batch of cells."""
+
+    def __init__(self, i_shape: str = SQUARE, i_size: int = 1):
+        if i_shape not in BRUSH_SHAPES:
+            raise ValueError(f"Invalid brush shape '{i_shape}'")
+        if not 1 <= i_size <= BRUSH_MAX_SIZE:
+            raise ValueError(f"Invalid brush size {i_size}")
+        self.__shape = i_shape
+        self.__size = i_size
+        # Stamp of the brush, as offsets around the cell
+        if i_shape == CIRCLE:
+            self.__offsets = rasterCircle(i_size // 2)
+        else:
+            self.__offsets = rasterSquare(i_size)
+
+    @property
+    def shape(self) -> str:
+        return self.__shape
+
+    @property
+    def size(self) -> int:
+        return self.__size
+
+    @property
+    def stamped(self) -> bool:
+        """True if the brush is stamped on each cell of a stroke, False if it draws a shape between two cells."""
+        return self.__shape in [SQUARE, CIRCLE]
+
+    def mask(self, i_start: Tuple[int, int], i_end: Tuple[int, int],
+             i_worldSize: Tuple[int, int]) -> Tuple[int, int, np.ndarray]:
+        """Get the cells covered by the brush from start to end, inside a world, as a boolean mask at (minX, minY)."""
+        offsetXs, offsetYs = self.__offsets
+        if self.__shape == FILLED_RECTANGLE:
+            # Grow the rectangle by the brush, rather than stamping the brush on each of its cells
+            xs, ys = np.array([i_start[0], i_end[0]]), np.array([i_start[1], i_end[1]])
+            minX, maxX = max(int(xs.min() + offsetXs.min()), 0), min(int(xs.max() + offsetXs.max()) + 1, i_worldSize[0])
+            minY, maxY = max(int(ys.min() + offsetYs.min()), 0), min(int(ys.max() + offsetYs.max()) + 1, i_worldSize[1])
+            return minX, minY, np.ones([max(maxX - minX, 0), max(maxY - minY, 0)], dtype=bool)
+        if self.__shape == RECTANGLE:
+            xs, ys = rasterRectangle(i_start, i_end, False)
+        else:
+            xs, ys = rasterLine(i_start, i_end)
+        return dilate(xs, ys, offsetXs, offsetYs, i_worldSize)
+
+    def command(self, i_layerName: str, i_start: Tuple[int, int], i_end: Tuple[int, int], i_worldSize: Tuple[int, int],
+                i_value: CellValue, i_unit: Optional[Unit] = None) -> SetLayerMaskCommand:
+        """Get a command that sets a value in the cells covered by the brush from start to end, as one batch."""
+        minX, minY, mask = self.mask(i_start, i_end, i_worldSize)
+        return SetLayerMaskCommand(i_layerName, minX, minY, mask, i_value, i_unit)
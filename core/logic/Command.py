@@ -1,25 +1,24 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 from abc import ABC, abstractmethod
 
 if TYPE_CHECKING:
     from .Logic import Logic
 
-# Set to ensure that the priority values don't intersect with others
+# Priority of the commands that edit the world
 WORLD_PRIORITY = 100
 
-# The maximum size of the world
-WORLD_MAX_WIDTH = 4096
-WORLD_MAX_HEIGHT = 4096
-
 
 class Command(ABC):
+    # Transaction of the command, set by Logic: the changes of the commands of a transaction are undone together
+    transaction = None  # type: Optional[int]
 
     @abstractmethod
     def priority(self) -> int:
         """
-        Returns the level of priority. Commands with a low priority value should run first.
+        Returns the level of priority. Commands with a low priority value should run first,
+        commands with the same priority run in the order they were added.
         """
         raise NotImplementedError()
 
@@ -31,8 +30,10 @@ class Command(ABC):
         raise NotImplementedError()
 
     @abstractmethod
-    def execute(self, logic: Logic):
+    def execute(self, logic: Logic) -> Optional[Command]:
         """
         The actual processing. We assume that check() returned True and do the changes with no checks.
+        Long processing can be split: the command then returns a command for the rest of the work,
+        which is checked and executed next, possibly in the next frame. Otherwise it returns None.
         """
         raise NotImplementedError()
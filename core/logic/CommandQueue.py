@@ -0,0 +1,59 @@
+import heapq
+from collections import deque
+from typing import Dict, List, Deque, Iterable, Iterator, Optional
+
+from .Command import Command
+
+
+class CommandQueue:
+    """Queue of commands, ordered by priority then by submission order.
+
+    Commands are kept in one bucket per priority, and a heap of the priorities in use gives
+    the next bucket. There are few distinct priorities, so the cost of a command is a deque
+    append, and commands with the same priority (like several edits of the same cell) all run.
+    """
+
+    def __init__(self):
+        self.__buckets = {}  # type: Dict[int, Deque[Command]]
+        self.__priorities = []  # type: List[int]
+        self.__count = 0
+
+    def __len__(self) -> int:
+        return self.__count
+
+    def push(self, i_command: Command):
+        priority = i_command.priority()
+        bucket = self.__buckets.get(priority)
+        if bucket is None:
+            bucket = deque()
+            self.__buckets[priority] = bucket
+            heapq.heappush(self.__priorities, priority)
+        bucket.append(i_command)
+        self.__count += 1
+
+    def extend(self, i_commands: Iterable[Command]):
+        for command in i_commands:
+            self.push(command)
+
+    def pop(self) -> Optional[Command]:
+        """Remove and return the next command, or None if the queue is empty."""
+        if not self.__priorities:
+            return None
+        priority = self.__priorities[0]
+        bucket = self.__buckets[priority]
+        command = bucket.popleft()
+        if not bucket:
+            heapq.heappop(self.__priorities)
+            del self.__buckets[priority]
+        self.__count -= 1
+        return command
+
+    def drain(self) -> Iterator[Command]:
+        """Remove and yield all commands in execution order.
+
+        Commands pushed while draining are yielded too, in priority order with the remaining ones.
+        """
+        command = self.pop()
+        while command is not None:
+            yield command
+            command = self.pop()
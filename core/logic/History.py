@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+from typing import List, Tuple, Optional
+
+import numpy as np
+
+from ..Listenable import Listenable
+from .IHistoryListener import IHistoryListener
+from .Transaction import Transaction
+from ..state import World, Layer, Unit, ILayerIndex
+
+# Default memory cap of the history
+HISTORY_MAX_BYTES = 128 * 1024 * 1024
+
+
+class History(ILayerIndex, Listenable[IHistoryListener]):
+    """Undo and redo history of a world, recorded from the writes to its layers.
+
+    Writes are recorded in the open transaction, which is committed when another one is opened
+    (see setTransaction()), by commit(), or by dispose(). The transactions of the history use at most maxBytes: the oldest
+    ones are dropped first, and a transaction larger than the cap can't be undone.
+    """
+
+    def __init__(self, i_world: World, i_maxBytes: int = HISTORY_MAX_BYTES):
+        Listenable.__init__(self)
+        self.__world = i_world
+        self.__maxBytes = i_maxBytes
+        self.__layerNames = {id(layer): name for name, layer in zip(i_world.layerNames, i_world.layers)}
+        self.__undoStack: List[Transaction] = []
+        self.__redoStack: List[Transaction] = []
+        self.__current: Optional[Transaction] = None
+        # Writes made while undoing or redoing are not recorded
+        self.__applying = False
+        for layer in i_world.layers:
+            layer.registerIndex(self)
+
+    def dispose(self):
+        self.commit()
+        for layer in self.__world.layers:
+            layer.removeIndex(self)
+
+    @property
+    def world(self) -> World:
+        return self.__world
+
+    @property
+    def maxBytes(self) -> int:
+        return self.__maxBytes
+
+    @maxBytes.setter
+    def maxBytes(self, i_maxBytes: int):
+        self.__maxBytes = i_maxBytes
+        self.__evict()
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the committed transactions."""
+        return sum(transaction.nbytes for transaction in self.__undoStack + self.__redoStack)
+
+    @property
+    def canUndo(self) -> bool:
+        return len(self.__undoStack) > 0 or (self.__current is not None and not self.__current.empty)
+
+    @property
+    def canRedo(self) -> bool:
+        return len(self.__redoStack) > 0 and (self.__current is None or self.__current.empty)
+
+    # Transactions
+    def setTransaction(self, i_id: Optional[int]):
+        """Record the next writes in a transaction. The open transaction is committed if it has another id."""
+        if self.__current is not None and self.__current.id == i_id:
+            return
+        self.commit()
+        self.__current = Transaction(i_id, self.__world)
+
+    def commit(self):
+        """Close the open transaction, and add it to the history if it changed something."""
+        transaction, self.__current = self.__current, None
+        if transaction is None:
+            return
+        transaction.close()
+        if transaction.empty:
+            return
+        self.__undoStack.append(transaction)
+        self.__redoStack.clear()
+        self.__evict()
+        self.__notifyApplied(transaction, False)
+
+    def __evict(self):
+        size = self.nbytes
+        while self.__undoStack and size > self.__maxBytes:
+            size -= self.__undoStack.pop(0).nbytes
+
+    def undo(self) -> bool:
+        """Undo the last transaction. Returns False if there is nothing to undo."""
+        self.commit()
+        if not self.__undoStack:
+            return False
+        transaction = self.__undoStack.pop()
+        self.__applying = True
+        try:
+            transaction.undo(self.__world)
+        finally:
+            self.__applying = False
+        self.__redoStack.append(transaction)
+        self.__notifyApplied(transaction, True)
+        return True
+
+    def redo(self) -> bool:
+        """Redo the last undone transaction. Returns False if there is nothing to redo."""
+        self.commit()
+        if not self.__redoStack:
+            return False
+        transaction = self.__redoStack.pop()
+        self.__applying = True
+        try:
+            transaction.redo(self.__world)
+        finally:
+            self.__applying = False
+        self.__undoStack.append(transaction)
+        self.__notifyApplied(transaction, False)
+        return True
+
+    def __notifyApplied(self, i_transaction: Transaction, i_undo: bool):
+        for listener in self.listeners:
+            listener.transactionApplied(i_transaction, i_undo)
+
+    # Layer index
+    def cellsWritten(self, i_layer: Layer, i_xs: np.ndarray, i_ys: np.ndarray,
+                     i_oldValues: np.ndarray, i_newValues: np.ndarray):
+        if self.__applying:
+            return
+        if self.__current is None:
+            self.__current = Transaction(None, self.__world)
+        self.__current.recordCells(self.__layerNames[id(i_layer)], i_xs, i_ys, i_oldValues, i_newValues)
+
+    def unitChanged(self, i_layer: Layer, i_coords: Tuple[int, int],
+                    i_oldUnit: Optional[Unit], i_newUnit: Optional[Unit]):
+        if self.__applying:
+            return
+        if self.__current is None:
+            self.__current = Transaction(None, self.__world)
+        self.__current.recordUnit(i_coords, i_oldUnit, i_newUnit)
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import bisect
+import logging
+import os
+import queue
+import threading
+import time
+from typing import List, Dict, Optional
+
+import numpy as np
+
+from .History import History
+from .IHistoryListener import IHistoryListener
+from .Transaction import Transaction
+from ..state import World, saveWorld, loadWorld
+
+# Files of a log directory
+KEYFRAME_FILE = "keyframe-{:08d}.npz"
+REVISION_FILE = "revision-{:08d}.npz"
+INDEX_FILE = "revisions.txt"
+
+
+class HistoryLog(IHistoryListener):
+    """Persistent log of the revisions of a world, to browse its whole edit history.
+
+    Each transaction applied by the history (committed, undone or redone) makes a new revision,
+    saved as a compressed delta by a background worker. Every keyframeInterval revisions, the whole
+    world is saved too, from a snapshot. The worker saves them in order, and adds each revision to the
+    index file once saved. Loading a revision replays at most keyframeInterval
+    deltas over the nearest keyframe. Revision 0 is the world when the log directory was created;
+    an existing log continues from its last revision, which must match the world of the history.
+    """
+
+    def __init__(self, i_history: History, i_directory: str, i_keyframeInterval: int = 64):
+        if i_keyframeInterval < 1:
+            raise ValueError(f"Invalid keyframe interval {i_keyframeInterval}")
+        self.__history = i_history
+        self.__directory = i_directory
+        self.__keyframeInterval = i_keyframeInterval
+        # Jobs of the worker, as (revision, time, arrays) for a revision or (revision, None, world) for a keyframe,
+        # and None to stop it
+        self.__jobs: queue.Queue = queue.Queue()
+        self.__worker = threading.Thread(target=self.__work, daemon=True)
+        self.__worker.start()
+        os.makedirs(i_directory, exist_ok=True)
+
+        # Time of each revision, and revisions with a keyframe
+        self.__times: List[float] = []
+        indexPath = os.path.join(i_directory, INDEX_FILE)
+        if os.path.exists(indexPath):
+            with open(indexPath) as file:
+                self.__times = [float(line.split()[1]) for line in file if line.strip()]
+        self.__keyframes = sorted(
+            int(name[len("keyframe-"):-len(".npz")]) for name in os.listdir(i_directory)
+            if name.startswith("keyframe-") and name.endswith(".npz") and ".tmp" not in name
+        )
+        if not self.__times:
+            self.__times.append(time.time())
+            self.__writeIndex(0, self.__times[0])
+            self.__startKeyframe(0)
+
+        i_history.registerListener(self)
+
+    def dispose(self):
+        self.__history.removeListener(self)
+        self.flush()
+        self.__jobs.put(None)
+        self.__worker.join()
+
+    def flush(self):
+        """Wait for the revisions and keyframes being written."""
+        self.__jobs.join()
+
+    @property
+    def revision(self) -> int:
+        """Last revision."""
+        return len(self.__times) - 1
+
+    def getTime(self, i_revision: int) -> float:
+        """Time of a revision, in seconds since the epoch."""
+        return self.__times[i_revision]
+
+    def revisionAt(self, i_time: float) -> int:
+        """Get the revision of the world at a time, in seconds since the epoch."""
+        revision = bisect.bisect_right(self.__times, i_time) - 1
+        if revision < 0:
+            raise ValueError(f"No revision before {time.ctime(i_time)}")
+        return revision
+
+    def load(self, i_revision: int) -> World:
+        """Get a new world with the cells and units of a revision."""
+        if not 0 <= i_revision <= self.revision:
+            raise ValueError(f"Invalid revision {i_revision}, the last one is {self.revision}")
+        self.flush()
+        keyframe = self.__keyframes[bisect.bisect_right(self.__keyframes, i_revision) - 1]
+        world = loadWorld(os.path.join(self.__directory, KEYFRAME_FILE.format(keyframe)))
+        for revision in range(keyframe + 1, i_revision + 1):
+            with np.load(os.path.join(self.__directory, REVISION_FILE.format(revision))) as arrays:
+                transaction = Transaction.fromArrays(world, arrays)
+                if bool(arrays["undo"]):
+                    transaction.undo(world)
+                else:
+                    transaction.redo(world)
+        return world
+
+    def __writeIndex(self, i_revision: int, i_time: float):
+        with open(os.path.join(self.__directory, INDEX_FILE), "a") as file:
+            file.write(f"{i_revision} {i_time!r}\n")
+
+    def __work(self):
+        while True:
+            job = self.__jobs.get()
+            try:
+                if job is None:
+                    return
+                self.__saveJob(*job)
+            except Exception:
+                logging.exception("In HistoryLog: a revision could not be saved")
+            finally:
+                self.__jobs.task_done()
+
+    def __saveJob(self, i_revision: int, i_time: Optional[float], i_data):
+        if i_time is None:
+            saveWorld(i_data, os.path.join(self.__directory, KEYFRAME_FILE.format(i_revision)))
+        else:
+            np.savez_compressed(os.path.join(self.__directory, REVISION_FILE.format(i_revision)), **i_data)
+            self.__writeIndex(i_revision, i_time)
+
+    def __startKeyframe(self, i_revision: int):
+        # The snapshot is unaffected by the next edits, and can be saved by the worker
+        self.__jobs.put((i_revision, None, self.__history.world.snapshot()))
+        self.__keyframes.append(i_revision)
+
+    # History listener
+    def transactionApplied(self, i_transaction: Transaction, i_undo: bool):
+        # The arrays of a closed transaction don't change, and can be compressed by the worker
+        revision = self.revision + 1
+        self.__times.append(time.time())
+        arrays: Dict[str, np.ndarray] = dict(i_transaction.toArrays(), undo=np.array(i_undo))
+        self.__jobs.put((revision, self.__times[revision], arrays))
+        if revision % self.__keyframeInterval == 0:
+            self.__startKeyframe(revision)
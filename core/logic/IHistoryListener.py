@@ -0,0 +1,14 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .Transaction import Transaction
+
+
+class IHistoryListener:
+    """Interface for objects that want to receive the transactions applied to a world by a history."""
+
+    def transactionApplied(self, i_transaction: Transaction, i_undo: bool):
+        """Called after a transaction was committed or redone, or undone if undo is True."""
+        pass
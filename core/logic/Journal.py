@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import os
+import struct
+import zlib
+from typing import Dict, List, Tuple, Optional
+
+import numpy as np
+
+from core.constants import CellValue
+from ..state import World, Layer, Unit, UnitStore, ILayerIndex
+from ..state.UnitStore import PROPERTY_COUNT
+
+# File header: magic, world width and height
+FILE_HEADER = struct.Struct("<4sQQ")
+FILE_MAGIC = b"MMJ1"
+# Frame header: magic, payload size, payload checksum
+FRAME_HEADER = struct.Struct("<4sII")
+FRAME_MAGIC = b"EDIT"
+# Record header: kind, layer index, number of cells, number of values (cells) or new units (units)
+RECORD_HEADER = struct.Struct("<BBII")
+CELLS_RECORD = 1
+UNITS_RECORD = 2
+# Columns of the new units of a units record
+UNIT_COLUMNS = [
+    ("playerIds", np.int16, 1),
+    ("unitClasses", np.int8, 1),
+    ("properties", np.int32, PROPERTY_COUNT),
+    ("flags", np.bool_, PROPERTY_COUNT),
+]
+
+
+class Journal(ILayerIndex):
+    """Write-ahead journal of the edits of a world, to recover them after a crash.
+
+    Writes to the layers are buffered, and sync() appends them to the journal file as one frame
+    before forcing it to disk; Logic calls it once per executeCommands(). A frame holds the new
+    values of the written cells as packed arrays, and the new units, so replaying it takes a few
+    bulk writes. Frames have a checksum: a frame cut by a crash is dropped.
+
+    Opening a journal replays its frames on the world, which must be the map saved when the
+    journal was last cleared (see clear()).
+    """
+
+    def __init__(self, i_world: World, i_path: str):
+        self.__world = i_world
+        self.__path = i_path
+        self.__layerIndices = {id(layer): index for index, layer in enumerate(i_world.layers)}
+        self.__coordsType = np.dtype(np.uint32 if i_world.width * i_world.height <= 1 << 32 else np.uint64)
+        # Layer index -> written (flat indices, new values) since the last sync
+        self.__cells: Dict[int, List[Tuple[np.ndarray, np.ndarray]]] = {}
+        # New units since the last sync, as (x, y, slot in the unit store), slot -1 for a removed unit
+        self.__unitStore = UnitStore(1)
+        self.__unitChanges: List[Tuple[int, int, int]] = []
+        self.__file = open(i_path, "a+b")
+        self.__recoveredFrames = self.__recover()
+        for layer in i_world.layers:
+            layer.registerIndex(self)
+
+    def dispose(self):
+        self.sync()
+        for layer in self.__world.layers:
+            layer.removeIndex(self)
+        self.__file.close()
+
+    @property
+    def path(self) -> str:
+        return self.__path
+
+    @property
+    def recoveredFrames(self) -> int:
+        """Number of frames replayed when the journal was opened."""
+        return self.__recoveredFrames
+
+    def sync(self):
+        """Append the buffered writes to the journal as one frame, and force it to disk."""
+        if not self.__cells and not self.__unitChanges:
+            return
+        payload = bytearray()
+        for layerIndex, records in self.__cells.items():
+            flat = np.concatenate([record[0] for record in records])
+            values = np.concatenate([record[1] for record in records])
+            # Bulk writes record increasing cells, otherwise keep the last value of each cell
+            if not np.all(flat[1:] > flat[:-1]):
+                flat, lasts = np.unique(flat[::-1], return_index=True)
+                values = values[::-1][lasts]
+            if np.all(values == values[0]):
+                values = values[:1]
+            payload += RECORD_HEADER.pack(CELLS_RECORD, layerIndex, flat.size, values.size)
+            payload += flat.tobytes() + values.tobytes()
+        if self.__unitChanges:
+            changes = np.array(self.__unitChanges, dtype=np.int64)
+            present = changes[:, 2] >= 0
+            rows = self.__unitStore.exportRows(changes[present, 2])
+            payload += RECORD_HEADER.pack(UNITS_RECORD, 0, len(changes), int(np.count_nonzero(present)))
+            payload += changes[:, :2].astype(np.int32).tobytes() + present.tobytes()
+            for key, dtype, _ in UNIT_COLUMNS:
+                payload += rows[key].astype(dtype).tobytes()
+        self.__file.write(FRAME_HEADER.pack(FRAME_MAGIC, len(payload), zlib.crc32(payload)) + payload)
+        self.__file.flush()
+        os.fsync(self.__file.fileno())
+        self.__clearBuffers()
+
+    def clear(self):
+        """Empty the journal, once the world was saved."""
+        self.__clearBuffers()
+        self.__file.truncate(FILE_HEADER.size)
+        self.__file.flush()
+        os.fsync(self.__file.fileno())
+
+    def __clearBuffers(self):
+        self.__cells.clear()
+        self.__unitStore = UnitStore(1)
+        self.__unitChanges.clear()
+
+    # Recovery
+    def __recover(self) -> int:
+        """Replay the frames of the journal file, and drop a frame cut by a crash. Returns the number of frames."""
+        self.__file.seek(0)
+        data = self.__file.read()
+        if len(data) < FILE_HEADER.size:
+            # New journal, or header cut by a crash while it was created
+            self.__file.truncate(0)
+            self.__file.write(FILE_HEADER.pack(FILE_MAGIC, self.__world.width, self.__world.height))
+            self.__file.flush()
+            return 0
+        magic, width, height = FILE_HEADER.unpack_from(data, 0)
+        if magic != FILE_MAGIC:
+            raise ValueError(f"File '{self.__path}' is not a journal")
+        if (width, height) != self.__world.size:
+            raise ValueError(f"Journal of a {width}x{height} world, not {self.__world.width}x{self.__world.height}")
+
+        offset, frames = FILE_HEADER.size, 0
+        while offset + FRAME_HEADER.size <= len(data):
+            magic, size, checksum = FRAME_HEADER.unpack_from(data, offset)
+            start = offset + FRAME_HEADER.size
+            payload = data[start:start + size]
+            if magic != FRAME_MAGIC or len(payload) != size or zlib.crc32(payload) != checksum:
+                break
+            self.__replayFrame(payload)
+            offset = start + size
+            frames += 1
+        if offset < len(data):
+            self.__file.truncate(offset)
+        return frames
+
+    def __replayFrame(self, i_payload: bytes):
+        offset = 0
+        while offset < len(i_payload):
+            kind, layerIndex, count, extra = RECORD_HEADER.unpack_from(i_payload, offset)
+            offset += RECORD_HEADER.size
+            if kind == CELLS_RECORD:
+                flat = np.frombuffer(i_payload, self.__coordsType, count, offset)
+                offset += flat.nbytes
+                values = np.frombuffer(i_payload, np.uint16, extra, offset)
+                offset += values.nbytes
+                xs, ys = np.divmod(flat.astype(np.intp), self.__world.height)
+                layer = self.__world.layers[layerIndex]
+                layer.scatterValues(xs, ys, values if values.size > 1 else values[0])
+            elif kind == UNITS_RECORD:
+                cells = np.frombuffer(i_payload, np.int32, 2 * count, offset).reshape([count, 2])
+                offset += cells.nbytes
+                present = np.frombuffer(i_payload, np.bool_, count, offset)
+                offset += present.nbytes
+                rows = {}
+                for key, dtype, width in UNIT_COLUMNS:
+                    column = np.frombuffer(i_payload, dtype, extra * width, offset)
+                    offset += column.nbytes
+                    rows[key] = column.reshape([extra, width]) if width > 1 else column
+                self.__replayUnits(cells, present, rows)
+            else:
+                raise ValueError(f"Invalid record kind {kind} in journal '{self.__path}'")
+
+    def __replayUnits(self, i_cells: np.ndarray, i_present: np.ndarray, i_rows: Dict[str, np.ndarray]):
+        store = UnitStore(1)
+        slots = iter(store.importRows(i_rows).tolist())
+        units = self.__world.units
+        for (x, y), isPresent in zip(i_cells.tolist(), i_present.tolist()):
+            if isPresent:
+                units.setUnit((x, y), CellValue.UNITS_UNIT, Unit.fromSlot(store, next(slots)))
+            elif units.getUnit((x, y)) is not None:
+                units.setUnit((x, y), CellValue.NONE)
+
+    # Layer index
+    def cellsWritten(self, i_layer: Layer, i_xs: np.ndarray, i_ys: np.ndarray,
+                     i_oldValues: np.ndarray, i_newValues: np.ndarray):
+        flat = (i_xs.astype(np.int64) * self.__world.height + i_ys).astype(self.__coordsType)
+        self.__cells.setdefault(self.__layerIndices[id(i_layer)], []).append((flat, i_newValues.astype(np.uint16)))
+
+    def unitChanged(self, i_layer: Layer, i_coords: Tuple[int, int],
+                    i_oldUnit: Optional[Unit], i_newUnit: Optional[Unit]):
+        slot = -1
+        if i_newUnit is not None:
+            slot = self.__unitStore.copyFrom(i_newUnit.store, i_newUnit.slot, None)
+        self.__unitChanges.append((i_coords[0], i_coords[1], slot))
@@ -1,41 +1,148 @@
+import time
 from abc import ABCMeta
-from typing import Dict
+from typing import Iterable, Optional
 
 from .Command import Command
+from .CommandQueue import CommandQueue
+from .History import History, HISTORY_MAX_BYTES
+from .HistoryLog import HistoryLog
+from .Journal import Journal
 from ..state import World
 
 from .commands.SetGroundValueCommand import SetGroundValueCommand
 from .commands.SetImpassableValueCommand import SetImpassableValueCommand
 from .commands.SetObjectsValueCommand import SetObjectsValueCommand
 from .commands.SetUnitsCellCommand import SetUnitsCellCommand
+from .commands.UndoCommand import UndoCommand
+from .commands.RedoCommand import RedoCommand
 
 
 class Logic:
     """Handles commands and logic for a world."""
 
-    def __init__(self, i_world: World):
-        self.__commands = {}  # type: Dict[int, Command]
+    def __init__(self, i_world: World, i_historyMaxBytes: int = HISTORY_MAX_BYTES, i_journal: Optional[Journal] = None,
+                 i_historyDirectory: Optional[str] = None):
+        self.__commands = CommandQueue()
         self.__world = i_world
+        self.__history = History(i_world, i_historyMaxBytes)
+        # Persistent log of the transactions of the history, see HistoryLog
+        self.__historyLog = None  # type: Optional[HistoryLog]
+        if i_historyDirectory is not None:
+            self.__historyLog = HistoryLog(self.__history, i_historyDirectory)
+        # Journal of the executed commands, synced once per call to executeCommands()
+        self.__journal = i_journal
+        # Transaction of the added commands, None for a transaction per command
+        self.__transaction = None  # type: Optional[int]
+        self.__transactionCount = 0
+        # Pass in progress, carried over between calls when the time budget is spent
+        self.__pass = CommandQueue()
+        self.__passDoneCount = 0
+        self.__continuation = None  # type: Optional[Command]
 
     @property
     def world(self) -> World:
         return self.__world
 
+    @property
+    def history(self) -> History:
+        return self.__history
+
+    @property
+    def historyLog(self) -> Optional[HistoryLog]:
+        return self.__historyLog
+
+    def dispose(self):
+        self.__history.dispose()
+        if self.__historyLog is not None:
+            self.__historyLog.dispose()
+
     def addCommand(self, i_command: Command):
-        self.__commands[i_command.priority()] = i_command
-
-    def executeCommands(self):
-        # Makes sure commands are added to the attribute before we execute them.
-        commands = self.__commands.copy()
-        self.__commands.clear()
-
-        # Sort commands by priority and execute
-        priorities = sorted(commands.keys())
-        for priority in priorities:
-            command = commands[priority]
-            if not command.check(self):
-                continue
-            command.execute(self)
+        i_command.transaction = self.__transaction if self.__transaction is not None else self.__newTransaction()
+        self.__commands.push(i_command)
+
+    def addCommands(self, i_commands: Iterable[Command]):
+        """Add several commands, in a single transaction if none is open."""
+        transaction = self.__transaction if self.__transaction is not None else self.__newTransaction()
+        for command in i_commands:
+            command.transaction = transaction
+            self.__commands.push(command)
+
+    # Transactions
+    def __newTransaction(self) -> int:
+        self.__transactionCount += 1
+        return self.__transactionCount
+
+    def beginTransaction(self):
+        """Group the next added commands in a single transaction, like the commands of a drag stroke."""
+        self.__transaction = self.__newTransaction()
+
+    def endTransaction(self):
+        self.__transaction = None
+        self.__commitDoneTransaction()
+
+    def __commitDoneTransaction(self):
+        """Commit the transaction of the history once all its commands ran, rather than when the next one opens."""
+        if self.__transaction is None and not self.busy and len(self.__commands) == 0:
+            self.__history.commit()
+
+    def undo(self):
+        """Undo the last transaction, once the commands added before are executed."""
+        self.addCommand(UndoCommand())
+
+    def redo(self):
+        """Redo the last undone transaction, once the commands added before are executed."""
+        self.addCommand(RedoCommand())
+
+    @property
+    def busy(self) -> bool:
+        """True if a pass of commands is in progress."""
+        return self.__continuation is not None or len(self.__pass) > 0
+
+    @property
+    def pendingCount(self) -> int:
+        """Number of commands waiting to be executed, in the current pass or the next ones."""
+        return len(self.__pass) + len(self.__commands)
+
+    @property
+    def progress(self) -> Optional[float]:
+        """Fraction of the commands of the current pass that were started, None if no pass is in progress."""
+        if not self.busy:
+            return None
+        return self.__passDoneCount / (self.__passDoneCount + len(self.__pass))
+
+    def executeCommands(self, i_timeBudget: Optional[float] = None):
+        """Execute the queued commands.
+
+        With a time budget (in seconds), stop once it is spent and carry the rest of the pass over
+        to the next call. At least one command runs per call, so the pass always progresses.
+        """
+        start = time.perf_counter()
+        if not self.busy:
+            # Commands added during the pass wait for the next one
+            self.__pass, self.__commands = self.__commands, CommandQueue()
+            self.__passDoneCount = 0
+
+        # Execute by priority, then in submission order. A command can return a continuation
+        # for the rest of its work, which runs next.
+        while self.busy:
+            if self.__continuation is not None:
+                command, self.__continuation = self.__continuation, None
+            else:
+                command = self.__pass.pop()
+                self.__passDoneCount += 1
+            if command.check(self):
+                self.__history.setTransaction(command.transaction)
+                self.__continuation = command.execute(self)
+                if self.__continuation is not None:
+                    self.__continuation.transaction = command.transaction
+            if i_timeBudget is not None and time.perf_counter() - start >= i_timeBudget:
+                break
+
+        # Listeners get the changes of the whole call at once
+        self.__world.notifyPendingChanges()
+        if self.__journal is not None:
+            self.__journal.sync()
+        self.__commitDoneTransaction()
 
     def getSetLayerValueCommand(self, i_layer: str) -> ABCMeta:
         setLayerValueCommand = {
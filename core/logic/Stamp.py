@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+from typing import Dict, Callable
+
+import numpy as np
+
+from core.constants import CellValue
+from ..state import World, Unit, UnitStore
+
+
+class Stamp:
+    """Cells of all the layers of a region, with their units, to paste them elsewhere.
+
+    The values of each layer and the mask of the cells of the stamp are arrays over the box of the stamp.
+    Units are copied to a UnitStore of the stamp, with their cells in the box as (x, y, slot).
+    Rotating or mirroring a stamp gives a new stamp.
+    """
+
+    def __init__(self, i_values: Dict[str, np.ndarray], i_mask: np.ndarray, i_unitStore: UnitStore,
+                 i_units: np.ndarray):
+        self.__values = i_values
+        self.__mask = i_mask
+        self.__unitStore = i_unitStore
+        self.__units = i_units
+
+    @staticmethod
+    def capture(i_world: World, i_minX: int, i_minY: int, i_mask: np.ndarray) -> Stamp:
+        """Copy the cells of a mask at (minX, minY) of a world, in all its layers."""
+        width, height = i_mask.shape
+        if i_minX < 0 or i_minY < 0 or i_minX + width > i_world.width or i_minY + height > i_world.height:
+            raise ValueError(f"Invalid area of size {width}x{height} at ({i_minX}, {i_minY})")
+        maxX, maxY = i_minX + width, i_minY + height
+        values = {
+            name: layer.cells[i_minX:maxX, i_minY:maxY].copy()
+            for name, layer in zip(i_world.layerNames, i_world.layers)
+        }
+        unitStore = UnitStore(1)
+        units = []
+        xs, ys, _ = i_world.units.getNonDefaultCells((i_minX, maxX, i_minY, maxY))
+        for x, y in zip(xs.tolist(), ys.tolist()):
+            unit = i_world.units.getUnit((x, y))
+            if unit is not None and i_mask[x - i_minX, y - i_minY]:
+                units.append((x - i_minX, y - i_minY, unitStore.copyFrom(unit.store, unit.slot, None)))
+        return Stamp(values, i_mask.copy(), unitStore, np.array(units, dtype=np.int32).reshape([-1, 3]))
+
+    @property
+    def size(self) -> tuple[int, int]:
+        return self.__mask.shape
+
+    @property
+    def mask(self) -> np.ndarray:
+        return self.__mask
+
+    def getValues(self, i_layerName: str) -> np.ndarray:
+        return self.__values[i_layerName]
+
+    # Transforms
+    def crop(self, i_cellsBox: tuple[int, int, int, int]) -> Stamp:
+        """Get the part of the stamp in a (minX, maxX, minY, maxY) box of the stamp."""
+        minX, maxX, minY, maxY = i_cellsBox
+        values = {name: array[minX:maxX, minY:maxY].copy() for name, array in self.__values.items()}
+        units = self.__units
+        inside = (units[:, 0] >= minX) & (units[:, 0] < maxX) & (units[:, 1] >= minY) & (units[:, 1] < maxY)
+        units = units[inside] - np.array([minX, minY, 0], dtype=np.int32)
+        return Stamp(values, self.__mask[minX:maxX, minY:maxY].copy(), self.__unitStore, units)
+
+    def rotate(self, i_turns: int = 1) -> Stamp:
+        """Get the stamp rotated by 90 degrees a number of times, counterclockwise as np.rot90()."""
+        return self.__transform(lambda array: np.rot90(array, i_turns))
+
+    def mirror(self, i_axis: int) -> Stamp:
+        """Get the stamp mirrored along an axis: 0 flips x, 1 flips y."""
+        if i_axis not in [0, 1]:
+            raise ValueError(f"Invalid axis {i_axis}")
+        return self.__transform(lambda array: np.flip(array, i_axis))
+
+    def __transform(self, i_function: Callable[[np.ndarray], np.ndarray]) -> Stamp:
+        values = {name: np.ascontiguousarray(i_function(array)) for name, array in self.__values.items()}
+        mask = np.ascontiguousarray(i_function(self.__mask))
+        # Units follow their cells: transform the flat index of each cell, and find where each one went
+        width, height = self.__mask.shape
+        cells = i_function(np.arange(width * height).reshape([width, height]))
+        moves = np.empty(width * height, dtype=np.intp)
+        moves[cells.ravel()] = np.arange(width * height)
+        units = self.__units.copy()
+        if len(units) > 0:
+            units[:, 0], units[:, 1] = np.divmod(moves[units[:, 0] * height + units[:, 1]], cells.shape[1])
+        return Stamp(values, mask, self.__unitStore, units)
+
+    # Pasting
+    def composite(self, i_world: World, i_minX: int, i_minY: int) -> Dict[str, np.ndarray]:
+        """Get the values of each layer of a world with the stamp at (minX, minY), over the box of the stamp
+        with a 1-cell border. The stamp must fit in the world."""
+        width, height = self.size
+        composite = {}
+        for name, layer in zip(i_world.layerNames, i_world.layers):
+            padded = layer.storage.readPaddedArea(i_minX - 1, i_minX + width + 1, i_minY - 1, i_minY + height + 1)
+            values = layer.decodeArray(padded)
+            inner = values[1:width + 1, 1:height + 1]
+            inner[self.__mask] = self.__values[name][self.__mask]
+            composite[name] = values
+        return composite
+
+    def paste(self, i_world: World, i_minX: int, i_minY: int, i_mask: np.ndarray):
+        """Set the cells of a mask of the stamp in a world at (minX, minY), in one write per layer, and
+        notify the changes. The stamp must fit in the world."""
+        xs, ys = np.nonzero(i_mask)
+        if xs.size == 0:
+            return
+        worldXs, worldYs = xs + i_minX, ys + i_minY
+        for name, layer in zip(i_world.layerNames, i_world.layers):
+            if name == "units":
+                # Units are set one by one, after clearing the other units at once
+                cleared = layer.gatherValues(worldXs, worldYs) != CellValue.NONE
+                layer.scatterValues(worldXs[cleared], worldYs[cleared], CellValue.NONE)
+                units = self.__units[i_mask[self.__units[:, 0], self.__units[:, 1]]]
+                for x, y, slot in units.tolist():
+                    unit = Unit.fromSlot(self.__unitStore, slot).copy()
+                    layer.setUnit((i_minX + x, i_minY + y), CellValue.UNITS_UNIT, unit)
+                changedXs = np.concatenate([worldXs[cleared], units[:, 0] + i_minX])
+                changedYs = np.concatenate([worldYs[cleared], units[:, 1] + i_minY])
+            else:
+                values = self.__values[name][xs, ys]
+                changed = layer.gatherValues(worldXs, worldYs) != values
+                changedXs, changedYs = worldXs[changed], worldYs[changed]
+                layer.scatterValues(changedXs, changedYs, values[changed])
+            layer.notifyCellsChanged(changedXs, changedYs)
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+from typing import Dict, List, Tuple, Optional
+
+import numpy as np
+
+from core.constants import CellValue
+from ..state import World, Unit, UnitStore
+
+
+def packValues(i_values: np.ndarray) -> np.ndarray:
+    """Pack cell values as uint16, and as a single value if they are all the same (like a fill)."""
+    values = i_values.astype(np.uint16)
+    if values.size > 0 and np.all(values == values[0]):
+        return values[:1]
+    return values
+
+
+class Transaction:
+    """Changes made by a group of commands, as sparse deltas that can be undone and redone.
+
+    For each layer, the changed cells are packed as flat indices (x * height + y) with their old
+    and new values. Units are copied to a UnitStore of the transaction, with the cell of each change
+    and the slots of the old and new units (-1 for no unit).
+    Changes are recorded until close(), which merges the changes of each cell.
+    """
+
+    def __init__(self, i_id: Optional[int], i_world: World):
+        self.__id = i_id
+        self.__height = i_world.height
+        self.__coordsType = np.min_scalar_type(i_world.width * i_world.height)
+        # Layer name -> recorded (flat indices, old values, new values), merged by close()
+        self.__records: Dict[str, List[Tuple[np.ndarray, np.ndarray, np.ndarray]]] = {}
+        self.__deltas: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+        self.__unitStore = UnitStore(1)
+        self.__unitRecords: List[Tuple[int, int, int, int]] = []
+        self.__unitChanges = np.zeros([0, 4], dtype=np.int32)  # (x, y, old slot, new slot)
+        self.__closed = False
+
+    @property
+    def id(self) -> Optional[int]:
+        return self.__id
+
+    @property
+    def empty(self) -> bool:
+        return not self.__records and not self.__deltas and not self.__unitRecords and len(self.__unitChanges) == 0
+
+    @property
+    def nbytes(self) -> int:
+        deltaBytes = sum(array.nbytes for delta in self.__deltas.values() for array in delta)
+        return deltaBytes + self.__unitChanges.nbytes + self.__unitStore.nbytes
+
+    # Recording
+    def recordCells(self, i_layerName: str, i_xs: np.ndarray, i_ys: np.ndarray,
+                    i_oldValues: np.ndarray, i_newValues: np.ndarray):
+        assert not self.__closed, "Transaction is closed"
+        flat = (i_xs.astype(np.int64) * self.__height + i_ys).astype(self.__coordsType)
+        self.__records.setdefault(i_layerName, []).append(
+            (flat, i_oldValues.astype(np.uint16), i_newValues.astype(np.uint16))
+        )
+
+    def recordUnit(self, i_coords: Tuple[int, int], i_oldUnit: Optional[Unit], i_newUnit: Optional[Unit]):
+        assert not self.__closed, "Transaction is closed"
+        oldSlot, newSlot = self.__copyUnit(i_oldUnit), self.__copyUnit(i_newUnit)
+        self.__unitRecords.append((i_coords[0], i_coords[1], oldSlot, newSlot))
+
+    def __copyUnit(self, i_unit: Optional[Unit]) -> int:
+        if i_unit is None:
+            return -1
+        return self.__unitStore.copyFrom(i_unit.store, i_unit.slot, None)
+
+    def close(self):
+        """Merge the changes of each cell: its first old value and its last new value."""
+        for name, records in self.__records.items():
+            flat = np.concatenate([record[0] for record in records])
+            oldValues = np.concatenate([record[1] for record in records])
+            newValues = np.concatenate([record[2] for record in records])
+            # Bulk writes record increasing cells, no need to sort them
+            if not np.all(flat[1:] > flat[:-1]):
+                order = np.argsort(flat, kind="stable")
+                flat, oldValues, newValues = flat[order], oldValues[order], newValues[order]
+                firsts = np.flatnonzero(np.append(True, flat[1:] != flat[:-1]))
+                lasts = np.append(firsts[1:], flat.size) - 1
+                flat, oldValues, newValues = flat[firsts], oldValues[firsts], newValues[lasts]
+            changed = oldValues != newValues
+            if np.any(changed):
+                self.__deltas[name] = (flat[changed], packValues(oldValues[changed]), packValues(newValues[changed]))
+        self.__records.clear()
+        self.__unitChanges = np.array(self.__unitRecords, dtype=np.int32).reshape([-1, 4])
+        self.__unitRecords.clear()
+        self.__closed = True
+
+    # Saving
+    def toArrays(self) -> Dict[str, np.ndarray]:
+        """Get the changes as arrays, for np.savez(). The transaction must be closed."""
+        assert self.__closed, "Transaction is not closed"
+        arrays = {"height": np.array(self.__height)}
+        for name, (flat, oldValues, newValues) in self.__deltas.items():
+            arrays[f"{name}.cells"], arrays[f"{name}.old"], arrays[f"{name}.new"] = flat, oldValues, newValues
+        # Units are saved as rows, and the slots of the changes as row indices
+        changes = self.__unitChanges.copy()
+        slots = changes[:, 2:]
+        usedSlots, rows = np.unique(slots[slots >= 0], return_inverse=True)
+        slots[slots >= 0] = rows
+        arrays["units.changes"] = changes
+        for key, column in self.__unitStore.exportRows(usedSlots).items():
+            arrays[f"units.{key}"] = column
+        return arrays
+
+    @staticmethod
+    def fromArrays(i_world: World, i_arrays) -> Transaction:
+        """Get a closed transaction from the arrays of toArrays()."""
+        transaction = Transaction(None, i_world)
+        if int(i_arrays["height"]) != i_world.height:
+            raise ValueError(f"Transaction of a world of height {int(i_arrays['height'])}, not {i_world.height}")
+        for name in i_world.layerNames:
+            if f"{name}.cells" in i_arrays:
+                transaction.__deltas[name] = (i_arrays[f"{name}.cells"], i_arrays[f"{name}.old"], i_arrays[f"{name}.new"])
+        rows = {key: i_arrays[f"units.{key}"] for key in ["playerIds", "unitClasses", "properties", "flags"]}
+        slots = transaction.__unitStore.importRows(rows)
+        changes = np.array(i_arrays["units.changes"], dtype=np.int32).reshape([-1, 4])
+        unitSlots = changes[:, 2:]
+        unitSlots[unitSlots >= 0] = slots[unitSlots[unitSlots >= 0]]
+        transaction.__unitChanges = changes
+        transaction.__closed = True
+        return transaction
+
+    # Applying
+    def undo(self, i_world: World):
+        """Set the old values of the changed cells, and put back the old units."""
+        self.__apply(i_world, True)
+
+    def redo(self, i_world: World):
+        """Set the new values of the changed cells, and put back the new units."""
+        self.__apply(i_world, False)
+
+    def __apply(self, i_world: World, i_undo: bool):
+        assert self.__closed, "Transaction is not closed"
+        # One write per layer
+        for name, (flat, oldValues, newValues) in self.__deltas.items():
+            layer = i_world.getLayer(name)
+            xs, ys = np.divmod(flat.astype(np.intp), self.__height)
+            values = oldValues if i_undo else newValues
+            minX, maxX, minY, maxY = int(xs.min()), int(xs.max()) + 1, int(ys.min()), int(ys.max()) + 1
+            if values.size == 1 and 4 * xs.size >= (maxX - minX) * (maxY - minY):
+                # A single value in a dense region, like a fill, is written as a mask
+                mask = np.zeros([maxX - minX, maxY - minY], dtype=bool)
+                mask[xs - minX, ys - minY] = True
+                layer.writeMask(minX, minY, mask, values[0])
+                layer.notifyMaskChanged(minX, minY, mask)
+            else:
+                layer.scatterValues(xs, ys, values if values.size > 1 else values[0])
+                layer.notifyCellsChanged(xs, ys)
+
+        # Then units, in reverse order to undo
+        units = i_world.units
+        changes = self.__unitChanges[::-1] if i_undo else self.__unitChanges
+        for x, y, oldSlot, newSlot in changes.tolist():
+            slot = oldSlot if i_undo else newSlot
+            if slot >= 0:
+                unit = Unit.fromSlot(self.__unitStore, slot).copy()
+                units.setUnit((x, y), CellValue.UNITS_UNIT, unit)
+            elif units.getUnit((x, y)) is not None:
+                units.setUnit((x, y), CellValue.NONE)
+            units.notifyCellChanged((x, y))
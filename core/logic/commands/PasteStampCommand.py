@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from ..Command import Command, WORLD_PRIORITY
+from ..Stamp import Stamp
+from ..rules import canPasteCells
+if TYPE_CHECKING:
+    from ..Logic import Logic
+
+
+class PasteStampCommand(Command):
+    """Command to paste a stamp with its top-left cell at (minX, minY), clipped to the world.
+
+    The stamp is validated at once on the composite of the world and the stamp: the cells of the stamp
+    are pasted where the values of all the layers follow the rules together.
+    """
+
+    def __init__(self, i_stamp: Stamp, i_minX: int, i_minY: int):
+        self._stamp = i_stamp
+        self._minX = i_minX
+        self._minY = i_minY
+        self.__accepted = np.zeros(i_stamp.size, dtype=bool)
+
+    def priority(self) -> int:
+        return WORLD_PRIORITY
+
+    def check(self, i_logic: Logic) -> bool:
+        world = i_logic.world
+        width, height = self._stamp.size
+        cropX, cropY = max(-self._minX, 0), max(-self._minY, 0)
+        cropBox = (cropX, min(width, world.width - self._minX), cropY, min(height, world.height - self._minY))
+        if cropBox[0] >= cropBox[1] or cropBox[2] >= cropBox[3]:
+            return False
+        if cropBox != (0, width, 0, height):
+            self._stamp = self._stamp.crop(cropBox)
+            self._minX, self._minY = self._minX + cropX, self._minY + cropY
+        # The accepted cells are kept for execute(), which runs right after
+        composite = self._stamp.composite(world, self._minX, self._minY)
+        self.__accepted = self._stamp.mask & canPasteCells(composite)
+        return bool(np.any(self.__accepted))
+
+    def execute(self, i_logic: Logic):
+        self._stamp.paste(i_logic.world, self._minX, self._minY, self.__accepted)
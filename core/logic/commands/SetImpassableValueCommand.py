@@ -1,7 +1,6 @@
 
 from __future__ import annotations
 
-from core.constants import CellValue, checkCellValue
 from typing import TYPE_CHECKING
 
 from .SetLayerValueCommand import SetLayerValueCommand
@@ -9,57 +8,16 @@ if TYPE_CHECKING:
     from ..Logic import Logic
 
 class SetImpassableValueCommand(SetLayerValueCommand):
-    # Check if the command can be executed
-    def check(self, i_logic: Logic) -> bool:
-        value = self._value
-        # Verify if the value to set is a valid impassable cell value
-        if not checkCellValue("impassable", value):
-            return False
-        
-        if self._unit is not None:
-            return False
-
-        coords = self._coords
-        world = i_logic.world
-        # Check if the coordinates are within the world bounds
-        if not world.contains(coords):
-            return False
+    LAYER_NAME = "impassable"
 
-        impassableValue = world.impassable.get_cell_value((coords[0], coords[1]))
-        if value == CellValue.NONE:
-            # If the value to set is NONE, ensure it is not already NONE
-            if impassableValue == CellValue.NONE:  # Value already removed
-                return False
-            objectsValue = world.objects.get_cell_value(coords)
-            # If we have a bridge, don't remove river
-            if impassableValue == CellValue.IMPASSABLE_RIVER \
-                and objectsValue in [CellValue.OBJECTS_ROAD_DIRT, CellValue.OBJECTS_ROAD_STONE]:
-                return False
-        else:
-            # If the value to set is not NONE, ensure it is not already set
-            if impassableValue != CellValue.NONE:  # Value already set
-                return False
-            # Ensure the ground cell is not SEA
-            if world.ground.get_cell_value((coords[0], coords[1])) == CellValue.GROUND_SEA:
-                return False
-            # Ensure there are no objects in the cell
-            if world.objects.get_cell_value((coords[0], coords[1])) != CellValue.NONE:
-                return False
-
-        return True
-        
     # Execute the command to set the impassable value
     def execute(self, i_logic: Logic):
         coords = self._coords
         value = self._value
         impassable = i_logic.world.impassable
+        # If fill is enabled, set the whole region of the cell, in steps
+        if self._fill:
+            return self._fillCommand(i_logic)
         # Set the impassable cell value in the world
         impassable.set_cell_value(coords[0], coords[1], value)
         impassable.notifyCellChanged(coords)
-        # If fill is enabled, recursively add commands for adjacent cells
-        if self._fill:
-            x, y = coords[0], coords[1]
-            i_logic.addCommand(SetImpassableValueCommand((x + 1, y), value, self._unit, True))
-            i_logic.addCommand(SetImpassableValueCommand((x - 1, y), value, self._unit, True))
-            i_logic.addCommand(SetImpassableValueCommand((x, y + 1), value, self._unit, True))
-            i_logic.addCommand(SetImpassableValueCommand((x, y - 1), value, self._unit, True))
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from typing import Optional, TYPE_CHECKING
+
+import numpy as np
+
+from core.constants import CellValue
+from ..Command import Command, WORLD_PRIORITY
+from ..rules import canSetCells
+from ...state import Unit
+if TYPE_CHECKING:
+    from ..Logic import Logic
+
+
+class SetLayerCellsCommand(Command):
+    """Command to set a value in a batch of cells (xs[i], ys[i]) of a layer, like a brush stroke.
+
+    The cells are validated at once with the layer rules, and only the accepted cells are set.
+    """
+
+    def __init__(self, i_layerName: str, i_xs: np.ndarray, i_ys: np.ndarray, i_value: CellValue,
+                 i_unit: Optional[Unit] = None):
+        self._layerName = i_layerName
+        self._xs = np.asarray(i_xs, dtype=np.intp)
+        self._ys = np.asarray(i_ys, dtype=np.intp)
+        self._value = i_value
+        self._unit = i_unit
+        self.__accepted = np.zeros(self._xs.shape, dtype=bool)
+
+    def priority(self) -> int:
+        return WORLD_PRIORITY
+
+    def check(self, i_logic: Logic) -> bool:
+        # The accepted cells are kept for execute(), which runs right after
+        self.__accepted = canSetCells(i_logic.world, self._layerName, self._xs, self._ys, self._value, self._unit)
+        return bool(np.any(self.__accepted))
+
+    def execute(self, i_logic: Logic):
+        xs, ys = self._xs[self.__accepted], self._ys[self.__accepted]
+        layer = i_logic.world.getLayer(self._layerName)
+        if self._layerName == "units":
+            # Each cell gets its own unit
+            for x, y in zip(xs.tolist(), ys.tolist()):
+                layer.setUnit((x, y), self._value, self._unit)
+        else:
+            layer.scatterValues(xs, ys, self._value)
+        layer.notifyCellsChanged(xs, ys)
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from typing import Optional, TYPE_CHECKING
+
+import numpy as np
+
+from core.constants import CellValue
+from ..Command import Command, WORLD_PRIORITY
+from ..fill import applyMask
+from ..rules import canSetMask
+from ...state import Unit
+if TYPE_CHECKING:
+    from ..Logic import Logic
+
+# Number of cells set by each step of the command
+STEP_CELLS = 1 << 14
+
+
+class SetLayerMaskCommand(Command):
+    """Command to set a value in the cells of a mask at (minX, minY) of a layer, like a fill.
+
+    Large masks are set in strips of about STEP_CELLS cells: each step validates its strip with the
+    layer rules, sets it, and returns a command for the rest of the mask, so the work can be spread
+    over several frames.
+    """
+
+    def __init__(self, i_layerName: str, i_minX: int, i_minY: int, i_mask: np.ndarray, i_value: CellValue,
+                 i_unit: Optional[Unit] = None):
+        self._layerName = i_layerName
+        self._minX = i_minX
+        self._minY = i_minY
+        self._mask = i_mask
+        self._value = i_value
+        self._unit = i_unit
+
+    def priority(self) -> int:
+        return WORLD_PRIORITY
+
+    def check(self, i_logic: Logic) -> bool:
+        return bool(np.any(self._mask))
+
+    def execute(self, i_logic: Logic) -> Optional[SetLayerMaskCommand]:
+        width, height = self._mask.shape
+        stripWidth = max(1, STEP_CELLS // max(1, height))
+        strip = self._mask[:stripWidth]
+        cellsBox = (self._minX, self._minX + strip.shape[0], self._minY, self._minY + height)
+        strip = strip & canSetMask(i_logic.world, self._layerName, cellsBox, self._value, self._unit)
+        applyMask(i_logic.world, self._layerName, self._minX, self._minY, strip, self._value, self._unit)
+        if stripWidth >= width:
+            return None
+        return SetLayerMaskCommand(self._layerName, self._minX + stripWidth, self._minY, self._mask[stripWidth:],
+                                   self._value, self._unit)
@@ -1,13 +1,21 @@
 from __future__ import annotations
 
-from typing import Tuple, Optional
+from typing import Tuple, Optional, TYPE_CHECKING
 
 from core.constants import CellValue
-from ..Command import Command, WORLD_PRIORITY, WORLD_MAX_WIDTH
+from ..Command import Command, WORLD_PRIORITY
+from ..fill import computeFillArea
+from ..rules import canSetCell
+from .SetLayerMaskCommand import SetLayerMaskCommand
 from ...state import Unit
+if TYPE_CHECKING:
+    from ..Logic import Logic
 
 
 class SetLayerValueCommand(Command):
+    # Name of the layer edited by the command, its rules are in core.logic.rules
+    LAYER_NAME = ""
+
     def __init__(self, i_coords: Tuple[int, int], i_value: CellValue,i_unit: Optional[Unit] = None, i_fill: bool = False):
         self._coords = i_coords
         self._value = i_value
@@ -16,6 +24,14 @@ class SetLayerValueCommand(Command):
 
     def priority(self) -> int:
         """
-        Computes a unique integer value for each cell and for the update case.
+        All world edits share a priority, so they run in the order they were added.
         """
-        return WORLD_PRIORITY + self._coords[0] + self._coords[1] *WORLD_MAX_WIDTH
\ No newline at end of file
+        return WORLD_PRIORITY
+
+    def check(self, i_logic: Logic) -> bool:
+        return canSetCell(i_logic.world, self.LAYER_NAME, self._coords, self._value, self._unit)
+
+    def _fillCommand(self, i_logic: Logic) -> SetLayerMaskCommand:
+        """Get the command that sets the value in the whole region of the cell."""
+        minX, minY, mask = computeFillArea(i_logic.world, self.LAYER_NAME, self._coords, self._value, self._unit)
+        return SetLayerMaskCommand(self.LAYER_NAME, minX, minY, mask, self._value, self._unit)
@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from ..Command import Command, WORLD_PRIORITY
+if TYPE_CHECKING:
+    from ..Logic import Logic
+
+
+class UndoCommand(Command):
+    """Command to undo the last transaction of the history, after the commands added before it."""
+
+    def priority(self) -> int:
+        return WORLD_PRIORITY
+
+    def check(self, i_logic: Logic) -> bool:
+        return i_logic.history.canUndo
+
+    def execute(self, i_logic: Logic):
+        i_logic.history.undo()
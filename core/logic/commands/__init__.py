@@ -3,3 +3,8 @@ from .SetGroundValueCommand import SetGroundValueCommand
 from .SetImpassableValueCommand import SetImpassableValueCommand
 from .SetObjectsValueCommand import SetObjectsValueCommand
 from .SetUnitsCellCommand import SetUnitsCellCommand
+from .SetLayerCellsCommand import SetLayerCellsCommand
+from .SetLayerMaskCommand import SetLayerMaskCommand
+from .UndoCommand import UndoCommand
+from .RedoCommand import RedoCommand
+from .PasteStampCommand import PasteStampCommand
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+from typing import Tuple, Optional
+
+import numpy as np
+
+from tools.labeling import fillRegion
+from .rules import canSetMask
+from ..state import World, Unit
+
+# Side of the first box around the seed where a fill looks for its region
+FILL_BOX_SIZE = 256
+
+
+def computeFillArea(i_world: World, i_layerName: str, i_seed: Tuple[int, int], i_value: int,
+                    i_unit: Optional[Unit] = None) -> Tuple[int, int, np.ndarray]:
+    """Get the cells filled from a seed cell: the 4-connected cells where the value can be set,
+    as a mask at (minX, minY) cropped to their bounding box.
+
+    The rules are evaluated in a box around the seed, which doubles until the region doesn't reach
+    its sides inside the world, so small fills don't pay for the whole world.
+    """
+    if not i_world.contains(i_seed):
+        return 0, 0, np.zeros([0, 0], dtype=bool)
+    seedX, seedY = i_seed
+    halfSize = FILL_BOX_SIZE // 2
+    while True:
+        minX, maxX = max(seedX - halfSize, 0), min(seedX + halfSize, i_world.width)
+        minY, maxY = max(seedY - halfSize, 0), min(seedY + halfSize, i_world.height)
+        mask = canSetMask(i_world, i_layerName, (minX, maxX, minY, maxY), i_value, i_unit)
+        region = fillRegion(mask, (seedX - minX, seedY - minY))
+        closed = (
+            (minX == 0 or not np.any(region[0])) and (maxX == i_world.width or not np.any(region[-1])) and
+            (minY == 0 or not np.any(region[:, 0])) and (maxY == i_world.height or not np.any(region[:, -1]))
+        )
+        if closed:
+            regionMinX, regionMinY, region = cropMask(region)
+            return minX + regionMinX, minY + regionMinY, region
+        halfSize *= 2
+
+
+def cropMask(i_mask: np.ndarray) -> Tuple[int, int, np.ndarray]:
+    """Crop a mask to the bounding box of its cells. Returns (minX, minY, cropped mask)."""
+    xs, ys = np.nonzero(np.any(i_mask, axis=1))[0], np.nonzero(np.any(i_mask, axis=0))[0]
+    if xs.size == 0:
+        return 0, 0, i_mask[:0, :0]
+    minX, maxX, minY, maxY = int(xs[0]), int(xs[-1]) + 1, int(ys[0]), int(ys[-1]) + 1
+    return minX, minY, i_mask[minX:maxX, minY:maxY]
+
+
+def applyMask(i_world: World, i_layerName: str, i_minX: int, i_minY: int, i_mask: np.ndarray, i_value: int,
+              i_unit: Optional[Unit] = None) -> int:
+    """Set a value in the cells of a mask at (minX, minY), and notify the changes. Returns the number of cells."""
+    if not np.any(i_mask):
+        return 0
+    layer = i_world.getLayer(i_layerName)
+    if i_layerName == "units":
+        # Each cell gets its own unit
+        for x, y in zip(*np.nonzero(i_mask)):
+            layer.setUnit((i_minX + int(x), i_minY + int(y)), i_value, i_unit)
+    else:
+        layer.writeMask(i_minX, i_minY, i_mask, i_value)
+    layer.notifyMaskChanged(i_minX, i_minY, i_mask)
+    return int(np.count_nonzero(i_mask))
+
+
+def applyFill(i_world: World, i_layerName: str, i_mask: np.ndarray, i_value: int,
+              i_unit: Optional[Unit] = None) -> int:
+    """Set a value in the cells of a world sized mask, and notify the changes. Returns the number of cells."""
+    minX, minY, mask = cropMask(i_mask)
+    return applyMask(i_world, i_layerName, minX, minY, mask, i_value, i_unit)
+
+
+def fill(i_world: World, i_layerName: str, i_seed: Tuple[int, int], i_value: int,
+         i_unit: Optional[Unit] = None) -> int:
+    """Fill the region of a seed cell at once, with the rules of the layer commands. Returns the number of cells."""
+    minX, minY, mask = computeFillArea(i_world, i_layerName, i_seed, i_value, i_unit)
+    return applyMask(i_world, i_layerName, minX, minY, mask, i_value, i_unit)
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+from typing import Tuple, Optional, Callable, Dict
+
+import numpy as np
+
+from core.constants import CellValue, checkCellValue
+from tools.tilecodes import code4np
+from ..state import World, Unit
+
+# Rules of each layer, as predicates over boxes of cells: they return a boolean mask of the
+# cells of the box where a value can be set. They match the check() of the layer commands.
+
+ROADS = [CellValue.OBJECTS_ROAD_DIRT, CellValue.OBJECTS_ROAD_STONE]
+
+
+def canSetGround(i_world: World, i_cellsBox: Tuple[int, int, int, int], i_value: int,
+                 i_unit: Optional[Unit] = None) -> np.ndarray:
+    if not checkCellValue("ground", i_value) or i_unit is not None:
+        return noCells(i_cellsBox)
+    # The ground changes
+    mask = ~i_world.ground.maskArea(i_cellsBox, [i_value])
+    if i_value == CellValue.GROUND_SEA:
+        # No sea under impassable cells or objects
+        mask &= i_world.impassable.maskArea(i_cellsBox, [CellValue.NONE])
+        mask &= i_world.objects.maskArea(i_cellsBox, [CellValue.NONE])
+    return mask
+
+
+def canSetImpassable(i_world: World, i_cellsBox: Tuple[int, int, int, int], i_value: int,
+                     i_unit: Optional[Unit] = None) -> np.ndarray:
+    if not checkCellValue("impassable", i_value) or i_unit is not None:
+        return noCells(i_cellsBox)
+    empty = i_world.impassable.maskArea(i_cellsBox, [CellValue.NONE])
+    if i_value == CellValue.NONE:
+        # Something to remove, except rivers under bridges
+        bridges = i_world.impassable.maskArea(i_cellsBox, [CellValue.IMPASSABLE_RIVER])
+        bridges &= i_world.objects.maskArea(i_cellsBox, ROADS)
+        return ~empty & ~bridges
+    # Empty cell, on land, without objects
+    mask = empty
+    mask &= ~i_world.ground.maskArea(i_cellsBox, [CellValue.GROUND_SEA])
+    mask &= i_world.objects.maskArea(i_cellsBox, [CellValue.NONE])
+    return mask
+
+
+def canSetObjects(i_world: World, i_cellsBox: Tuple[int, int, int, int], i_value: int,
+                  i_unit: Optional[Unit] = None) -> np.ndarray:
+    if not checkCellValue("objects", i_value) or i_unit is not None:
+        return noCells(i_cellsBox)
+    empty = i_world.objects.maskArea(i_cellsBox, [CellValue.NONE])
+    if i_value == CellValue.NONE:
+        return ~empty
+    # Empty cell, on land
+    mask = empty
+    mask &= ~i_world.ground.maskArea(i_cellsBox, [CellValue.GROUND_SEA])
+    # Only roads on rivers (bridges), and only on straight rivers. Nothing on other impassable cells.
+    rivers = i_world.impassable.maskArea(i_cellsBox, [CellValue.IMPASSABLE_RIVER])
+    if i_value in ROADS:
+        codes = code4np(i_world.impassable.maskAreaNeighbors4(i_cellsBox, [CellValue.IMPASSABLE_RIVER]))
+        bridges = rivers & ((codes == 6) | (codes == 9))
+    else:
+        bridges = noCells(i_cellsBox)
+    mask &= bridges | i_world.impassable.maskArea(i_cellsBox, [CellValue.NONE])
+    return mask
+
+
+def canSetUnits(i_world: World, i_cellsBox: Tuple[int, int, int, int], i_value: int,
+                i_unit: Optional[Unit] = None) -> np.ndarray:
+    if i_value not in [CellValue.NONE, CellValue.UNITS_UNIT]:
+        return noCells(i_cellsBox)
+    empty = i_world.units.maskArea(i_cellsBox, [CellValue.NONE])
+    if i_value == CellValue.NONE or i_unit is None:
+        return ~empty
+    if not isinstance(i_unit, Unit):
+        return noCells(i_cellsBox)
+    # Empty cell, on land, on passable cells or bridges
+    mask = empty
+    mask &= ~i_world.ground.maskArea(i_cellsBox, [CellValue.GROUND_SEA])
+    bridges = i_world.impassable.maskArea(i_cellsBox, [CellValue.IMPASSABLE_RIVER])
+    bridges &= i_world.objects.maskArea(i_cellsBox, ROADS)
+    mask &= bridges | i_world.impassable.maskArea(i_cellsBox, [CellValue.NONE])
+    return mask
+
+
+def noCells(i_cellsBox: Tuple[int, int, int, int]) -> np.ndarray:
+    minX, maxX, minY, maxY = i_cellsBox
+    return np.zeros([maxX - minX, maxY - minY], dtype=bool)
+
+
+layerRules: Dict[str, Callable[[World, Tuple[int, int, int, int], int, Optional[Unit]], np.ndarray]] = {
+    "ground": canSetGround,
+    "impassable": canSetImpassable,
+    "objects": canSetObjects,
+    "units": canSetUnits,
+}
+
+
+def canSetMask(i_world: World, i_layerName: str, i_cellsBox: Tuple[int, int, int, int], i_value: int,
+               i_unit: Optional[Unit] = None) -> np.ndarray:
+    """Get the mask of the cells of a (minX, maxX, minY, maxY) box where a layer value can be set."""
+    if i_layerName not in layerRules:
+        raise ValueError(f"Layer {i_layerName} not found")
+    return layerRules[i_layerName](i_world, i_cellsBox, i_value, i_unit)
+
+
+def canSetCells(i_world: World, i_layerName: str, i_xs: np.ndarray, i_ys: np.ndarray, i_value: int,
+                i_unit: Optional[Unit] = None) -> np.ndarray:
+    """Get, for each cell (xs[i], ys[i]), whether a layer value can be set in it. Cells outside the world are rejected.
+
+    The rules are evaluated once on the bounding box of the cells, with the values of the world before the batch.
+    """
+    xs, ys = np.asarray(i_xs, dtype=np.intp), np.asarray(i_ys, dtype=np.intp)
+    accepted = np.zeros(xs.shape, dtype=bool)
+    inside = (xs >= 0) & (xs < i_world.width) & (ys >= 0) & (ys < i_world.height)
+    if not np.any(inside):
+        return accepted
+    xs, ys = xs[inside], ys[inside]
+    minX, minY = int(xs.min()), int(ys.min())
+    mask = canSetMask(i_world, i_layerName, (minX, int(xs.max()) + 1, minY, int(ys.max()) + 1), i_value, i_unit)
+    accepted[inside] = mask[xs - minX, ys - minY]
+    return accepted
+
+
+def canSetCell(i_world: World, i_layerName: str, i_coords: Tuple[int, int], i_value: int,
+               i_unit: Optional[Unit] = None) -> bool:
+    """Check if a layer value can be set in a cell, with the same rules as the batches."""
+    if not i_world.contains(i_coords):
+        return False
+    x, y = i_coords
+    return bool(canSetMask(i_world, i_layerName, (x, x + 1, y, y + 1), i_value, i_unit)[0, 0])
+
+
+def canPasteCells(i_values: Dict[str, np.ndarray]) -> np.ndarray:
+    """Get the mask of the cells where the values of all the layers follow the rules together, like a pasted stamp.
+
+    The values are boxes of cell values of each layer with a 1-cell border, for the rules that depend on
+    the neighbors of the cells. The mask is the box without its border.
+    """
+    ground, impassable, objects, units = (i_values[name] for name in ["ground", "impassable", "objects", "units"])
+    width, height = ground.shape[0] - 2, ground.shape[1] - 2
+    inner = (slice(1, width + 1), slice(1, height + 1))
+    rivers = impassable == CellValue.IMPASSABLE_RIVER
+    codes = code4np(np.stack((
+        rivers[0:width, 1:height + 1], rivers[1:width + 1, 0:height],
+        rivers[1:width + 1, 2:height + 2], rivers[2:width + 2, 1:height + 1],
+    ), axis=2))
+    land = ground[inner] != CellValue.GROUND_SEA
+    noImpassable = impassable[inner] == CellValue.NONE
+    noObjects = objects[inner] == CellValue.NONE
+    # Only roads on rivers (bridges), and only on straight rivers
+    bridges = rivers[inner] & np.isin(objects[inner], ROADS) & ((codes == 6) | (codes == 9))
+    mask = noImpassable | (land & (noObjects | bridges))
+    mask &= noObjects | (land & (noImpassable | bridges))
+    mask &= (units[inner] == CellValue.NONE) | (land & (noImpassable | bridges))
+    return mask
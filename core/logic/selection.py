@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from typing import Tuple, Iterable, Dict
+
+import numpy as np
+
+from tools.labeling import labelRegions
+from ..state import World
+
+
+def computeWand(i_world: World, i_seed: Tuple[int, int], i_layerNames: Iterable[str],
+                i_connectivity: int = 4) -> np.ndarray:
+    """Get the mask of the cells connected to a seed cell that have the same values as the seed in some layers,
+    like an island in the ground layer, or a river system in the impassable layer."""
+    if not i_world.contains(i_seed):
+        return np.zeros(i_world.size, dtype=bool)
+    cellsBox = (0, i_world.width, 0, i_world.height)
+    mask = np.ones(i_world.size, dtype=bool)
+    for name in i_layerNames:
+        layer = i_world.getLayer(name)
+        mask &= layer.maskArea(cellsBox, [layer.get_cell_value(i_seed)])
+    labels, _ = labelRegions(mask, i_connectivity)
+    return labels == labels[i_seed]
+
+
+def countMaskValues(i_world: World, i_minX: int, i_minY: int, i_mask: np.ndarray) -> Dict[str, Dict[int, int]]:
+    """Count the cells of each value of each layer, in the cells of a mask at (minX, minY)."""
+    width, height = i_mask.shape
+    counts = {}
+    for name, layer in zip(i_world.layerNames, i_world.layers):
+        values, valueCounts = np.unique(layer.cells[i_minX:i_minX + width, i_minY:i_minY + height][i_mask],
+                                        return_counts=True)
+        counts[name] = dict(zip(values.tolist(), valueCounts.tolist()))
+    return counts
@@ -0,0 +1,28 @@
+# core/state/ILayerIndex.py
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Tuple, Optional
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from .Layer import Layer
+    from .Unit import Unit
+
+
+class ILayerIndex:
+    """Interface for data structures derived from the cells of a layer.
+
+    Unlike listeners, indexes are updated synchronously by every write to the layer,
+    so they are up to date before the write returns.
+    """
+
+    def cellsWritten(self, i_layer: Layer, i_xs: np.ndarray, i_ys: np.ndarray,
+                     i_oldValues: np.ndarray, i_newValues: np.ndarray):
+        """Called after the cells at the coordinates (xs[i], ys[i]) were written, with their old and new values."""
+        pass
+
+    def unitChanged(self, i_layer: Layer, i_coords: Tuple[int, int],
+                    i_oldUnit: Optional[Unit], i_newUnit: Optional[Unit]):
+        """Called after the unit of a cell was placed, replaced or removed."""
+        pass
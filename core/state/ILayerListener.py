@@ -3,6 +3,8 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING, Tuple
 
+import numpy as np
+
 if TYPE_CHECKING:
     from .Layer import Layer
 
@@ -12,4 +14,14 @@ class ILayerListener:
 
     def cellChanged(self, i_layer: Layer, i_cell: Tuple[int, int]):
         """Called when a cell in a layer changes."""
-        pass
\ No newline at end of file
+        pass
+
+    def cellsChanged(self, i_layer: Layer, i_cellsBox: Tuple[int, int, int, int], i_mask: np.ndarray):
+        """Called with each group of close changes, with the (minX, maxX, minY, maxY) box of the changed cells
+        and a boolean mask over the box of the cells that changed.
+
+        By default, calls cellChanged() for each changed cell.
+        """
+        minX, _, minY, _ = i_cellsBox
+        for x, y in zip(*np.nonzero(i_mask)):
+            self.cellChanged(i_layer, (minX + int(x), minY + int(y)))
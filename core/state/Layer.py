@@ -1,29 +1,77 @@
 # core/state/Layer.py
-from typing import Tuple, Optional, Dict
+from typing import Tuple, Optional, Dict, Iterable, List, Union, Iterator
 
 import numpy as np
 
 from ..Listenable import Listenable
 from .ILayerListener import ILayerListener
+from .ILayerIndex import ILayerIndex
+from .LayerCells import LayerCells
+from .SummedAreaTable import SummedAreaTable
+from .ValueIndex import ValueIndex
+from .UnitIndex import UnitIndex
 from .Unit import Unit
+from .UnitStore import UnitStore
+from .storage import LayerStorage, createLayerStorage, CHUNK_SIZE
 from ..constants.CellValue import CellValue
 from core.constants.Direction import Direction
+from tools.labeling import findBoxes
+
+
+# Maximum number of distinct values in a layer, cells are stored as uint8 indices
+LAYER_MAX_VALUES = 256
 
 
 class Layer(Listenable[ILayerListener]):
-    """A layer in the game world that can be observed for changes."""
+    """A layer in the game world that can be observed for changes.
+
+    Cells are stored as compact uint8 indices into a per-layer table of cell values.
+    Values are converted at the API boundary, so callers only see CellValue codes.
+    """
     
-    def __init__(self, input_width: int, input_height: int, input_defaultValue: CellValue):
+    def __init__(self, input_width: int, input_height: int, input_defaultValue: CellValue,
+                 input_storage: Union[str, LayerStorage] = "dense", input_path: Optional[str] = None,
+                 input_values: Optional[Iterable[int]] = None):
         super().__init__()
         # size of our Layer. Should be immutable.
         self.__width = input_width
         self.__height = input_height
         self.__defaultValue = input_defaultValue
         self.__size = (input_width, input_height)
-        # Create array with 1-cell border all around for easier neighbor access
-        self.__cells = np.full([input_width+2, input_height+2], input_defaultValue, dtype=np.int32)
-        # Dictionary to store units by coordinates
-        self.__units: Dict[Tuple[int, int], Unit] = {}
+
+        # Index to value table, and value to index table (-1 for values not in the layer yet).
+        # The default value is always index 0, other values get the next index when first used.
+        # Values given at creation get a fixed index, so that stored indices stay valid across runs.
+        self.__values = np.zeros([LAYER_MAX_VALUES], dtype=np.int32)
+        self.__valueCount = 0
+        self.__indices = np.full([CellValue.MAX_VALUE + 1], -1, dtype=np.int16)
+        self.__addValue(input_defaultValue)
+        if input_values is not None:
+            for value in input_values:
+                if self.__indices[value] < 0:
+                    self.__addValue(value)
+
+        # Backend holding the cell indices (see core.state.storage), or an existing backend
+        if isinstance(input_storage, LayerStorage):
+            self.__storage = input_storage
+        else:
+            self.__storage = createLayerStorage(
+                input_storage, input_width, input_height, 0, np.uint8, input_path
+            )
+        self.__readOnly = False
+        self.__cells = LayerCells(self.__storage, self.__values)
+        # Data of the units in columns, and unit slots by coordinates
+        self.__unitStore = UnitStore()
+        self.__units: Dict[Tuple[int, int], int] = {}
+        # Indexes updated by every write
+        self.__indexes: List[ILayerIndex] = []
+        self.__summedAreaTables: Dict[Tuple[int, ...], SummedAreaTable] = {}
+        self.__valueIndex: Optional[ValueIndex] = None
+        self.__unitIndex: Optional[UnitIndex] = None
+        # Cells changed since the last notification, as single cells, batches of (xs, ys) and (minX, minY, mask)
+        self.__dirtyCells: List[Tuple[int, int]] = []
+        self.__dirtyBatches: List[Tuple[np.ndarray, np.ndarray]] = []
+        self.__dirtyMasks: List[Tuple[int, int, np.ndarray]] = []
     
     # Getter properties
     @property
@@ -39,9 +87,69 @@ class Layer(Listenable[ILayerListener]):
         return self.__height
 
     @property
-    def cells(self) -> np.ndarray:
+    def defaultValue(self) -> CellValue:
+        return self.__defaultValue
+
+    @property
+    def storage(self) -> LayerStorage:
+        return self.__storage
+
+    @property
+    def values(self) -> np.ndarray:
+        """Get the table of the values used in the layer, indexed by the stored cell indices."""
+        return self.__values[:self.__valueCount]
+
+    @property
+    def unitStore(self) -> UnitStore:
+        """Get the columns of the units placed in the layer, for batch operations."""
+        return self.__unitStore
+
+    @property
+    def cells(self) -> LayerCells:
         """Get the inner cells without border."""
-        return self.__cells[1:-1, 1:-1]
+        return self.__cells
+
+    # Conversion between cell values and stored indices
+    def __addValue(self, i_value: int) -> int:
+        if not 0 <= i_value <= CellValue.MAX_VALUE:
+            raise ValueError(f"Invalid cell value {i_value}")
+        if self.__valueCount >= LAYER_MAX_VALUES:
+            raise ValueError(f"Too many distinct values in layer, max is {LAYER_MAX_VALUES}")
+        index = self.__valueCount
+        self.__values[index] = i_value
+        self.__indices[i_value] = index
+        self.__valueCount += 1
+        return index
+
+    def encode(self, i_value: int) -> int:
+        """Get the stored index of a cell value."""
+        index = int(self.__indices[i_value]) if 0 <= i_value <= CellValue.MAX_VALUE else -1
+        if index < 0:
+            index = self.__addValue(i_value)
+        return index
+
+    def encodeArray(self, i_values: np.ndarray) -> np.ndarray:
+        """Get the stored indices of an array of cell values."""
+        values = np.asarray(i_values)
+        if values.size == 0:
+            return np.zeros(values.shape, dtype=np.uint8)
+        if values.min() < 0 or values.max() > CellValue.MAX_VALUE:
+            raise ValueError("Invalid cell values")
+        indices = self.__indices[values]
+        if np.any(indices < 0):
+            for value in np.unique(values[indices < 0]):
+                self.__addValue(int(value))
+            indices = self.__indices[values]
+        return indices.astype(np.uint8)
+
+    def decodeArray(self, i_indices: np.ndarray) -> np.ndarray:
+        """Get the cell values of an array of stored indices."""
+        return self.__values[i_indices]
+
+    def indicesOf(self, i_values: Iterable[int]) -> np.ndarray:
+        """Get the stored indices of the given values that are present in the layer."""
+        indices = [self.__indices[value] for value in i_values if 0 <= value <= CellValue.MAX_VALUE]
+        return np.array([index for index in indices if index >= 0], dtype=np.uint8)
 
     def __getitem__(self, coords: Tuple[int, int]) -> CellValue:
         return self.get_cell_value((coords[0], coords[1]))
@@ -58,100 +166,433 @@ class Layer(Listenable[ILayerListener]):
         if i_direction:
             # Check direction and return the corresponding neighbor's value
             if i_direction == Direction.LEFT:
-                return CellValue(self.__cells[x, y + 1])
+                return CellValue(self.__getPaddedCell(x - 1, y))
             if i_direction == Direction.TOP:
-                return CellValue(self.__cells[x + 1, y])
+                return CellValue(self.__getPaddedCell(x, y - 1))
             if i_direction == Direction.RIGHT:
-                return CellValue(self.__cells[x + 2, y + 1])
+                return CellValue(self.__getPaddedCell(x + 1, y))
             if i_direction == Direction.BOTTOM:
-                return CellValue(self.__cells[x + 1, y + 2])
-        # Return the value of the cell at the given coordinates (offset by border)
-        return CellValue(self.__cells[x + 1, y + 1])
+                return CellValue(self.__getPaddedCell(x, y + 1))
+        # Return the value of the cell at the given coordinates
+        return CellValue(self.__values[self.__storage.getCell(x, y)])
 
     def set_cell_value(self, input_x: int, input_y: int, value: CellValue) -> None:
         # Same here
         assert 0 <= input_x < self.__width, f"invalid cell x coordinate: {input_x}"
         assert 0 <= input_y < self.__height, f"invalid cell y coordinate: {input_y}"
-        self.__cells[input_x + 1, input_y + 1] = value
-    
-  
-    # Layer listener notification method
+        self.__setCell(input_x, input_y, self.encode(value))
+
+    def getNonDefaultCells(self, cellsBox: Tuple[int, int, int, int]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Get the coordinates and values (xs, ys, values) of the cells of a box that don't have the default value.
+
+        Sparse storages answer without scanning the empty cells of the box.
+        """
+        minX, maxX, minY, maxY = cellsBox
+        xs, ys, indices = self.__storage.findNonDefaultCells(minX, maxX, minY, maxY)
+        return xs, ys, self.__values[indices]
+
+    # Bulk access, the bounds are checked once per call
+    def __checkCells(self, i_xs: np.ndarray, i_ys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        xs, ys = np.asarray(i_xs, dtype=np.intp), np.asarray(i_ys, dtype=np.intp)
+        if xs.shape != ys.shape:
+            raise ValueError(f"Coordinates have different shapes: {xs.shape} and {ys.shape}")
+        if xs.size > 0:
+            if xs.min() < 0 or xs.max() >= self.__width:
+                raise ValueError(f"Invalid cell x coordinates in [{xs.min()}, {xs.max()}]")
+            if ys.min() < 0 or ys.max() >= self.__height:
+                raise ValueError(f"Invalid cell y coordinates in [{ys.min()}, {ys.max()}]")
+        return xs, ys
+
+    def __checkArea(self, i_minX: int, i_minY: int, i_shape: Tuple[int, ...]):
+        if len(i_shape) != 2:
+            raise ValueError(f"Expected a 2D array, got shape {i_shape}")
+        width, height = i_shape
+        if i_minX < 0 or i_minY < 0 or i_minX + width > self.__width or i_minY + height > self.__height:
+            raise ValueError(f"Invalid area of size {width}x{height} at ({i_minX}, {i_minY})")
+
+    def gatherValues(self, i_xs: np.ndarray, i_ys: np.ndarray) -> np.ndarray:
+        """Get the values of the cells at the coordinates (xs[i], ys[i])."""
+        xs, ys = self.__checkCells(i_xs, i_ys)
+        return self.__values[self.__storage.gather(xs, ys)]
+
+    def scatterValues(self, i_xs: np.ndarray, i_ys: np.ndarray, i_values):
+        """Set the values of the cells at the coordinates (xs[i], ys[i]), to a single value or an array of values."""
+        xs, ys = self.__checkCells(i_xs, i_ys)
+        values = np.asarray(i_values)
+        if values.ndim > 0 and values.shape != xs.shape:
+            raise ValueError(f"Expected {xs.shape} values, got {values.shape}")
+        if xs.size == 0:
+            return
+        indices = self.encodeArray(values)
+        # A cell written twice gets its last value, and indexes see a single change per cell
+        flat = xs * self.__height + ys
+        if not np.all(flat[1:] > flat[:-1]):
+            flat, lasts = np.unique(flat[::-1], return_index=True)
+            lasts = xs.size - 1 - lasts
+            xs, ys = xs[lasts], ys[lasts]
+            if indices.ndim > 0:
+                indices = indices[lasts]
+        self.__scatter(xs, ys, indices)
+        self.__removeClearedUnits(xs, ys)
+
+    def writeArea(self, i_minX: int, i_minY: int, i_values: np.ndarray):
+        """Set the values of the box starting at (minX, minY) from a 2D array of values."""
+        values = np.asarray(i_values)
+        self.__checkArea(i_minX, i_minY, values.shape)
+        if values.size == 0:
+            return
+        self.__checkWritable()
+        indices = self.encodeArray(values)
+        if self.__indexes:
+            width, height = indices.shape
+            oldIndices = self.__storage.readArea(i_minX, i_minX + width, i_minY, i_minY + height).copy()
+            self.__storage.writeArea(i_minX, i_minY, indices)
+            xs, ys = np.mgrid[i_minX:i_minX + width, i_minY:i_minY + height]
+            self.__notifyIndexes(xs.ravel(), ys.ravel(), oldIndices.ravel(), indices.ravel())
+        else:
+            self.__storage.writeArea(i_minX, i_minY, indices)
+        self.__removeClearedUnitsInMask(i_minX, i_minY, None, indices.shape)
+
+    def writeMask(self, i_minX: int, i_minY: int, i_mask: np.ndarray, i_value: CellValue):
+        """Set a value to the cells where a 2D boolean mask is True, the mask starting at (minX, minY)."""
+        mask = np.asarray(i_mask, dtype=bool)
+        self.__checkArea(i_minX, i_minY, mask.shape)
+        self.__checkWritable()
+        if not np.any(mask):
+            return
+        # Write the whole box, large masks would need large coordinates arrays
+        width, height = mask.shape
+        index = self.encode(i_value)
+        oldIndices = self.__storage.readArea(i_minX, i_minX + width, i_minY, i_minY + height)
+        newIndices = np.where(mask, np.uint8(index), oldIndices)
+        if not self.__indexes:
+            self.__storage.writeArea(i_minX, i_minY, newIndices)
+        else:
+            xs, ys = np.nonzero(mask)
+            oldMasked = oldIndices[xs, ys]  # Copied before the write, readArea() may return a view
+            self.__storage.writeArea(i_minX, i_minY, newIndices)
+            self.__notifyIndexes(xs + i_minX, ys + i_minY, oldMasked, np.full(xs.shape, index, dtype=np.uint8))
+        self.__removeClearedUnitsInMask(i_minX, i_minY, mask, mask.shape)
+
+    # All writes go through __setCell() or __scatter() (or writeArea()), so that indexes see every change
+    def __checkWritable(self):
+        if self.__readOnly:
+            raise ValueError("Can't write to a snapshot")
+
+    def __setCell(self, i_x: int, i_y: int, i_index: int):
+        self.__checkWritable()
+        if not self.__indexes:
+            self.__storage.setCell(i_x, i_y, i_index)
+            return
+        oldIndex = self.__storage.getCell(i_x, i_y)
+        self.__storage.setCell(i_x, i_y, i_index)
+        self.__notifyIndexes(np.array([i_x], dtype=np.intp), np.array([i_y], dtype=np.intp),
+                             np.array([oldIndex], dtype=np.uint8), np.array([i_index], dtype=np.uint8))
+
+    def __scatter(self, i_xs: np.ndarray, i_ys: np.ndarray, i_indices):
+        self.__checkWritable()
+        if not self.__indexes:
+            self.__storage.scatter(i_xs, i_ys, i_indices)
+            return
+        oldIndices = self.__storage.gather(i_xs, i_ys)
+        self.__storage.scatter(i_xs, i_ys, i_indices)
+        self.__notifyIndexes(i_xs, i_ys, oldIndices, np.broadcast_to(np.asarray(i_indices, dtype=np.uint8), i_xs.shape))
+
+    def __notifyIndexes(self, i_xs: np.ndarray, i_ys: np.ndarray, i_oldIndices: np.ndarray, i_newIndices: np.ndarray):
+        oldValues, newValues = self.__values[i_oldIndices], self.__values[i_newIndices]
+        for index in self.__indexes:
+            index.cellsWritten(self, i_xs, i_ys, oldValues, newValues)
+
+    def __removeClearedUnits(self, i_xs: Optional[np.ndarray] = None, i_ys: Optional[np.ndarray] = None):
+        """Forget the units whose cell was reset by a bulk write of the cells (xs, ys), None for any cell.
+        Units are only placed with setUnit(). The cells of the units are checked instead of the written
+        cells when there are fewer units, so the cost is at most the size of the write."""
+        if not self.__units:
+            return
+        if i_xs is None or i_xs.size >= len(self.__units):
+            coords = list(self.__units.keys())
+            xs, ys = np.array(coords, dtype=np.intp).T
+        else:
+            xs, ys = i_xs, i_ys
+        cleared = self.__storage.gather(xs, ys) == 0
+        for coords in zip(xs[cleared].tolist(), ys[cleared].tolist()):
+            if coords not in self.__units:
+                continue
+            unit = self.getUnit(coords)
+            del self.__units[coords]
+            unit.detach()
+            self.__notifyUnitChanged(coords, unit, None)
+
+    def __removeClearedUnitsInMask(self, i_minX: int, i_minY: int, i_mask: Optional[np.ndarray],
+                                   i_shape: Tuple[int, int]):
+        """Same as __removeClearedUnits() for the cells of a mask at (minX, minY), None for the whole box of a shape."""
+        if not self.__units:
+            return
+        width, height = i_shape
+        if width * height >= len(self.__units):
+            self.__removeClearedUnits()
+        elif i_mask is None:
+            xs, ys = np.mgrid[i_minX:i_minX + width, i_minY:i_minY + height]
+            self.__removeClearedUnits(xs.ravel(), ys.ravel())
+        else:
+            xs, ys = np.nonzero(i_mask)
+            self.__removeClearedUnits(xs + i_minX, ys + i_minY)
+
+    def __notifyUnitChanged(self, i_coords: Tuple[int, int], i_oldUnit: Optional[Unit], i_newUnit: Optional[Unit]):
+        for index in self.__indexes:
+            index.unitChanged(self, i_coords, i_oldUnit, i_newUnit)
+
+    def __getPaddedCell(self, i_x: int, i_y: int) -> int:
+        """Get a cell value, cells of the border around the layer have the default value."""
+        if 0 <= i_x < self.__width and 0 <= i_y < self.__height:
+            return self.__values[self.__storage.getCell(i_x, i_y)]
+        return self.__defaultValue
+
+    def flush(self):
+        """Write pending changes of file backed storages to disk."""
+        self.__storage.flush()
+
+    @property
+    def readOnly(self) -> bool:
+        return self.__readOnly
+
+    def snapshot(self) -> "Layer":
+        """Get a read-only copy of the layer, unaffected by later writes to this layer.
+
+        Chunked and sparse storages share their chunks with the snapshot until they are
+        written, other storages are copied. Snapshots have no listeners nor indexes,
+        and can be read from another thread.
+        """
+        snapshot = Layer(self.__width, self.__height, self.__defaultValue,
+                         self.__storage.snapshot(), None, self.values.tolist())
+        snapshot.__readOnly = True
+        snapshot.__unitStore = self.__unitStore.copy()
+        snapshot.__units = dict(self.__units)
+        return snapshot
+
+    # Indexes
+    def registerIndex(self, i_index: ILayerIndex):
+        """Register an index to be updated by every write."""
+        self.__indexes.append(i_index)
+
+    def removeIndex(self, i_index: ILayerIndex):
+        self.__indexes.remove(i_index)
+
+    def getSummedAreaTable(self, i_values: Iterable[int]) -> SummedAreaTable:
+        """Get a table that counts the cells with one of the values in any box, created on the first call."""
+        key = tuple(sorted(set(i_values)))
+        if key not in self.__summedAreaTables:
+            self.__summedAreaTables[key] = SummedAreaTable(self, key)
+        return self.__summedAreaTables[key]
+
+    def countValues(self, cellsBox: Tuple[int, int, int, int], i_values: Iterable[int]) -> int:
+        """Number of cells of a box that have one of the values, see getSummedAreaTable()."""
+        return self.getSummedAreaTable(i_values).count(cellsBox)
+
+    def getValueIndex(self) -> ValueIndex:
+        """Get the index of the cells of each value, created on the first call."""
+        if self.__valueIndex is None:
+            self.__valueIndex = ValueIndex(self)
+        return self.__valueIndex
+
+    def findCells(self, i_value: CellValue) -> Tuple[np.ndarray, np.ndarray]:
+        """Get the coordinates (xs, ys) of the cells with a value, see getValueIndex()."""
+        if i_value == self.__defaultValue:
+            raise ValueError("Cells with the default value are not indexed")
+        return self.getValueIndex().find(i_value)
+
+    def getUnitIndex(self) -> UnitIndex:
+        """Get the spatial index of the units of the layer, created on the first call."""
+        if self.__unitIndex is None:
+            self.__unitIndex = UnitIndex(self)
+        return self.__unitIndex
+
+    # Layer listener notification methods
     def notifyCellChanged(self, cell: Tuple[int, int]):
-        """Notify all listeners that a cell has changed."""
-        for listener in self.listeners:
-            listener.cellChanged(self, cell)
+        """Mark a cell as changed, listeners are notified by notifyPendingChanges()."""
+        if self.listeners:
+            self.__dirtyCells.append((cell[0], cell[1]))
+
+    def notifyCellsChanged(self, i_xs: np.ndarray, i_ys: np.ndarray):
+        """Mark the cells at the coordinates (xs[i], ys[i]) as changed."""
+        if self.listeners:
+            self.__dirtyBatches.append((np.asarray(i_xs, dtype=np.intp), np.asarray(i_ys, dtype=np.intp)))
+
+    def notifyAreaChanged(self, cellsBox: Tuple[int, int, int, int]):
+        """Mark all the cells of a box as changed."""
+        minX, maxX, minY, maxY = cellsBox
+        if minX < maxX and minY < maxY:
+            self.notifyMaskChanged(minX, minY, np.ones([maxX - minX, maxY - minY], dtype=bool))
+
+    def notifyMaskChanged(self, i_minX: int, i_minY: int, i_mask: np.ndarray):
+        """Mark the cells where a 2D boolean mask is True as changed, the mask starting at (minX, minY)."""
+        if self.listeners:
+            self.__dirtyMasks.append((i_minX, i_minY, np.asarray(i_mask, dtype=bool)))
+
+    @property
+    def hasPendingChanges(self) -> bool:
+        return bool(self.__dirtyCells or self.__dirtyBatches or self.__dirtyMasks)
+
+    def notifyPendingChanges(self):
+        """Notify all listeners of the cells changed since the last call.
+
+        Each listener gets one call per group of close changes, so distant changes do not share a huge box.
+        """
+        if not self.hasPendingChanges:
+            return
+        batches, masks = self.__dirtyBatches, self.__dirtyMasks
+        if self.__dirtyCells:
+            cells = np.array(self.__dirtyCells, dtype=np.intp)
+            batches.append((cells[:, 0], cells[:, 1]))
+        self.__dirtyCells = []
+        self.__dirtyBatches = []
+        self.__dirtyMasks = []
+        batches = [batch for batch in batches if batch[0].size > 0]
+        if not batches and not masks:
+            return
+
+        # Changes are grouped by chunks: close chunks share a box, distant ones get their own
+        width, height = self.__size
+        grid = np.zeros([-(-width // CHUNK_SIZE), -(-height // CHUNK_SIZE)], dtype=bool)
+        for xs, ys in batches:
+            grid[xs // CHUNK_SIZE, ys // CHUNK_SIZE] = True
+        for maskX, maskY, mask in masks:
+            grid[max(maskX, 0) // CHUNK_SIZE:-(-(maskX + mask.shape[0]) // CHUNK_SIZE),
+                 max(maskY, 0) // CHUNK_SIZE:-(-(maskY + mask.shape[1]) // CHUNK_SIZE)] = True
+        for chunkMinX, chunkMaxX, chunkMinY, chunkMaxY in findBoxes(grid):
+            minX, maxX = chunkMinX * CHUNK_SIZE, min(chunkMaxX * CHUNK_SIZE, width)
+            minY, maxY = chunkMinY * CHUNK_SIZE, min(chunkMaxY * CHUNK_SIZE, height)
+            mask = np.zeros([maxX - minX, maxY - minY], dtype=bool)
+            for xs, ys in batches:
+                inside = (xs >= minX) & (xs < maxX) & (ys >= minY) & (ys < maxY)
+                mask[xs[inside] - minX, ys[inside] - minY] = True
+            for maskX, maskY, dirtyMask in masks:
+                fromX, toX = max(maskX, minX), min(maskX + dirtyMask.shape[0], maxX)
+                fromY, toY = max(maskY, minY), min(maskY + dirtyMask.shape[1], maxY)
+                if fromX < toX and fromY < toY:
+                    mask[fromX - minX:toX - minX, fromY - minY:toY - minY] |= \
+                        dirtyMask[fromX - maskX:toX - maskX, fromY - maskY:toY - maskY]
+            # Boxes are cut down to the changed cells
+            xs, ys = np.flatnonzero(mask.any(axis=1)), np.flatnonzero(mask.any(axis=0))
+            if xs.size == 0:
+                continue
+            mask = mask[xs[0]:xs[-1] + 1, ys[0]:ys[-1] + 1]
+            cellsBox = (minX + int(xs[0]), minX + int(xs[-1]) + 1, minY + int(ys[0]), minY + int(ys[-1]) + 1)
+            for listener in list(self.listeners):
+                listener.cellsChanged(self, cellsBox, mask)
+
+    def maskArea(self, cellsBox: Tuple[int, int, int, int], i_values: Iterable[int]) -> np.ndarray:
+        """Same as cells[box] == value, for any of the values, computed on the stored indices."""
+        minX, maxX, minY, maxY = cellsBox
+        return np.isin(self.__storage.readArea(minX, maxX, minY, maxY), self.indicesOf(i_values))
 
     def getNeighbors4(self, cell: Tuple[int, int]) -> Tuple[int, int, int, int]:
         x, y = cell
-        return CellValue(self.__cells[x, y + 1]), \
-               CellValue(self.__cells[x + 1, y]), \
-               CellValue(self.__cells[x + 1, y + 2]), \
-               CellValue(self.__cells[x + 2, y + 1])
+        return CellValue(self.__getPaddedCell(x - 1, y)), \
+               CellValue(self.__getPaddedCell(x, y - 1)), \
+               CellValue(self.__getPaddedCell(x, y + 1)), \
+               CellValue(self.__getPaddedCell(x + 1, y))
 
     def getAllNeighbors4(self) -> np.ndarray:
         w, h = self.__size
-        top = self.__cells[1:w + 1, 0:h]
-        left = self.__cells[0:w, 1:h + 1]
-        right = self.__cells[2:w + 2, 1:h + 1]
-        bottom = self.__cells[1:w + 1, 2:h + 2]
-        return np.stack((left, top, bottom, right), axis=2)
+        return self.getAreaNeighbors4((0, w, 0, h))
 
     def getAreaNeighbors4(self, cellsBox: Tuple[int, int, int, int]) -> np.ndarray:
-        minX, maxX, minY, maxY = cellsBox
-        top = self.__cells[minX + 1:maxX + 1, minY:maxY]
-        left = self.__cells[minX:maxX, minY + 1:maxY + 1]
-        right = self.__cells[minX + 2:maxX + 2, minY + 1:maxY + 1]
-        bottom = self.__cells[minX + 1:maxX + 1, minY + 2:maxY + 2]
-        return np.stack((left, top, bottom, right), axis=2)
+        return self.__values[self.__stackNeighbors4(self.__readPaddedBox(cellsBox), cellsBox)]
+
+    def maskAreaNeighbors4(self, cellsBox: Tuple[int, int, int, int], i_values: Iterable[int]) -> np.ndarray:
+        """Same as getAreaNeighbors4() == value, for any of the values, computed on the stored indices."""
+        mask = np.isin(self.__readPaddedBox(cellsBox), self.indicesOf(i_values))
+        return self.__stackNeighbors4(mask, cellsBox)
 
     def getNeighbors8(self, cell: Tuple[int, int]) -> Tuple[int, int, int, int, int, int, int, int]:
         x, y = cell
-        n = np.delete(self.__cells[x:x + 3, y:y + 3].flatten(), 4)
+        n = np.delete(self.__storage.readPaddedArea(x - 1, x + 2, y - 1, y + 2).flatten(), 4)
+        n = self.__values[n]
         return CellValue(n[0]), CellValue(n[1]), CellValue(n[2]), CellValue(n[3]), \
                CellValue(n[4]), CellValue(n[5]), CellValue(n[6]), CellValue(n[7])
 
     def getAreaNeighbors8(self, cellsBox: Tuple[int, int, int, int]) -> np.ndarray:
-        minX, maxX, minY, maxY = cellsBox
-        topLeft = self.__cells[minX:maxX, minY:maxY]
-        top = self.__cells[minX + 1:maxX + 1, minY:maxY]
-        topRight = self.__cells[minX + 2:maxX + 2, minY:maxY]
-        left = self.__cells[minX:maxX, minY + 1:maxY + 1]
-        right = self.__cells[minX + 2:maxX + 2, minY + 1:maxY + 1]
-        bottomLeft = self.__cells[minX:maxX, minY + 2:maxY + 2]
-        bottom = self.__cells[minX + 1:maxX + 1, minY + 2:maxY + 2]
-        bottomRight = self.__cells[minX + 2:maxX + 2, minY + 2:maxY + 2]
-        return np.stack((topLeft, left, bottomLeft, top,
-                         bottom, topRight, right, bottomRight), axis=2)
+        return self.__values[self.__stackNeighbors8(self.__readPaddedBox(cellsBox), cellsBox)]
+
+    def maskAreaNeighbors8(self, cellsBox: Tuple[int, int, int, int], i_values: Iterable[int]) -> np.ndarray:
+        """Same as getAreaNeighbors8() == value, for any of the values, computed on the stored indices."""
+        mask = np.isin(self.__readPaddedBox(cellsBox), self.indicesOf(i_values))
+        return self.__stackNeighbors8(mask, cellsBox)
 
     def getAllNeighbors8(self) -> np.ndarray:
         w, h = self.__size
-        topLeft = self.__cells[0:w, 0:h]
-        top = self.__cells[1:w + 1, 0:h]
-        topRight = self.__cells[2:w + 2, 0:h]
-        left = self.__cells[0:w, 1:h + 1]
-        right = self.__cells[2:w + 2, 1:h + 1]
-        bottomLeft = self.__cells[0:w, 2:h + 2]
-        bottom = self.__cells[1:w + 1, 2:h + 2]
-        bottomRight = self.__cells[2:w + 2, 2:h + 2]
+        return self.getAreaNeighbors8((0, w, 0, h))
+
+    def __readPaddedBox(self, cellsBox: Tuple[int, int, int, int]) -> np.ndarray:
+        """Read the indices of a box with its 1-cell border, at once so the storage can assemble it across chunks."""
+        minX, maxX, minY, maxY = cellsBox
+        return self.__storage.readPaddedArea(minX - 1, maxX + 1, minY - 1, maxY + 1)
+
+    @staticmethod
+    def __stackNeighbors4(cells: np.ndarray, cellsBox: Tuple[int, int, int, int]) -> np.ndarray:
+        minX, maxX, minY, maxY = cellsBox
+        w, h = maxX - minX, maxY - minY
+        top = cells[1:w + 1, 0:h]
+        left = cells[0:w, 1:h + 1]
+        right = cells[2:w + 2, 1:h + 1]
+        bottom = cells[1:w + 1, 2:h + 2]
+        return np.stack((left, top, bottom, right), axis=2)
+
+    @staticmethod
+    def __stackNeighbors8(cells: np.ndarray, cellsBox: Tuple[int, int, int, int]) -> np.ndarray:
+        minX, maxX, minY, maxY = cellsBox
+        w, h = maxX - minX, maxY - minY
+        topLeft = cells[0:w, 0:h]
+        top = cells[1:w + 1, 0:h]
+        topRight = cells[2:w + 2, 0:h]
+        left = cells[0:w, 1:h + 1]
+        right = cells[2:w + 2, 1:h + 1]
+        bottomLeft = cells[0:w, 2:h + 2]
+        bottom = cells[1:w + 1, 2:h + 2]
+        bottomRight = cells[2:w + 2, 2:h + 2]
         return np.stack((topLeft, left, bottomLeft, top,
                          bottom, topRight, right, bottomRight), axis=2)
     
     # Units
+    @property
+    def units(self) -> Iterator[Tuple[Tuple[int, int], Unit]]:
+        """Iterate over the placed units, as (coords, unit)."""
+        for coords in list(self.__units.keys()):
+            yield coords, self.getUnit(coords)
+
     def getUnit(self, coords: Tuple[int, int]) -> Optional[Unit]:
         """Get unit at the specified coordinates"""
-        if coords not in self.__units:
+        slot = self.__units.get(coords)
+        if slot is None:
             return None
-        return self.__units[coords]
+        unit = self.__unitStore.getHandle(slot)
+        if unit is None:  # Snapshots bind units to their slots on demand
+            unit = Unit.fromSlot(self.__unitStore, slot)
+            self.__unitStore.setHandle(slot, unit)
+        return unit
 
     def setUnit(self, coords: Tuple[int, int], value: CellValue, unit: Optional[Unit] = None):
         """Set or remove a unit at the specified coordinates"""
         x, y = coords[0], coords[1]
         assert 0 <= x < self.__width, f"Invalid x={x}"
         assert 0 <= y < self.__height, f"Invalid y={y}"
-        if value == CellValue.NONE or unit is None:
-            self.__cells[x + 1, y + 1] = CellValue.NONE
-            if coords in self.__units:
-                del self.__units[coords]
+        coords = (x, y)
+        self.__checkWritable()
+        removing = value == CellValue.NONE or unit is None
+        previousUnit = self.getUnit(coords)
+        self.__units.pop(coords, None)
+        if previousUnit is not None and (removing or previousUnit is not unit):
+            previousUnit.detach()
+        if removing:
+            self.__setCell(x, y, self.encode(CellValue.NONE))
         else:
-            self.__cells[x + 1, y + 1] = value
-            self.__units[coords] = unit
+            if unit.store is self.__unitStore and unit.coords not in (None, coords):
+                unit = unit.copy()  # Already placed on another cell
+            unit.moveTo(self.__unitStore)
+            self.__unitStore.setCoords(unit.slot, coords)
+            self.__setCell(x, y, self.encode(value))
+            self.__units[coords] = unit.slot
+        newUnit = self.getUnit(coords)
+        if previousUnit is not None or newUnit is not None:
+            self.__notifyUnitChanged(coords, previousUnit, newUnit)
@@ -0,0 +1,59 @@
+from typing import Tuple, Union
+
+import numpy as np
+
+from .storage import LayerStorage
+
+
+class LayerCells:
+    """Read-only, array-like access to the cell values of a layer storage.
+
+    Slicing with [x, y] returns a numpy array of cell values (or a single value), so code
+    written for a dense cells array keeps working whatever the storage backend is.
+    Stored indices are converted to cell values with the layer's table of values.
+    """
+
+    def __init__(self, i_storage: LayerStorage, i_values: np.ndarray):
+        self.__storage = i_storage
+        self.__values = i_values
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.__storage.width, self.__storage.height
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self.__values.dtype
+
+    def __len__(self) -> int:
+        return self.__storage.width
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        area = self.__storage.readArea(0, self.__storage.width, 0, self.__storage.height)
+        return np.asarray(self.__values[area], dtype=dtype)
+
+    @staticmethod
+    def __range(i_key: Union[int, slice], i_length: int) -> Tuple[int, int, Union[int, slice]]:
+        """Convert an index into a (min, max) range to read and the index to apply to it."""
+        if isinstance(i_key, slice):
+            start, stop, step = i_key.indices(i_length)
+            if step == 1:
+                return start, max(start, stop), slice(None)
+            return 0, i_length, i_key
+        index = int(i_key)
+        if index < 0:
+            index += i_length
+        if not 0 <= index < i_length:
+            raise IndexError(f"index {i_key} is out of bounds for size {i_length}")
+        return index, index + 1, 0
+
+    def __getitem__(self, i_key) -> Union[np.ndarray, int]:
+        if not isinstance(i_key, tuple):
+            i_key = (i_key, slice(None))
+        if len(i_key) != 2:
+            raise IndexError("cells only support [x, y] indexing")
+        minX, maxX, keyX = self.__range(i_key[0], self.__storage.width)
+        minY, maxY, keyY = self.__range(i_key[1], self.__storage.height)
+        if minX == maxX or minY == maxY:
+            return np.empty([maxX - minX, maxY - minY], dtype=self.__values.dtype)[keyX, keyY]
+        return self.__values[self.__storage.readArea(minX, maxX, minY, maxY)[keyX, keyY]]
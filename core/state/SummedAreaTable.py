@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Tuple, Iterable, Set
+
+import numpy as np
+
+from .ILayerIndex import ILayerIndex
+from .storage import CHUNK_SIZE
+
+if TYPE_CHECKING:
+    from .Layer import Layer
+
+
+class SummedAreaTable(ILayerIndex):
+    """Counts the cells of a layer that have one of the given values, in any box, in constant time.
+
+    The layer is split in blocks of blockSize x blockSize cells, each with its own summed-area table.
+    The totals of the blocks are summed along x, along y and over both, so the count of the box
+    (0, x, 0, y) adds at most four values. Writes only mark their blocks as outdated: a count
+    recomputes the outdated blocks and the sums of their block columns and rows.
+    """
+
+    def __init__(self, i_layer: Layer, i_values: Iterable[int], i_blockSize: int = CHUNK_SIZE):
+        self.__layer = i_layer
+        self.__values = np.array(sorted(set(i_values)))
+        self.__blockSize = i_blockSize
+        width, height = i_layer.size
+        blocksX, blocksY = -(-width // i_blockSize), -(-height // i_blockSize)
+        self.__blocksSize = (blocksX, blocksY)
+        dtype = np.int32 if width * height < 2 ** 31 else np.int64
+        # Counts of the boxes from the corner of the block of each cell to the cell (included)
+        self.__blocks = np.zeros([width, height], dtype=np.int16 if i_blockSize <= 128 else np.int32)
+        # Counts of the boxes from x = 0 or y = 0 to the blocks: column sums [x, j] count the block
+        # column of x above the block row j, row sums [i, y] count the block row of y left of the
+        # block column i, and block sums [i, j] count the blocks before (i, j)
+        self.__columnSums = np.zeros([width, blocksY + 1], dtype=dtype)
+        self.__rowSums = np.zeros([blocksX + 1, height], dtype=dtype)
+        self.__blockSums = np.zeros([blocksX + 1, blocksY + 1], dtype=dtype)
+        # Last x and y of each block column and row
+        self.__lastXs = np.minimum(np.arange(1, blocksX + 1) * i_blockSize, width) - 1
+        self.__lastYs = np.minimum(np.arange(1, blocksY + 1) * i_blockSize, height) - 1
+        # Outdated blocks, as (blockX, blockY)
+        self.__dirtyBlocks: Set[Tuple[int, int]] = {(i, j) for i in range(blocksX) for j in range(blocksY)}
+        i_layer.registerIndex(self)
+
+    @property
+    def values(self) -> np.ndarray:
+        return self.__values
+
+    def dispose(self):
+        self.__layer.removeIndex(self)
+
+    def count(self, cellsBox: Tuple[int, int, int, int]) -> int:
+        """Number of cells of the (minX, maxX, minY, maxY) box that have one of the values."""
+        minX, maxX, minY, maxY = cellsBox
+        width, height = self.__layer.size
+        minX, maxX = max(minX, 0), min(maxX, width)
+        minY, maxY = max(minY, 0), min(maxY, height)
+        if minX >= maxX or minY >= maxY:
+            return 0
+        if self.__dirtyBlocks:
+            self.__refresh()
+        return self.__countTo(maxX, maxY) - self.__countTo(minX, maxY) - self.__countTo(maxX, minY) \
+            + self.__countTo(minX, minY)
+
+    def fraction(self, cellsBox: Tuple[int, int, int, int]) -> float:
+        """Fraction of the cells of the box that have one of the values."""
+        minX, maxX, minY, maxY = cellsBox
+        area = (maxX - minX) * (maxY - minY)
+        if area <= 0:
+            return 0.0
+        return self.count(cellsBox) / area
+
+    def __countTo(self, i_x: int, i_y: int) -> int:
+        """Number of matching cells in the box (0, x, 0, y)."""
+        blockX, restX = divmod(i_x, self.__blockSize)
+        blockY, restY = divmod(i_y, self.__blockSize)
+        count = int(self.__blockSums[blockX, blockY])
+        if restX > 0:
+            count += int(self.__columnSums[i_x - 1, blockY])
+        if restY > 0:
+            count += int(self.__rowSums[blockX, i_y - 1])
+        if restX > 0 and restY > 0:
+            count += int(self.__blocks[i_x - 1, i_y - 1])
+        return count
+
+    def __refresh(self):
+        """Recompute the outdated blocks, then the sums of their block columns and rows, and the block sums."""
+        size = self.__blockSize
+        width, height = self.__layer.size
+        blocks = self.__blocks
+        columns = {}
+        for blockX, blockY in self.__dirtyBlocks:
+            columns.setdefault(blockX, []).append(blockY)
+        dirtyRows = {blockY for _, blockY in self.__dirtyBlocks}
+        self.__dirtyBlocks = set()
+
+        for blockX, blockYs in columns.items():
+            minX, maxX = blockX * size, min((blockX + 1) * size, width)
+            # Consecutive outdated blocks of the column are read at once
+            blockYs = np.sort(np.array(blockYs))
+            for run in np.split(blockYs, np.flatnonzero(np.diff(blockYs) != 1) + 1):
+                minY, maxY = int(run[0]) * size, min((int(run[-1]) + 1) * size, height)
+                padded = np.zeros([maxX - minX, len(run) * size], dtype=blocks.dtype)
+                padded[:, :maxY - minY] = self.__layer.maskArea((minX, maxX, minY, maxY), self.__values)
+                sums = padded.reshape([maxX - minX, len(run), size])
+                sums = np.cumsum(np.cumsum(sums, axis=2, dtype=blocks.dtype), axis=0, dtype=blocks.dtype)
+                blocks[minX:maxX, minY:maxY] = sums.reshape([maxX - minX, len(run) * size])[:, :maxY - minY]
+            self.__columnSums[minX:maxX, 1:] = np.cumsum(blocks[minX:maxX, self.__lastYs], axis=1)
+
+        for blockY in dirtyRows:
+            minY, maxY = blockY * size, min((blockY + 1) * size, height)
+            self.__rowSums[1:, minY:maxY] = np.cumsum(blocks[self.__lastXs, minY:maxY], axis=0)
+        totals = blocks[np.ix_(self.__lastXs, self.__lastYs)]
+        self.__blockSums[1:, 1:] = np.cumsum(np.cumsum(totals, axis=0, dtype=self.__blockSums.dtype), axis=1)
+
+    # ILayerIndex
+    def cellsWritten(self, i_layer: Layer, i_xs: np.ndarray, i_ys: np.ndarray,
+                     i_oldValues: np.ndarray, i_newValues: np.ndarray):
+        changed = np.isin(i_oldValues, self.__values) != np.isin(i_newValues, self.__values)
+        if not np.any(changed):
+            return
+        blocksY = self.__blocksSize[1]
+        keys = np.unique(i_xs[changed] // self.__blockSize * blocksY + i_ys[changed] // self.__blockSize)
+        blockXs, blockYs = np.divmod(keys, blocksY)
+        self.__dirtyBlocks.update(zip(blockXs.tolist(), blockYs.tolist()))
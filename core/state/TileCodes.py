@@ -0,0 +1,75 @@
+from typing import Tuple, Dict, List
+
+import numpy as np
+
+from .ILayerIndex import ILayerIndex
+from .Layer import Layer
+from tools.tilecodes import code4np, code8np
+
+
+class TileCodes(ILayerIndex):
+    """Autotile codes of all the cells of a world, kept up to date as layers are written.
+
+    The code of a cell combines its 4 or 8 neighbors that have one of the given values,
+    in any of the given layers. Writes only update the codes around the written cells,
+    so renderers can read the codes of the visible area as a slice.
+    """
+
+    def __init__(self, i_layers: Dict[Layer, List[int]], i_connectivity: int):
+        if i_connectivity not in (4, 8):
+            raise ValueError(f"Invalid connectivity {i_connectivity}, expected 4 or 8")
+        self.__layers = {layer: np.array(values) for layer, values in i_layers.items()}
+        self.__connectivity = i_connectivity
+        layer = next(iter(self.__layers))
+        self.__width, self.__height = layer.size
+        self.__codes = np.zeros([self.__width, self.__height], dtype=np.uint8)
+        # Compute all codes, by strips to limit the size of the temporary arrays
+        for minX in range(0, self.__width, 256):
+            self.__update((minX, min(minX + 256, self.__width), 0, self.__height))
+        for layer in self.__layers:
+            layer.registerIndex(self)
+
+    @property
+    def connectivity(self) -> int:
+        return self.__connectivity
+
+    @property
+    def codes(self) -> np.ndarray:
+        """Get the codes of all cells. The result must not be modified."""
+        return self.__codes
+
+    def dispose(self):
+        for layer in self.__layers:
+            layer.removeIndex(self)
+
+    def __update(self, cellsBox: Tuple[int, int, int, int]):
+        """Compute the codes of the cells of a box."""
+        minX, maxX, minY, maxY = cellsBox
+        masks = None
+        for layer, values in self.__layers.items():
+            if self.__connectivity == 4:
+                layerMasks = layer.maskAreaNeighbors4(cellsBox, values)
+            else:
+                layerMasks = layer.maskAreaNeighbors8(cellsBox, values)
+            masks = layerMasks if masks is None else masks | layerMasks
+        codes = code4np(masks) if self.__connectivity == 4 else code8np(masks)
+        self.__codes[minX:maxX, minY:maxY] = codes
+
+    # ILayerIndex
+    def cellsWritten(self, i_layer: Layer, i_xs: np.ndarray, i_ys: np.ndarray,
+                     i_oldValues: np.ndarray, i_newValues: np.ndarray):
+        values = self.__layers[i_layer]
+        # Codes only change around the cells that entered or left the values
+        changed = np.isin(i_oldValues, values) != np.isin(i_newValues, values)
+        xs, ys = i_xs[changed], i_ys[changed]
+        if xs.size == 0:
+            return
+        width, height = self.__width, self.__height
+        minX, maxX = max(int(xs.min()) - 1, 0), min(int(xs.max()) + 2, width)
+        minY, maxY = max(int(ys.min()) - 1, 0), min(int(ys.max()) + 2, height)
+        if (maxX - minX) * (maxY - minY) <= 9 * xs.size:
+            self.__update((minX, maxX, minY, maxY))
+            return
+        # Scattered cells: update the 3x3 neighborhood of each cell
+        for x, y in zip(xs.tolist(), ys.tolist()):
+            self.__update((max(x - 1, 0), min(x + 2, width), max(y - 1, 0), min(y + 2, height)))
@@ -1,35 +1,96 @@
-import copy
+from __future__ import annotations
 
-from core.constants import UnitClass, UnitProperties, UnitProperty
+from typing import Optional, Tuple
+
+from core.constants import UnitClass, UnitProperty
+from . import UnitStore as unitStoreModule
+from .UnitStore import UnitStore, stagingStore
 
 
 class Unit:
-    """Represents a game unit with properties and player ownership"""
+    """Represents a game unit with properties and player ownership.
+
+    A unit is a handle to a slot of a UnitStore. A new unit has a slot of the shared staging
+    store, and moves to the store of the units layer when it is placed. The staging slot of
+    a unit is released with the unit.
+    """
+
+    # True if the unit owns a slot of the staging store
+    __staged = False
+
+    def __init__(self, unitClass: UnitClass, playerId: int = 0, store: Optional[UnitStore] = None):
+        self.__store = store if store is not None else stagingStore
+        staged = self.__store is stagingStore
+        self.__slot = self.__store.create(unitClass, playerId, None if staged else self)
+        self.__staged = staged
+
+    def __del__(self):
+        if self.__staged and unitStoreModule.stagingStore is not None:
+            self.__store.release(self.__slot)
+
+    @staticmethod
+    def fromSlot(i_store: UnitStore, i_slot: int) -> Unit:
+        """Get a new handle to an existing slot of a store."""
+        unit = Unit.__new__(Unit)
+        unit.__store = i_store
+        unit.__slot = i_slot
+        return unit
+
+    @property
+    def store(self) -> UnitStore:
+        return self.__store
+
+    @property
+    def slot(self) -> int:
+        return self.__slot
 
-    def __init__(self, unitClass: UnitClass, playerId: int = 0):
-        self.__playerId = playerId
-        self.__unitClass = unitClass
-        if unitClass not in UnitProperties:
-            raise ValueError(f"Invalid class {unitClass}")
-        self.__properties = copy.deepcopy(UnitProperties[unitClass])
+    @property
+    def coords(self) -> Optional[Tuple[int, int]]:
+        """Cell of the unit, None if it is not placed."""
+        x = int(self.__store.xs[self.__slot])
+        if x < 0:
+            return None
+        return x, int(self.__store.ys[self.__slot])
 
     @property
     def playerId(self) -> int:
-        return self.__playerId
+        return int(self.__store.playerIds[self.__slot])
 
     @playerId.setter
     def playerId(self, playerId: int):
-        self.__playerId = playerId
+        self.__store.playerIds[self.__slot] = playerId
 
     @property
     def unitClass(self) -> UnitClass:
-        return self.__unitClass
+        return UnitClass(self.__store.unitClasses[self.__slot])
 
     def hasProperty(self, property: UnitProperty) -> bool:
-        return property in self.__properties
+        return bool(self.__store.getFlags(property)[self.__slot])
 
     def setProperty(self, property: UnitProperty, value: int):
-        self.__properties[property] = value
+        self.__store.setProperty(self.__slot, property, value)
 
     def getProperty(self, property: UnitProperty) -> int:
-        return self.__properties[property]
+        if not self.hasProperty(property):
+            raise KeyError(property)
+        return int(self.__store.getColumn(property)[self.__slot])
+
+    def moveTo(self, i_store: UnitStore):
+        """Move the data of the unit to another store. The unit is no longer placed."""
+        if i_store is self.__store:
+            return
+        staged = i_store is stagingStore
+        slot = i_store.copyFrom(self.__store, self.__slot, None if staged else self)
+        self.__store.release(self.__slot)
+        self.__store, self.__slot, self.__staged = i_store, slot, staged
+
+    def detach(self):
+        """Move the unit to the staging store, when it is removed from its cell."""
+        self.moveTo(stagingStore)
+
+    def copy(self) -> Unit:
+        """Get a new unit with the same class, player and properties, in the same store."""
+        unit = Unit.fromSlot(self.__store, -1)
+        unit.__staged = self.__store is stagingStore
+        unit.__slot = self.__store.copyFrom(self.__store, self.__slot, None if unit.__staged else unit)
+        return unit
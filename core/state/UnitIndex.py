@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import heapq
+import math
+from typing import TYPE_CHECKING, Tuple, Optional, Dict, List, Iterator
+
+from .ILayerIndex import ILayerIndex
+
+if TYPE_CHECKING:
+    from .Layer import Layer
+    from .Unit import Unit
+
+
+class UnitIndex(ILayerIndex):
+    """Spatial index of the units of a layer, in a grid of buckets.
+
+    Box and radius queries only visit the buckets they overlap, nearest queries visit
+    rings of buckets around the cell. Players are read from the units when queried,
+    so changing the player of a unit doesn't need to update the index.
+    """
+
+    def __init__(self, i_layer: Layer, i_bucketSize: int = 16):
+        self.__layer = i_layer
+        self.__bucketSize = i_bucketSize
+        # (bucketX, bucketY) -> coords -> unit
+        self.__buckets: Dict[Tuple[int, int], Dict[Tuple[int, int], Unit]] = {}
+        for coords, unit in i_layer.units:
+            self.__add(coords, unit)
+        i_layer.registerIndex(self)
+
+    def dispose(self):
+        self.__layer.removeIndex(self)
+
+    def __add(self, i_coords: Tuple[int, int], i_unit: Unit):
+        size = self.__bucketSize
+        key = (i_coords[0] // size, i_coords[1] // size)
+        self.__buckets.setdefault(key, {})[i_coords] = i_unit
+
+    def __remove(self, i_coords: Tuple[int, int]):
+        size = self.__bucketSize
+        key = (i_coords[0] // size, i_coords[1] // size)
+        bucket = self.__buckets.get(key)
+        if bucket is not None:
+            bucket.pop(i_coords, None)
+            if not bucket:
+                del self.__buckets[key]
+
+    @staticmethod
+    def __matches(i_unit: Unit, i_playerId: Optional[int], i_enemyOf: Optional[int]) -> bool:
+        if i_playerId is not None and i_unit.playerId != i_playerId:
+            return False
+        if i_enemyOf is not None and i_unit.playerId == i_enemyOf:
+            return False
+        return True
+
+    def unitsOf(self, i_playerId: int) -> List[Unit]:
+        """Get the units of a player."""
+        store = self.__layer.unitStore
+        slots = store.select(i_playerId=i_playerId)
+        coords = zip(store.xs[slots].tolist(), store.ys[slots].tolist())
+        return [self.__layer.getUnit(cell) for cell in coords]
+
+    def inBox(self, cellsBox: Tuple[int, int, int, int], i_playerId: Optional[int] = None,
+              i_enemyOf: Optional[int] = None) -> Iterator[Tuple[Tuple[int, int], Unit]]:
+        """Iterate over the units in a (minX, maxX, minY, maxY) box, as (coords, unit).
+
+        Units can be filtered by player, or to the units of all players but one (enemies).
+        """
+        minX, maxX, minY, maxY = cellsBox
+        size = self.__bucketSize
+        for bucketX in range(max(minX, 0) // size, (maxX - 1) // size + 1):
+            for bucketY in range(max(minY, 0) // size, (maxY - 1) // size + 1):
+                bucket = self.__buckets.get((bucketX, bucketY))
+                if bucket is None:
+                    continue
+                for (x, y), unit in bucket.items():
+                    if minX <= x < maxX and minY <= y < maxY and self.__matches(unit, i_playerId, i_enemyOf):
+                        yield (x, y), unit
+
+    def inRadius(self, i_cell: Tuple[int, int], i_radius: float, i_playerId: Optional[int] = None,
+                 i_enemyOf: Optional[int] = None) -> Iterator[Tuple[Tuple[int, int], Unit]]:
+        """Iterate over the units at an euclidean distance of at most radius from a cell, as (coords, unit)."""
+        cellX, cellY = i_cell
+        reach = int(math.floor(i_radius))
+        cellsBox = (cellX - reach, cellX + reach + 1, cellY - reach, cellY + reach + 1)
+        radius2 = i_radius * i_radius
+        for (x, y), unit in self.inBox(cellsBox, i_playerId, i_enemyOf):
+            if (x - cellX) ** 2 + (y - cellY) ** 2 <= radius2:
+                yield (x, y), unit
+
+    def nearest(self, i_cell: Tuple[int, int], i_count: int = 1, i_playerId: Optional[int] = None,
+                i_enemyOf: Optional[int] = None) -> List[Tuple[Tuple[int, int], Unit]]:
+        """Get the count closest units to a cell (euclidean distance), closest first, as (coords, unit)."""
+        if i_count <= 0 or not self.__buckets:
+            return []
+        size = self.__bucketSize
+        cellX, cellY = i_cell
+        bucketX, bucketY = cellX // size, cellY // size
+        keys = self.__buckets.keys()
+        maxRing = max(max(abs(x - bucketX), abs(y - bucketY)) for x, y in keys)
+        # Heap of the best candidates, as (-distance, order, coords, unit)
+        best: List[Tuple[float, int, Tuple[int, int], Unit]] = []
+        order = 0
+        for ring in range(maxRing + 1):
+            for key in self.__ringBuckets(bucketX, bucketY, ring):
+                for (x, y), unit in self.__buckets.get(key, {}).items():
+                    if not self.__matches(unit, i_playerId, i_enemyOf):
+                        continue
+                    distance = math.hypot(x - cellX, y - cellY)
+                    order += 1
+                    if len(best) < i_count:
+                        heapq.heappush(best, (-distance, order, (x, y), unit))
+                    elif distance < -best[0][0]:
+                        heapq.heapreplace(best, (-distance, order, (x, y), unit))
+            # Units of the next rings are at least ring * size away
+            if len(best) == i_count and -best[0][0] <= ring * size:
+                break
+        best.sort(key=lambda item: (-item[0], item[1]))
+        return [(coords, unit) for _, _, coords, unit in best]
+
+    @staticmethod
+    def __ringBuckets(i_bucketX: int, i_bucketY: int, i_ring: int) -> Iterator[Tuple[int, int]]:
+        """Iterate over the buckets at a chebyshev distance of ring buckets."""
+        if i_ring == 0:
+            yield i_bucketX, i_bucketY
+            return
+        for dx in range(-i_ring, i_ring + 1):
+            yield i_bucketX + dx, i_bucketY - i_ring
+            yield i_bucketX + dx, i_bucketY + i_ring
+        for dy in range(-i_ring + 1, i_ring):
+            yield i_bucketX - i_ring, i_bucketY + dy
+            yield i_bucketX + i_ring, i_bucketY + dy
+
+    # ILayerIndex
+    def unitChanged(self, i_layer: Layer, i_coords: Tuple[int, int],
+                    i_oldUnit: Optional[Unit], i_newUnit: Optional[Unit]):
+        if i_oldUnit is not None:
+            self.__remove(i_coords)
+        if i_newUnit is not None:
+            self.__add(i_coords, i_newUnit)
@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.constants import UnitClass, UnitProperties, UnitProperty
+
+if TYPE_CHECKING:
+    from .Unit import Unit
+
+# Number of property columns, indexed by UnitProperty
+PROPERTY_COUNT = max(UnitProperty) + 1
+
+
+def createClassTables() -> Tuple[np.ndarray, np.ndarray]:
+    """Get the initial property values and the property flags of each unit class, indexed by UnitClass."""
+    classCount = max(UnitClass) + 1
+    values = np.zeros([classCount, PROPERTY_COUNT], dtype=np.int32)
+    flags = np.zeros([classCount, PROPERTY_COUNT], dtype=bool)
+    for unitClass, properties in UnitProperties.items():
+        for unitProperty, value in properties.items():
+            values[unitClass, unitProperty] = value
+            flags[unitClass, unitProperty] = True
+    return values, flags
+
+
+classValues, classFlags = createClassTables()
+
+
+class UnitStore:
+    """Stores the data of units in columns, one row (slot) per unit.
+
+    Units are handles to a slot, and batch operations work on arrays of slots. Slots of
+    removed units are reused. Cells coordinates are -1 for units that are not placed.
+    """
+
+    def __init__(self, i_capacity: int = 64):
+        self.__capacity = 0
+        self.__count = 0
+        self.__freeSlots: List[int] = []
+        self.__handles: List[Optional[Unit]] = []
+        self.__alive = np.zeros([0], dtype=bool)
+        self.__xs = np.zeros([0], dtype=np.int32)
+        self.__ys = np.zeros([0], dtype=np.int32)
+        self.__playerIds = np.zeros([0], dtype=np.int16)
+        self.__unitClasses = np.zeros([0], dtype=np.int8)
+        self.__properties = np.zeros([0, PROPERTY_COUNT], dtype=np.int32)
+        self.__flags = np.zeros([0, PROPERTY_COUNT], dtype=bool)
+        self.__grow(max(i_capacity, 1))
+
+    def __grow(self, i_capacity: int):
+        oldCapacity = self.__capacity
+
+        def resize(i_array: np.ndarray, i_fill) -> np.ndarray:
+            array = np.full((i_capacity,) + i_array.shape[1:], i_fill, dtype=i_array.dtype)
+            array[:oldCapacity] = i_array
+            return array
+
+        self.__alive = resize(self.__alive, False)
+        self.__xs = resize(self.__xs, -1)
+        self.__ys = resize(self.__ys, -1)
+        self.__playerIds = resize(self.__playerIds, 0)
+        self.__unitClasses = resize(self.__unitClasses, UnitClass.NONE)
+        self.__properties = resize(self.__properties, 0)
+        self.__flags = resize(self.__flags, False)
+        self.__handles.extend([None] * (i_capacity - oldCapacity))
+        # Lowest slots are reused first
+        self.__freeSlots.extend(range(i_capacity - 1, oldCapacity - 1, -1))
+        self.__capacity = i_capacity
+
+    # Getter properties
+    @property
+    def capacity(self) -> int:
+        return self.__capacity
+
+    @property
+    def count(self) -> int:
+        """Number of units in the store."""
+        return self.__count
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the columns."""
+        return sum(column.nbytes for column in [
+            self.__alive, self.__xs, self.__ys, self.__playerIds, self.__unitClasses, self.__properties, self.__flags
+        ])
+
+    # Columns, indexed by slot. Only the slots of alive units are meaningful.
+    @property
+    def alive(self) -> np.ndarray:
+        return self.__alive
+
+    @property
+    def xs(self) -> np.ndarray:
+        return self.__xs
+
+    @property
+    def ys(self) -> np.ndarray:
+        return self.__ys
+
+    @property
+    def playerIds(self) -> np.ndarray:
+        return self.__playerIds
+
+    @property
+    def unitClasses(self) -> np.ndarray:
+        return self.__unitClasses
+
+    def getColumn(self, i_property: UnitProperty) -> np.ndarray:
+        """Get the values of a property for all slots, as a view that can be modified."""
+        return self.__properties[:, i_property]
+
+    def getFlags(self, i_property: UnitProperty) -> np.ndarray:
+        """Get which slots have a property."""
+        return self.__flags[:, i_property]
+
+    # Slots
+    def create(self, i_unitClass: UnitClass, i_playerId: int, i_handle: Unit) -> int:
+        """Add a unit with the initial properties of its class, returns its slot."""
+        if i_unitClass not in UnitProperties:
+            raise ValueError(f"Invalid class {i_unitClass}")
+        slot = self.__allocate(i_handle)
+        self.__playerIds[slot] = i_playerId
+        self.__unitClasses[slot] = i_unitClass
+        self.__properties[slot] = classValues[i_unitClass]
+        self.__flags[slot] = classFlags[i_unitClass]
+        return slot
+
+    def copyFrom(self, i_store: UnitStore, i_slot: int, i_handle: Unit) -> int:
+        """Add a copy of a unit of a store (possibly this one), returns its slot. The copy is not placed."""
+        slot = self.__allocate(i_handle)
+        self.__playerIds[slot] = i_store.__playerIds[i_slot]
+        self.__unitClasses[slot] = i_store.__unitClasses[i_slot]
+        self.__properties[slot] = i_store.__properties[i_slot]
+        self.__flags[slot] = i_store.__flags[i_slot]
+        return slot
+
+    def __allocate(self, i_handle: Unit) -> int:
+        if not self.__freeSlots:
+            self.__grow(self.__capacity * 2)
+        slot = self.__freeSlots.pop()
+        self.__alive[slot] = True
+        self.__xs[slot] = -1
+        self.__ys[slot] = -1
+        self.__handles[slot] = i_handle
+        self.__count += 1
+        return slot
+
+    def release(self, i_slot: int):
+        """Remove a unit, its slot can be reused."""
+        assert self.__alive[i_slot], f"Slot {i_slot} is not used"
+        self.__alive[i_slot] = False
+        self.__handles[i_slot] = None
+        self.__freeSlots.append(i_slot)
+        self.__count -= 1
+
+    def getHandle(self, i_slot: int) -> Optional[Unit]:
+        """Get the unit of a slot, None if no unit was bound to it yet (see copy())."""
+        return self.__handles[i_slot]
+
+    def setHandle(self, i_slot: int, i_handle: Unit):
+        self.__handles[i_slot] = i_handle
+
+    def copy(self) -> UnitStore:
+        """Get a copy of the columns. The copy has no units bound to its slots yet."""
+        store = UnitStore(1)
+        store.__capacity = self.__capacity
+        store.__count = self.__count
+        store.__freeSlots = list(self.__freeSlots)
+        store.__handles = [None] * self.__capacity
+        store.__alive = self.__alive.copy()
+        store.__xs = self.__xs.copy()
+        store.__ys = self.__ys.copy()
+        store.__playerIds = self.__playerIds.copy()
+        store.__unitClasses = self.__unitClasses.copy()
+        store.__properties = self.__properties.copy()
+        store.__flags = self.__flags.copy()
+        return store
+
+    def exportRows(self, i_slots: np.ndarray) -> Dict[str, np.ndarray]:
+        """Get the data of units (not their cells), as arrays indexed like the slots."""
+        return {
+            "playerIds": self.__playerIds[i_slots],
+            "unitClasses": self.__unitClasses[i_slots],
+            "properties": self.__properties[i_slots],
+            "flags": self.__flags[i_slots],
+        }
+
+    def importRows(self, i_rows: Dict[str, np.ndarray]) -> np.ndarray:
+        """Add units from the data of exportRows(), returns their slots. The units are not placed."""
+        slots = np.array([self.__allocate(None) for _ in range(len(i_rows["unitClasses"]))], dtype=np.intp)
+        self.__playerIds[slots] = i_rows["playerIds"]
+        self.__unitClasses[slots] = i_rows["unitClasses"]
+        self.__properties[slots] = i_rows["properties"]
+        self.__flags[slots] = i_rows["flags"]
+        return slots
+
+    def setCoords(self, i_slot: int, i_coords: Optional[Tuple[int, int]]):
+        if i_coords is None:
+            self.__xs[i_slot], self.__ys[i_slot] = -1, -1
+        else:
+            self.__xs[i_slot], self.__ys[i_slot] = i_coords[0], i_coords[1]
+
+    # Batch operations
+    def select(self, i_playerId: Optional[int] = None,
+               i_cellsBox: Optional[Tuple[int, int, int, int]] = None) -> np.ndarray:
+        """Get the slots of the units of a player and/or placed in a (minX, maxX, minY, maxY) box."""
+        mask = self.__alive.copy()
+        if i_playerId is not None:
+            mask &= self.__playerIds == i_playerId
+        if i_cellsBox is not None:
+            minX, maxX, minY, maxY = i_cellsBox
+            mask &= (self.__xs >= minX) & (self.__xs < maxX) & (self.__ys >= minY) & (self.__ys < maxY)
+        return np.flatnonzero(mask)
+
+    def setProperty(self, i_slots: np.ndarray, i_property: UnitProperty, i_values):
+        """Set a property of several units."""
+        self.__properties[i_slots, i_property] = i_values
+        self.__flags[i_slots, i_property] = True
+
+    def addToProperty(self, i_slots: np.ndarray, i_property: UnitProperty, i_deltas,
+                      i_minimum: Optional[int] = None):
+        """Add to a property of several units, for instance negative hit points for damage."""
+        values = self.__properties[i_slots, i_property] + i_deltas
+        if i_minimum is not None:
+            values = np.maximum(values, i_minimum)
+        self.__properties[i_slots, i_property] = values
+
+    def resetProperty(self, i_slots: np.ndarray, i_property: UnitProperty, i_maxProperty: UnitProperty):
+        """Set a property of several units to another one, for instance action points to their maximum."""
+        self.__properties[i_slots, i_property] = self.__properties[i_slots, i_maxProperty]
+
+
+# Store of the units that are not in a layer: new units, removed units and copies of them
+stagingStore = UnitStore()
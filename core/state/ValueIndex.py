@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import math
+from typing import TYPE_CHECKING, Tuple, Optional, Dict, Set, Iterator
+
+import numpy as np
+
+from .ILayerIndex import ILayerIndex
+from .storage import CHUNK_SIZE
+
+if TYPE_CHECKING:
+    from .Layer import Layer
+
+
+class ValueIndex(ILayerIndex):
+    """Coordinates of the cells of a layer for each value, except the default value.
+
+    Cells are grouped by chunk, so listing the cells of a value takes a time proportional
+    to the number of results, and nearest cell searches only visit the chunks around.
+    """
+
+    def __init__(self, i_layer: Layer, i_chunkSize: int = CHUNK_SIZE):
+        self.__layer = i_layer
+        self.__chunkSize = i_chunkSize
+        # value -> (chunkX, chunkY) -> cells
+        self.__cells: Dict[int, Dict[Tuple[int, int], Set[Tuple[int, int]]]] = {}
+        width, height = i_layer.size
+        for minX in range(0, width, 256):
+            xs, ys, values = i_layer.getNonDefaultCells((minX, min(minX + 256, width), 0, height))
+            for x, y, value in zip(xs.tolist(), ys.tolist(), values.tolist()):
+                self.__add(x, y, value)
+        i_layer.registerIndex(self)
+
+    def dispose(self):
+        self.__layer.removeIndex(self)
+
+    def __add(self, i_x: int, i_y: int, i_value: int):
+        size = self.__chunkSize
+        chunks = self.__cells.setdefault(i_value, {})
+        chunks.setdefault((i_x // size, i_y // size), set()).add((i_x, i_y))
+
+    def __remove(self, i_x: int, i_y: int, i_value: int):
+        chunks = self.__cells.get(i_value)
+        if chunks is None:
+            return
+        key = (i_x // self.__chunkSize, i_y // self.__chunkSize)
+        cells = chunks.get(key)
+        if cells is None:
+            return
+        cells.discard((i_x, i_y))
+        if not cells:
+            del chunks[key]
+            if not chunks:
+                del self.__cells[i_value]
+
+    def count(self, i_value: int) -> int:
+        """Number of cells with a value."""
+        return sum(len(cells) for cells in self.__cells.get(i_value, {}).values())
+
+    def cells(self, i_value: int) -> Iterator[Tuple[int, int]]:
+        """Iterate over the coordinates of the cells with a value."""
+        for cells in self.__cells.get(i_value, {}).values():
+            yield from cells
+
+    def find(self, i_value: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Get the coordinates (xs, ys) of the cells with a value."""
+        coords = np.array(list(self.cells(i_value)), dtype=np.intp).reshape(-1, 2)
+        return coords[:, 0], coords[:, 1]
+
+    def nearest(self, i_value: int, i_cell: Tuple[int, int],
+                i_maxDistance: Optional[float] = None) -> Optional[Tuple[int, int]]:
+        """Get the closest cell with a value (euclidean distance), or None if there is none close enough."""
+        chunks = self.__cells.get(i_value)
+        if not chunks:
+            return None
+        size = self.__chunkSize
+        cellX, cellY = i_cell
+        chunkX, chunkY = cellX // size, cellY // size
+        width, height = self.__layer.size
+        maxRing = max(chunkX, chunkY, (width - 1) // size - chunkX, (height - 1) // size - chunkY)
+        if i_maxDistance is not None:
+            maxRing = min(maxRing, int(i_maxDistance) // size + 1)
+        best, bestDistance = None, math.inf
+        for ring in range(maxRing + 1):
+            for key in self.__ringChunks(chunkX, chunkY, ring):
+                for x, y in chunks.get(key, ()):
+                    distance = math.hypot(x - cellX, y - cellY)
+                    if distance < bestDistance:
+                        best, bestDistance = (x, y), distance
+            # Cells of the next rings are at least ring * size away
+            if bestDistance <= ring * size:
+                break
+        if i_maxDistance is not None and bestDistance > i_maxDistance:
+            return None
+        return best
+
+    @staticmethod
+    def __ringChunks(i_chunkX: int, i_chunkY: int, i_ring: int) -> Iterator[Tuple[int, int]]:
+        """Iterate over the chunks at a chebyshev distance of ring chunks."""
+        if i_ring == 0:
+            yield i_chunkX, i_chunkY
+            return
+        for dx in range(-i_ring, i_ring + 1):
+            yield i_chunkX + dx, i_chunkY - i_ring
+            yield i_chunkX + dx, i_chunkY + i_ring
+        for dy in range(-i_ring + 1, i_ring):
+            yield i_chunkX - i_ring, i_chunkY + dy
+            yield i_chunkX + i_ring, i_chunkY + dy
+
+    # ILayerIndex
+    def cellsWritten(self, i_layer: Layer, i_xs: np.ndarray, i_ys: np.ndarray,
+                     i_oldValues: np.ndarray, i_newValues: np.ndarray):
+        changed = i_oldValues != i_newValues
+        if not np.any(changed):
+            return
+        defaultValue = i_layer.defaultValue
+        for x, y, oldValue, newValue in zip(i_xs[changed].tolist(), i_ys[changed].tolist(),
+                                            i_oldValues[changed].tolist(), i_newValues[changed].tolist()):
+            if oldValue != defaultValue:
+                self.__remove(x, y, oldValue)
+            if newValue != defaultValue:
+                self.__add(x, y, newValue)
@@ -1,21 +1,62 @@
+import os
+
+import numpy as np
+
 from .Layer import Layer
-from typing import Tuple
-from ..constants import CellValue
+from .TileCodes import TileCodes
+from .WorldHash import WorldHash
+from .storage import getLayerStorageName
+from typing import Tuple, Union, Dict, Optional, Iterable, Callable
+from ..constants import CellValue, getCellValues
+
+# Storage backend of each layer by default: terrain is painted in patches, and costs memory
+# in proportion to the painted chunks, objects and units are few and only their cells are kept
+DEFAULT_STORAGE = {"ground": "chunked", "impassable": "chunked", "objects": "sparse", "units": "sparse"}
+
+
 class World:
-    def __init__(self, input_width : int, input_height : int):
+    def __init__(self, input_width : int, input_height : int,
+                 input_storage: Union[str, Dict[str, str], None] = None,
+                 input_directory: Optional[str] = None):
         # size of our world. Should be immutable.
         self.__width = input_width
         self.__height = input_height
 
         self.__size = (input_width, input_height)
         
+        # Storage backend of each layer: a single name for all layers, or a name per layer
+        if input_storage is None:
+            input_storage = DEFAULT_STORAGE
+        if isinstance(input_storage, str):
+            storages = {}
+        else:
+            storages = input_storage
+            input_storage = "dense"
+
+        # File backed storages keep one file per layer in the directory
+        if input_directory is not None:
+            os.makedirs(input_directory, exist_ok=True)
+
+        def layerPath(name: str) -> Optional[str]:
+            if input_directory is None:
+                return None
+            return os.path.join(input_directory, f"{name}.cells")
+
         # Initialize a dictionary of layers with default cell values
+        defaultValues = {
+            "ground": CellValue.GROUND_SEA,
+            "impassable": CellValue.NONE,
+            "objects": CellValue.NONE,
+            "units": CellValue.NONE,
+        }
         self.__layers = {
-            "ground": Layer(input_width, input_height, CellValue.GROUND_SEA),
-            "impassable": Layer(input_width, input_height, CellValue.NONE),
-            "objects": Layer(input_width, input_height, CellValue.NONE),
-            "units": Layer(input_width, input_height, CellValue.NONE),
+            name: Layer(input_width, input_height, defaultValue,
+                        storages.get(name, input_storage), layerPath(name), getCellValues(name))
+            for name, defaultValue in defaultValues.items()
         }
+        # Tile codes created on demand, shared by all users of the same definition
+        self.__tileCodes: Dict[tuple, TileCodes] = {}
+        self.__worldHash: Optional[WorldHash] = None
 
     # Getter properties
 
@@ -63,6 +104,153 @@ class World:
     def layers(self) -> list[Layer]:
         return list(self.__layers.values())
 
+    @property
+    def storageNames(self) -> Dict[str, str]:
+        """Get the name of the storage backend of each layer, by layer name."""
+        return {name: getLayerStorageName(layer.storage) for name, layer in self.__layers.items()}
+
+    @property
+    def hashes(self) -> WorldHash:
+        """Get the hashes of the world and of its chunks, computed on the first call then kept up to date."""
+        if self.__worldHash is None:
+            self.__worldHash = WorldHash(self.layers)
+        return self.__worldHash
+
+    @property
+    def hash(self) -> int:
+        """64 bits hash of the cells and units, equal for worlds with the same content."""
+        return self.hashes.hash
+
+    def getTileCodes(self, layerValues: Dict[str, Iterable[int]], connectivity: int) -> TileCodes:
+        """Get the autotile codes of the neighbors that have one of the values, per layer name.
+
+        Codes are computed on the first call and then kept up to date by the layers.
+        """
+        layerValues = {name: sorted(set(values)) for name, values in layerValues.items()}
+        key = (tuple(sorted((name, tuple(values)) for name, values in layerValues.items())), connectivity)
+        if key not in self.__tileCodes:
+            layers = {self.getLayer(name): values for name, values in layerValues.items()}
+            self.__tileCodes[key] = TileCodes(layers, connectivity)
+        return self.__tileCodes[key]
+
+    # Bulk access to the cells of a layer, see Layer
+    def gatherValues(self, name: str, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        return self.getLayer(name).gatherValues(xs, ys)
+
+    def scatterValues(self, name: str, xs: np.ndarray, ys: np.ndarray, values):
+        self.getLayer(name).scatterValues(xs, ys, values)
+
+    def writeArea(self, name: str, minX: int, minY: int, values: np.ndarray):
+        self.getLayer(name).writeArea(minX, minY, values)
+
+    def writeMask(self, name: str, minX: int, minY: int, mask: np.ndarray, value: CellValue):
+        self.getLayer(name).writeMask(minX, minY, mask, value)
+
+    def notifyPendingChanges(self):
+        """Notify the listeners of each layer of the cells changed since the last call."""
+        for layer in self.__layers.values():
+            layer.notifyPendingChanges()
+
+    def snapshot(self) -> "World":
+        """Get a read-only copy of the world, see Layer.snapshot(). Cheap for chunked and sparse storages."""
+        snapshot = World.__new__(World)
+        snapshot.__width, snapshot.__height = self.__width, self.__height
+        snapshot.__size = self.__size
+        snapshot.__layers = {name: layer.snapshot() for name, layer in self.__layers.items()}
+        snapshot.__tileCodes = {}
+        snapshot.__worldHash = None
+        return snapshot
+
+    # Transforms of all the layers and units at once, into a new world
+    def rotate(self, turns: int = 1) -> "World":
+        """Get a copy of the world rotated by 90 degrees a number of times, counterclockwise as np.rot90()."""
+        turns %= 4
+        size = (self.__height, self.__width) if turns % 2 == 1 else self.__size
+
+        def moveCells(xs: np.ndarray, ys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+            width, height = self.__size
+            for _ in range(turns):
+                xs, ys = height - 1 - ys, xs
+                width, height = height, width
+            return xs, ys
+
+        return self.__transform(size, lambda layer: np.rot90(np.asarray(layer.cells), turns), moveCells)
+
+    def mirror(self, axis: int) -> "World":
+        """Get a copy of the world mirrored along an axis: 0 flips x, 1 flips y."""
+        if axis not in [0, 1]:
+            raise ValueError(f"Invalid axis {axis}")
+
+        def moveCells(xs: np.ndarray, ys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+            if axis == 0:
+                return self.__width - 1 - xs, ys
+            return xs, self.__height - 1 - ys
+
+        return self.__transform(self.__size, lambda layer: np.flip(np.asarray(layer.cells), axis), moveCells)
+
+    def crop(self, cellsBox: Tuple[int, int, int, int]) -> "World":
+        """Get a copy of a (minX, maxX, minY, maxY) box of the world. The box may go beyond the world,
+        the cells outside the world get the default value of their layer."""
+        minX, maxX, minY, maxY = cellsBox
+        if maxX <= minX or maxY <= minY:
+            raise ValueError(f"Invalid box {cellsBox}")
+
+        def cropLayer(layer: Layer) -> np.ndarray:
+            return layer.decodeArray(layer.storage.readPaddedArea(minX, maxX, minY, maxY))
+
+        return self.__transform((maxX - minX, maxY - minY), cropLayer, lambda xs, ys: (xs - minX, ys - minY))
+
+    def pad(self, left: int, top: int, right: int, bottom: int) -> "World":
+        """Get a copy of the world with borders of default values, or without its borders for negative sizes."""
+        return self.crop((-left, self.__width + right, -top, self.__height + bottom))
+
+    def resize(self, width: int, height: int) -> "World":
+        """Get a copy of the world resampled to another size, with the nearest cells."""
+        if width <= 0 or height <= 0:
+            raise ValueError(f"Invalid size {width}x{height}")
+        sourceXs = np.arange(width) * self.__width // width
+        sourceYs = np.arange(height) * self.__height // height
+
+        def resizeLayer(layer: Layer) -> np.ndarray:
+            return np.asarray(layer.cells)[np.ix_(sourceXs, sourceYs)]
+
+        # Units go to the first cell sampled from their cell, or to the next one when their cell is skipped
+        def moveCells(xs: np.ndarray, ys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+            newXs = np.minimum((xs * width + self.__width - 1) // self.__width, width - 1)
+            newYs = np.minimum((ys * height + self.__height - 1) // self.__height, height - 1)
+            return newXs, newYs
+
+        return self.__transform((width, height), resizeLayer, moveCells)
+
+    def __transform(self, size: Tuple[int, int], transformLayer: Callable[[Layer], np.ndarray],
+                    moveCells: Callable[[np.ndarray, np.ndarray], Tuple[np.ndarray, np.ndarray]]) -> "World":
+        """Get a new world of a size, with the values of each layer transformed by a function, and the units
+        moved by a function of their cells. Units that leave the world, or that go to a cell that already
+        has a unit, are dropped. Layers keep their storage backends, memory-mapped ones become chunked."""
+        storage = {name: "chunked" if kind == "memmap" else kind for name, kind in self.storageNames.items()}
+        world = World(size[0], size[1], storage)
+        for name, layer in self.__layers.items():
+            if name != "units":
+                world.__layers[name].writeArea(0, 0, transformLayer(layer))
+
+        units = list(self.units.units)
+        if units:
+            cells = np.array([coords for coords, _ in units], dtype=np.intp).reshape([-1, 2])
+            xs, ys = moveCells(cells[:, 0], cells[:, 1])
+            for x, y, (coords, unit) in zip(xs.tolist(), ys.tolist(), units):
+                if world.contains((x, y)) and world.units.getUnit((x, y)) is None:
+                    world.units.setUnit((x, y), self.units.get_cell_value(coords), unit.copy())
+
+        # Autotile codes used with this world are computed at once on the new world
+        for layerValues, connectivity in self.__tileCodes:
+            world.getTileCodes(dict(layerValues), connectivity)
+        return world
+
+    def flush(self):
+        """Write pending changes of file backed layers to disk."""
+        for layer in self.__layers.values():
+            layer.flush()
+
     def contains(self, coords: tuple[int, int]) -> bool:
         """Check if coordinates are within the world boundaries."""
         return 0 <= coords[0] < self.__width and 0 <= coords[1] < self.__height
\ No newline at end of file
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Tuple, Optional, Dict, List
+
+import numpy as np
+
+from .ILayerIndex import ILayerIndex
+from .storage import CHUNK_SIZE
+
+if TYPE_CHECKING:
+    from .Layer import Layer
+    from .Unit import Unit
+
+
+def splitmix64(i_values: np.ndarray) -> np.ndarray:
+    """Mix 64 bits integers into well distributed 64 bits keys."""
+    with np.errstate(over="ignore"):
+        z = i_values.astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return z ^ (z >> np.uint64(31))
+
+
+class WorldHash(ILayerIndex):
+    """64 bits Zobrist-style hash of the cells and units of a world, for the whole world and per chunk.
+
+    Each (layer, x, y, value) has a pseudo-random key, and a hash is the xor of the keys of its
+    cells, so a write updates it with the keys of the old and new values. Keys of default
+    values are 0: an empty world hashes to 0 and only non-default cells are hashed at creation.
+    Units add a key made of their cell and class; other unit data is not hashed.
+    """
+
+    def __init__(self, i_layers: List[Layer], i_chunkSize: int = CHUNK_SIZE):
+        self.__layerIds = {layer: index for index, layer in enumerate(i_layers)}
+        self.__unitsId = len(i_layers)
+        self.__chunkSize = i_chunkSize
+        self.__hash = 0
+        self.__chunkHashes: Dict[Tuple[int, int], int] = {}
+        for layer in i_layers:
+            width, height = layer.size
+            for minX in range(0, width, 256):
+                xs, ys, values = layer.getNonDefaultCells((minX, min(minX + 256, width), 0, height))
+                self.__apply(xs, ys, self.__cellKeys(layer, xs, ys, values))
+            for coords, unit in layer.units:
+                self.__applyUnit(coords, unit)
+            layer.registerIndex(self)
+
+    @property
+    def hash(self) -> int:
+        return self.__hash
+
+    def getChunkHash(self, i_chunkX: int, i_chunkY: int) -> int:
+        return self.__chunkHashes.get((i_chunkX, i_chunkY), 0)
+
+    def getRegionHash(self, cellsBox: Tuple[int, int, int, int]) -> int:
+        """Hash of the chunks that overlap a (minX, maxX, minY, maxY) box."""
+        minX, maxX, minY, maxY = cellsBox
+        size = self.__chunkSize
+        result = 0
+        for chunkX in range(minX // size, (maxX - 1) // size + 1):
+            for chunkY in range(minY // size, (maxY - 1) // size + 1):
+                result ^= self.__chunkHashes.get((chunkX, chunkY), 0)
+        return result
+
+    def dispose(self):
+        for layer in self.__layerIds:
+            layer.removeIndex(self)
+
+    def __cellKeys(self, i_layer: Layer, i_xs: np.ndarray, i_ys: np.ndarray, i_values: np.ndarray) -> np.ndarray:
+        layerId = np.uint64(self.__layerIds[i_layer])
+        combined = (layerId << np.uint64(58)) ^ (i_xs.astype(np.uint64) << np.uint64(37)) \
+            ^ (i_ys.astype(np.uint64) << np.uint64(16)) ^ i_values.astype(np.uint64)
+        keys = splitmix64(combined)
+        keys[i_values == i_layer.defaultValue] = 0
+        return keys
+
+    def __apply(self, i_xs: np.ndarray, i_ys: np.ndarray, i_keys: np.ndarray):
+        """Xor keys into the world hash and the hashes of their chunks."""
+        if i_keys.size == 0:
+            return
+        self.__hash ^= int(np.bitwise_xor.reduce(i_keys))
+        size = self.__chunkSize
+        chunkXs, chunkYs = i_xs // size, i_ys // size
+        if i_keys.size == 1:
+            key = (int(chunkXs[0]), int(chunkYs[0]))
+            self.__chunkHashes[key] = self.__chunkHashes.get(key, 0) ^ int(i_keys[0])
+            return
+        # Xor the keys of each chunk at once
+        chunkIds = chunkXs.astype(np.int64) * (1 << 32) + chunkYs
+        order = np.argsort(chunkIds, kind="stable")
+        starts = np.flatnonzero(np.r_[True, np.diff(chunkIds[order]) != 0])
+        chunkKeys = np.bitwise_xor.reduceat(i_keys[order], starts)
+        for start, chunkKey in zip(starts.tolist(), chunkKeys.tolist()):
+            first = order[start]
+            key = (int(chunkXs[first]), int(chunkYs[first]))
+            self.__chunkHashes[key] = self.__chunkHashes.get(key, 0) ^ chunkKey
+
+    def __applyUnit(self, i_coords: Tuple[int, int], i_unit: Unit):
+        value = int(i_unit.unitClass)
+        combined = np.array([(self.__unitsId << 58) ^ (i_coords[0] << 37) ^ (i_coords[1] << 16) ^ value],
+                            dtype=np.uint64)
+        self.__apply(np.array([i_coords[0]]), np.array([i_coords[1]]), splitmix64(combined))
+
+    # ILayerIndex
+    def cellsWritten(self, i_layer: Layer, i_xs: np.ndarray, i_ys: np.ndarray,
+                     i_oldValues: np.ndarray, i_newValues: np.ndarray):
+        changed = i_oldValues != i_newValues
+        if not np.any(changed):
+            return
+        xs, ys = i_xs[changed], i_ys[changed]
+        keys = self.__cellKeys(i_layer, xs, ys, i_oldValues[changed]) \
+            ^ self.__cellKeys(i_layer, xs, ys, i_newValues[changed])
+        self.__apply(xs, ys, keys)
+
+    def unitChanged(self, i_layer: Layer, i_coords: Tuple[int, int],
+                    i_oldUnit: Optional[Unit], i_newUnit: Optional[Unit]):
+        if i_oldUnit is not None:
+            self.__applyUnit(i_coords, i_oldUnit)
+        if i_newUnit is not None:
+            self.__applyUnit(i_coords, i_newUnit)
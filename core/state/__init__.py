@@ -2,4 +2,12 @@ from .World import World
 from .GameState import GameState
 from .Layer import Layer
 from .ILayerListener import ILayerListener
-from .Unit import Unit
\ No newline at end of file
+from .Unit import Unit
+from .ILayerIndex import ILayerIndex
+from .TileCodes import TileCodes
+from .SummedAreaTable import SummedAreaTable
+from .ValueIndex import ValueIndex
+from .UnitStore import UnitStore
+from .UnitIndex import UnitIndex
+from .WorldHash import WorldHash
+from .worldfile import saveWorld, loadWorld
@@ -0,0 +1,158 @@
+from typing import Dict, Tuple, Iterator, Generator, Set
+
+import numpy as np
+
+from .LayerStorage import LayerStorage, CHUNK_SIZE
+
+
+class ChunkedLayerStorage(LayerStorage):
+    """Stores cells in square chunks that are only allocated on their first write.
+
+    Chunks that were never written all share a single read-only sentinel chunk,
+    so memory grows with the painted area rather than with the layer size.
+    Snapshots share the chunks, which are copied on the next write (copy-on-write).
+    """
+
+    def __init__(self, i_width: int, i_height: int, i_defaultValue: int, i_dtype=np.int32,
+                 i_chunkSize: int = CHUNK_SIZE):
+        super().__init__(i_width, i_height, i_defaultValue, i_dtype)
+        self.__chunkSize = i_chunkSize
+        self.__chunks: Dict[Tuple[int, int], np.ndarray] = {}
+        self.__sentinel = np.full([i_chunkSize, i_chunkSize], i_defaultValue, dtype=i_dtype)
+        self.__sentinel.flags.writeable = False
+        # Chunks shared with snapshots, copied before being written
+        self.__shared: Set[Tuple[int, int]] = set()
+        self.__readOnly = False
+
+    @property
+    def chunkSize(self) -> int:
+        return self.__chunkSize
+
+    @property
+    def chunkCount(self) -> int:
+        """Number of allocated chunks."""
+        return len(self.__chunks)
+
+    @property
+    def nbytes(self) -> int:
+        return (len(self.__chunks) + 1) * self.__sentinel.nbytes
+
+    def chunks(self) -> Iterator[Tuple[Tuple[int, int], np.ndarray]]:
+        """Iterate over the allocated chunks, as ((chunkX, chunkY), values)."""
+        return iter(self.__chunks.items())
+
+    def getChunk(self, i_chunkX: int, i_chunkY: int) -> np.ndarray:
+        """Get the values of a chunk. The result must not be modified."""
+        return self.__chunks.get((i_chunkX, i_chunkY), self.__sentinel)
+
+    def __getWritableChunk(self, i_chunkX: int, i_chunkY: int) -> np.ndarray:
+        if self.__readOnly:
+            raise ValueError("Can't write to a snapshot")
+        key = (i_chunkX, i_chunkY)
+        chunk = self.__chunks.get(key)
+        if chunk is None:
+            chunk = self.__sentinel.copy()
+            self.__chunks[key] = chunk
+        elif key in self.__shared:
+            chunk = chunk.copy()
+            self.__chunks[key] = chunk
+            self.__shared.discard(key)
+        return chunk
+
+    def getCell(self, i_x: int, i_y: int) -> int:
+        size = self.__chunkSize
+        chunk = self.__chunks.get((i_x // size, i_y // size), self.__sentinel)
+        return chunk[i_x % size, i_y % size]
+
+    def setCell(self, i_x: int, i_y: int, i_value: int):
+        size = self.__chunkSize
+        key = (i_x // size, i_y // size)
+        if key not in self.__chunks and i_value == self.defaultValue:
+            return  # Nothing to allocate for a default value in a default chunk
+        self.__getWritableChunk(*key)[i_x % size, i_y % size] = i_value
+
+    def readArea(self, i_minX: int, i_maxX: int, i_minY: int, i_maxY: int) -> np.ndarray:
+        size = self.__chunkSize
+        chunkMinX, chunkMaxX = i_minX // size, (i_maxX - 1) // size
+        chunkMinY, chunkMaxY = i_minY // size, (i_maxY - 1) // size
+        # Fast path: the box is inside a single chunk
+        if chunkMinX == chunkMaxX and chunkMinY == chunkMaxY:
+            chunk = self.getChunk(chunkMinX, chunkMinY)
+            shiftX, shiftY = chunkMinX * size, chunkMinY * size
+            return chunk[i_minX - shiftX:i_maxX - shiftX, i_minY - shiftY:i_maxY - shiftY]
+
+        area = np.empty([i_maxX - i_minX, i_maxY - i_minY], dtype=self.dtype)
+        for chunkX in range(chunkMinX, chunkMaxX + 1):
+            x1, x2 = max(i_minX, chunkX * size), min(i_maxX, (chunkX + 1) * size)
+            for chunkY in range(chunkMinY, chunkMaxY + 1):
+                y1, y2 = max(i_minY, chunkY * size), min(i_maxY, (chunkY + 1) * size)
+                chunk = self.__chunks.get((chunkX, chunkY))
+                target = area[x1 - i_minX:x2 - i_minX, y1 - i_minY:y2 - i_minY]
+                if chunk is None:
+                    target[...] = self.defaultValue
+                else:
+                    target[...] = chunk[x1 - chunkX * size:x2 - chunkX * size,
+                                        y1 - chunkY * size:y2 - chunkY * size]
+        return area
+
+    def __groupByChunk(self, i_xs: np.ndarray, i_ys: np.ndarray) \
+            -> Generator[Tuple[Tuple[int, int], np.ndarray], None, None]:
+        """Group a list of cells by chunk, yields ((chunkX, chunkY), indices of the cells in the list)."""
+        size = self.__chunkSize
+        chunkXs, chunkYs = i_xs // size, i_ys // size
+        keys = chunkXs * (self.height // size + 1) + chunkYs
+        order = np.argsort(keys, kind="stable")
+        bounds = np.flatnonzero(np.diff(keys[order])) + 1
+        for group in np.split(order, bounds):
+            if len(group) > 0:
+                first = group[0]
+                yield (int(chunkXs[first]), int(chunkYs[first])), group
+
+    def gather(self, i_xs: np.ndarray, i_ys: np.ndarray) -> np.ndarray:
+        size = self.__chunkSize
+        values = np.empty(i_xs.shape, dtype=self.dtype)
+        for key, group in self.__groupByChunk(i_xs, i_ys):
+            chunk = self.__chunks.get(key, self.__sentinel)
+            values[group] = chunk[i_xs[group] % size, i_ys[group] % size]
+        return values
+
+    def scatter(self, i_xs: np.ndarray, i_ys: np.ndarray, i_values: np.ndarray):
+        size = self.__chunkSize
+        values = np.broadcast_to(i_values, i_xs.shape)
+        for key, group in self.__groupByChunk(i_xs, i_ys):
+            groupValues = values[group]
+            if key not in self.__chunks and not np.any(groupValues != self.defaultValue):
+                continue
+            chunk = self.__getWritableChunk(*key)
+            chunk[i_xs[group] % size, i_ys[group] % size] = groupValues
+
+    def writeArea(self, i_minX: int, i_minY: int, i_values: np.ndarray):
+        size = self.__chunkSize
+        maxX, maxY = i_minX + i_values.shape[0], i_minY + i_values.shape[1]
+        for chunkX in range(i_minX // size, (maxX - 1) // size + 1):
+            x1, x2 = max(i_minX, chunkX * size), min(maxX, (chunkX + 1) * size)
+            for chunkY in range(i_minY // size, (maxY - 1) // size + 1):
+                y1, y2 = max(i_minY, chunkY * size), min(maxY, (chunkY + 1) * size)
+                block = i_values[x1 - i_minX:x2 - i_minX, y1 - i_minY:y2 - i_minY]
+                if (chunkX, chunkY) not in self.__chunks and not np.any(block != self.defaultValue):
+                    continue
+                chunk = self.__getWritableChunk(chunkX, chunkY)
+                chunk[x1 - chunkX * size:x2 - chunkX * size, y1 - chunkY * size:y2 - chunkY * size] = block
+
+    def compact(self) -> int:
+        """Release the chunks that went back to the default value. Returns the number of released chunks."""
+        defaultKeys = [
+            key for key, chunk in self.__chunks.items()
+            if not np.any(chunk != self.defaultValue)
+        ]
+        for key in defaultKeys:
+            del self.__chunks[key]
+            self.__shared.discard(key)
+        return len(defaultKeys)
+
+    def snapshot(self) -> "ChunkedLayerStorage":
+        snapshot = ChunkedLayerStorage(self.width, self.height, self.defaultValue, self.dtype, self.__chunkSize)
+        snapshot.__chunks = dict(self.__chunks)
+        snapshot.__readOnly = True
+        self.__shared = set(self.__chunks)
+        return snapshot
@@ -0,0 +1,57 @@
+from typing import Optional
+
+import numpy as np
+
+from .LayerStorage import LayerStorage
+
+
+class DenseLayerStorage(LayerStorage):
+    """Stores all cells in a single array."""
+
+    def __init__(self, i_width: int, i_height: int, i_defaultValue: int, i_dtype=np.int32,
+                 i_cells: Optional[np.ndarray] = None):
+        super().__init__(i_width, i_height, i_defaultValue, i_dtype)
+        # Create array with 1-cell border all around for easier neighbor access
+        if i_cells is None:
+            i_cells = np.full([i_width + 2, i_height + 2], i_defaultValue, dtype=i_dtype)
+        self.__cells = i_cells
+
+    @property
+    def nbytes(self) -> int:
+        return self.__cells.nbytes
+
+    @property
+    def array(self) -> np.ndarray:
+        """Get the inner cells without border."""
+        return self.__cells[1:-1, 1:-1]
+
+    def getCell(self, i_x: int, i_y: int) -> int:
+        return self.__cells[i_x + 1, i_y + 1]
+
+    def setCell(self, i_x: int, i_y: int, i_value: int):
+        self.__cells[i_x + 1, i_y + 1] = i_value
+
+    def readArea(self, i_minX: int, i_maxX: int, i_minY: int, i_maxY: int) -> np.ndarray:
+        return self.__cells[i_minX + 1:i_maxX + 1, i_minY + 1:i_maxY + 1]
+
+    def readPaddedArea(self, i_minX: int, i_maxX: int, i_minY: int, i_maxY: int) -> np.ndarray:
+        # The border is stored, so any box within it is a view
+        if i_minX >= -1 and i_minY >= -1 and i_maxX <= self.width + 1 and i_maxY <= self.height + 1:
+            return self.__cells[i_minX + 1:i_maxX + 1, i_minY + 1:i_maxY + 1]
+        return super().readPaddedArea(i_minX, i_maxX, i_minY, i_maxY)
+
+    def gather(self, i_xs: np.ndarray, i_ys: np.ndarray) -> np.ndarray:
+        return self.__cells[i_xs + 1, i_ys + 1]
+
+    def scatter(self, i_xs: np.ndarray, i_ys: np.ndarray, i_values: np.ndarray):
+        self.__cells[i_xs + 1, i_ys + 1] = i_values
+
+    def writeArea(self, i_minX: int, i_minY: int, i_values: np.ndarray):
+        width, height = i_values.shape
+        self.__cells[i_minX + 1:i_minX + width + 1, i_minY + 1:i_minY + height + 1] = i_values
+
+    def snapshot(self) -> "DenseLayerStorage":
+        # No chunks to share, the snapshot is a copy
+        cells = self.__cells.copy()
+        cells.flags.writeable = False
+        return DenseLayerStorage(self.width, self.height, self.defaultValue, self.dtype, cells)
@@ -0,0 +1,100 @@
+from abc import ABC, abstractmethod
+from typing import Tuple
+
+import numpy as np
+
+# Side of the square blocks used by chunked backends and per-chunk data
+CHUNK_SIZE = 64
+
+
+class LayerStorage(ABC):
+    """Backend holding the raw values of a layer's cells.
+
+    Coordinates are cell coordinates (no border). Reads of the 1-cell border around
+    the layer, used for neighbor access, return the default value.
+    """
+
+    def __init__(self, i_width: int, i_height: int, i_defaultValue: int, i_dtype=np.int32):
+        self.__width = i_width
+        self.__height = i_height
+        self.__defaultValue = i_defaultValue
+        self.__dtype = np.dtype(i_dtype)
+
+    @property
+    def width(self) -> int:
+        return self.__width
+
+    @property
+    def height(self) -> int:
+        return self.__height
+
+    @property
+    def defaultValue(self) -> int:
+        return self.__defaultValue
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self.__dtype
+
+    @property
+    @abstractmethod
+    def nbytes(self) -> int:
+        """Number of bytes used by the cell values."""
+        raise NotImplementedError()
+
+    @abstractmethod
+    def getCell(self, i_x: int, i_y: int) -> int:
+        """Get the value of a cell inside the layer."""
+        raise NotImplementedError()
+
+    @abstractmethod
+    def setCell(self, i_x: int, i_y: int, i_value: int):
+        """Set the value of a cell inside the layer."""
+        raise NotImplementedError()
+
+    @abstractmethod
+    def readArea(self, i_minX: int, i_maxX: int, i_minY: int, i_maxY: int) -> np.ndarray:
+        """Get the values of a box inside the layer. The result must not be modified."""
+        raise NotImplementedError()
+
+    def gather(self, i_xs: np.ndarray, i_ys: np.ndarray) -> np.ndarray:
+        """Get the values of a list of cells inside the layer."""
+        return np.array([self.getCell(x, y) for x, y in zip(i_xs.tolist(), i_ys.tolist())], dtype=self.__dtype)
+
+    def scatter(self, i_xs: np.ndarray, i_ys: np.ndarray, i_values: np.ndarray):
+        """Set the values of a list of cells inside the layer."""
+        values = np.broadcast_to(i_values, i_xs.shape)
+        for x, y, value in zip(i_xs.tolist(), i_ys.tolist(), values.tolist()):
+            self.setCell(x, y, value)
+
+    def writeArea(self, i_minX: int, i_minY: int, i_values: np.ndarray):
+        """Set the values of a box inside the layer, from a 2D array."""
+        xs, ys = np.nonzero(np.ones(i_values.shape, dtype=bool))
+        self.scatter(xs + i_minX, ys + i_minY, i_values[xs, ys])
+
+    def findNonDefaultCells(self, i_minX: int, i_maxX: int, i_minY: int, i_maxY: int) \
+            -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Get the coordinates and values (xs, ys, values) of the cells of a box that don't have the default value."""
+        area = self.readArea(i_minX, i_maxX, i_minY, i_maxY)
+        xs, ys = np.nonzero(area != self.__defaultValue)
+        return xs + i_minX, ys + i_minY, area[xs, ys]
+
+    def flush(self):
+        """Write pending changes to the backing file, if any."""
+        pass
+
+    def snapshot(self) -> "LayerStorage":
+        """Get a read-only storage with the current values, unaffected by later writes to this storage."""
+        raise NotImplementedError(f"{self.__class__.__name__} doesn't support snapshots")
+
+    def readPaddedArea(self, i_minX: int, i_maxX: int, i_minY: int, i_maxY: int) -> np.ndarray:
+        """Get the values of a box that may overlap the border around the layer."""
+        if i_minX >= 0 and i_minY >= 0 and i_maxX <= self.__width and i_maxY <= self.__height:
+            return self.readArea(i_minX, i_maxX, i_minY, i_maxY)
+        area = np.full([i_maxX - i_minX, i_maxY - i_minY], self.__defaultValue, dtype=self.__dtype)
+        minX, maxX = max(i_minX, 0), min(i_maxX, self.__width)
+        minY, maxY = max(i_minY, 0), min(i_maxY, self.__height)
+        if minX < maxX and minY < maxY:
+            area[minX - i_minX:maxX - i_minX, minY - i_minY:maxY - i_minY] = \
+                self.readArea(minX, maxX, minY, maxY)
+        return area
@@ -0,0 +1,69 @@
+import os
+
+import numpy as np
+
+from .LayerStorage import LayerStorage
+from .DenseLayerStorage import DenseLayerStorage
+
+
+class MemmapLayerStorage(LayerStorage):
+    """Stores cells in a memory-mapped file.
+
+    The operating system pages cells in and out on demand, so only the areas being
+    read or edited are resident. Edits are written back to the file without any
+    save step; an existing file with the right size is opened as it is.
+    """
+
+    def __init__(self, i_width: int, i_height: int, i_defaultValue: int, i_dtype, i_path: str):
+        super().__init__(i_width, i_height, i_defaultValue, i_dtype)
+        self.__path = i_path
+        shape = (i_width, i_height)
+        expectedSize = i_width * i_height * self.dtype.itemsize
+        if os.path.exists(i_path):
+            fileSize = os.path.getsize(i_path)
+            if fileSize != expectedSize:
+                raise ValueError(f"File '{i_path}' has {fileSize} bytes, expected {expectedSize}")
+            self.__cells = np.memmap(i_path, dtype=self.dtype, mode="r+", shape=shape)
+        else:
+            # New files are created sparse (zero filled), only non-zero defaults must be written
+            self.__cells = np.memmap(i_path, dtype=self.dtype, mode="w+", shape=shape)
+            if i_defaultValue != 0:
+                for x in range(0, i_width, 256):
+                    self.__cells[x:x + 256, :] = i_defaultValue
+
+    @property
+    def path(self) -> str:
+        return self.__path
+
+    @property
+    def nbytes(self) -> int:
+        return self.__cells.nbytes
+
+    def getCell(self, i_x: int, i_y: int) -> int:
+        return self.__cells[i_x, i_y]
+
+    def setCell(self, i_x: int, i_y: int, i_value: int):
+        self.__cells[i_x, i_y] = i_value
+
+    def readArea(self, i_minX: int, i_maxX: int, i_minY: int, i_maxY: int) -> np.ndarray:
+        return self.__cells[i_minX:i_maxX, i_minY:i_maxY]
+
+    def gather(self, i_xs: np.ndarray, i_ys: np.ndarray) -> np.ndarray:
+        return self.__cells[i_xs, i_ys]
+
+    def scatter(self, i_xs: np.ndarray, i_ys: np.ndarray, i_values: np.ndarray):
+        self.__cells[i_xs, i_ys] = i_values
+
+    def writeArea(self, i_minX: int, i_minY: int, i_values: np.ndarray):
+        width, height = i_values.shape
+        self.__cells[i_minX:i_minX + width, i_minY:i_minY + height] = i_values
+
+    def flush(self):
+        self.__cells.flush()
+
+    def snapshot(self) -> DenseLayerStorage:
+        # The file is modified in place, the snapshot is a copy in memory
+        cells = np.full([self.width + 2, self.height + 2], self.defaultValue, dtype=self.dtype)
+        cells[1:-1, 1:-1] = self.__cells
+        cells.flags.writeable = False
+        return DenseLayerStorage(self.width, self.height, self.defaultValue, self.dtype, cells)
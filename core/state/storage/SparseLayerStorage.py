@@ -0,0 +1,106 @@
+import sys
+from typing import Dict, Tuple, Set
+
+import numpy as np
+
+from .LayerStorage import LayerStorage, CHUNK_SIZE
+
+
+class SparseLayerStorage(LayerStorage):
+    """Stores only the cells that don't have the default value, grouped by chunk.
+
+    Suited to layers that are almost entirely empty, like objects and units: memory
+    is proportional to the number of non-default cells, and listing the non-default
+    cells of a region only visits the chunks that overlap it.
+    Snapshots share the chunks, which are copied on the next write (copy-on-write).
+    """
+
+    def __init__(self, i_width: int, i_height: int, i_defaultValue: int, i_dtype=np.int32,
+                 i_chunkSize: int = CHUNK_SIZE):
+        super().__init__(i_width, i_height, i_defaultValue, i_dtype)
+        self.__chunkSize = i_chunkSize
+        # (chunkX, chunkY) -> {(x, y) -> value}, only for chunks with non-default cells
+        self.__chunks: Dict[Tuple[int, int], Dict[Tuple[int, int], int]] = {}
+        # Chunks shared with snapshots, copied before being written
+        self.__shared: Set[Tuple[int, int]] = set()
+        self.__readOnly = False
+
+    @property
+    def cellCount(self) -> int:
+        """Number of cells that don't have the default value."""
+        return sum(len(chunk) for chunk in self.__chunks.values())
+
+    @property
+    def nbytes(self) -> int:
+        return sys.getsizeof(self.__chunks) + sum(sys.getsizeof(chunk) for chunk in self.__chunks.values())
+
+    def getCell(self, i_x: int, i_y: int) -> int:
+        size = self.__chunkSize
+        chunk = self.__chunks.get((i_x // size, i_y // size))
+        if chunk is None:
+            return self.defaultValue
+        return chunk.get((i_x, i_y), self.defaultValue)
+
+    def __getWritableChunk(self, i_key: Tuple[int, int]) -> Dict[Tuple[int, int], int]:
+        if self.__readOnly:
+            raise ValueError("Can't write to a snapshot")
+        chunk = self.__chunks.get(i_key)
+        if chunk is None:
+            chunk = {}
+            self.__chunks[i_key] = chunk
+        elif i_key in self.__shared:
+            chunk = dict(chunk)
+            self.__chunks[i_key] = chunk
+            self.__shared.discard(i_key)
+        return chunk
+
+    def setCell(self, i_x: int, i_y: int, i_value: int):
+        size = self.__chunkSize
+        key = (i_x // size, i_y // size)
+        if i_value == self.defaultValue:
+            chunk = self.__chunks.get(key)
+            if chunk is not None and (i_x, i_y) in chunk:
+                chunk = self.__getWritableChunk(key)
+                del chunk[(i_x, i_y)]
+                if not chunk:
+                    del self.__chunks[key]
+                    self.__shared.discard(key)
+        else:
+            self.__getWritableChunk(key)[(i_x, i_y)] = int(i_value)
+
+    def readArea(self, i_minX: int, i_maxX: int, i_minY: int, i_maxY: int) -> np.ndarray:
+        area = np.full([i_maxX - i_minX, i_maxY - i_minY], self.defaultValue, dtype=self.dtype)
+        xs, ys, values = self.findNonDefaultCells(i_minX, i_maxX, i_minY, i_maxY)
+        area[xs - i_minX, ys - i_minY] = values
+        return area
+
+    def writeArea(self, i_minX: int, i_minY: int, i_values: np.ndarray):
+        width, height = i_values.shape
+        # Clear the current cells of the box, then add the new non-default ones
+        xs, ys, _ = self.findNonDefaultCells(i_minX, i_minX + width, i_minY, i_minY + height)
+        self.scatter(xs, ys, self.defaultValue)
+        xs, ys = np.nonzero(i_values != self.defaultValue)
+        self.scatter(xs + i_minX, ys + i_minY, i_values[xs, ys])
+
+    def findNonDefaultCells(self, i_minX: int, i_maxX: int, i_minY: int, i_maxY: int) \
+            -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        size = self.__chunkSize
+        xs, ys, values = [], [], []
+        for chunkX in range(i_minX // size, (i_maxX - 1) // size + 1):
+            for chunkY in range(i_minY // size, (i_maxY - 1) // size + 1):
+                chunk = self.__chunks.get((chunkX, chunkY))
+                if chunk is None:
+                    continue
+                for (x, y), value in chunk.items():
+                    if i_minX <= x < i_maxX and i_minY <= y < i_maxY:
+                        xs.append(x)
+                        ys.append(y)
+                        values.append(value)
+        return np.array(xs, dtype=np.intp), np.array(ys, dtype=np.intp), np.array(values, dtype=self.dtype)
+
+    def snapshot(self) -> "SparseLayerStorage":
+        snapshot = SparseLayerStorage(self.width, self.height, self.defaultValue, self.dtype, self.__chunkSize)
+        snapshot.__chunks = dict(self.__chunks)
+        snapshot.__readOnly = True
+        self.__shared = set(self.__chunks)
+        return snapshot
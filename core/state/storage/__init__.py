@@ -0,0 +1,39 @@
+from typing import Optional
+
+import numpy as np
+
+from .LayerStorage import LayerStorage, CHUNK_SIZE
+from .DenseLayerStorage import DenseLayerStorage
+from .ChunkedLayerStorage import ChunkedLayerStorage
+from .MemmapLayerStorage import MemmapLayerStorage
+from .SparseLayerStorage import SparseLayerStorage
+
+
+# Name of each storage backend, as given to createLayerStorage()
+STORAGE_NAMES = {
+    DenseLayerStorage: "dense",
+    ChunkedLayerStorage: "chunked",
+    SparseLayerStorage: "sparse",
+    MemmapLayerStorage: "memmap",
+}
+
+
+def getLayerStorageName(i_storage: LayerStorage) -> str:
+    """Get the name of the backend of a layer storage, as given to createLayerStorage()."""
+    return STORAGE_NAMES[type(i_storage)]
+
+
+def createLayerStorage(i_kind: str, i_width: int, i_height: int, i_defaultValue: int,
+                       i_dtype=np.int32, i_path: Optional[str] = None) -> LayerStorage:
+    """Create a layer storage backend from its name. File backed storages need a path."""
+    kind2storage = {
+        "dense": lambda: DenseLayerStorage(i_width, i_height, i_defaultValue, i_dtype),
+        "chunked": lambda: ChunkedLayerStorage(i_width, i_height, i_defaultValue, i_dtype),
+        "sparse": lambda: SparseLayerStorage(i_width, i_height, i_defaultValue, i_dtype),
+        "memmap": lambda: MemmapLayerStorage(i_width, i_height, i_defaultValue, i_dtype, i_path),
+    }
+    if i_kind not in kind2storage:
+        raise ValueError(f"Invalid layer storage '{i_kind}'")
+    if i_kind == "memmap" and i_path is None:
+        raise ValueError("Layer storage 'memmap' requires a file path")
+    return kind2storage[i_kind]()
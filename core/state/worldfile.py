@@ -0,0 +1,50 @@
+import os
+from typing import Union, Dict
+
+import numpy as np
+
+from core.constants import CellValue
+from .World import World
+from .Unit import Unit
+from .UnitStore import UnitStore
+
+
+def saveWorld(i_world: World, i_path: str):
+    """Save all the cells and units of a world to a compressed .npz file."""
+    arrays = {"size": np.array(i_world.size)}
+    # Storage backend of each layer, to load it with the same ones
+    storageNames = i_world.storageNames
+    arrays["storage.layers"] = np.array(list(storageNames.keys()))
+    arrays["storage.names"] = np.array(list(storageNames.values()))
+    for name, layer in zip(i_world.layerNames, i_world.layers):
+        arrays[name] = np.asarray(layer.cells).astype(np.uint16)
+    units = list(i_world.units.units)
+    arrays["units.cells"] = np.array([coords for coords, _ in units], dtype=np.int32).reshape([-1, 2])
+    slots = np.array([unit.slot for _, unit in units], dtype=np.intp)
+    for key, column in i_world.units.unitStore.exportRows(slots).items():
+        arrays[f"units.{key}"] = column
+    # Write to a temporary file first, so that the file is always complete
+    temporaryPath = i_path + ".tmp.npz"
+    np.savez_compressed(temporaryPath, **arrays)
+    os.replace(temporaryPath, i_path)
+
+
+def loadWorld(i_path: str, i_storage: Union[str, Dict[str, str], None] = None) -> World:
+    """Load a world saved by saveWorld(). Layers get the storage backends they were saved with,
+    or the ones given as in World(). Memory-mapped layers are loaded as chunked, without their files."""
+    with np.load(i_path) as arrays:
+        width, height = arrays["size"].tolist()
+        if i_storage is None and "storage.layers" in arrays:
+            i_storage = {
+                name: "chunked" if storage == "memmap" else storage
+                for name, storage in zip(arrays["storage.layers"].tolist(), arrays["storage.names"].tolist())
+            }
+        world = World(width, height, i_storage)
+        for name, layer in zip(world.layerNames, world.layers):
+            if name != "units":
+                layer.writeArea(0, 0, arrays[name])
+        store = UnitStore(1)
+        slots = store.importRows({key: arrays[f"units.{key}"] for key in ["playerIds", "unitClasses", "properties", "flags"]})
+        for (x, y), slot in zip(arrays["units.cells"].tolist(), slots.tolist()):
+            world.units.setUnit((x, y), CellValue.UNITS_UNIT, Unit.fromSlot(store, slot))
+    return world
@@ -1,18 +1,29 @@
 import logging
-from core.state import World, GameState
-from core.constants import CellValue
+import os
+from core.state import World, GameState, saveWorld, loadWorld
+from core.logic.Journal import Journal
 from ui import UserInterface, Theme
 
 logging.basicConfig(level=logging.INFO, format='\r%(asctime)s %(filename)s:%(lineno)d: %(message)s')
 
+# Saved map, journal of the edits made since it was saved, and log of all its revisions
+MAP_PATH = "map.npz"
+JOURNAL_PATH = "map.journal"
+HISTORY_DIRECTORY = "map.history"
+
 # Create a basic game state
 from ui.mode import EditGameMode
 
-world = World(80, 60)
-ground = world.ground
-for y in range(0, world.height):
-    for x in range(0, world.width):
-        ground.set_cell_value(x, y, CellValue.GROUND_SEA)
+if os.path.exists(MAP_PATH):
+    world = loadWorld(MAP_PATH)
+else:
+    # All sea, the default ground value: no chunk is allocated until something is painted
+    world = World(80, 60)
+
+# Replay the edits that were not saved, after a crash
+journal = Journal(world, JOURNAL_PATH)
+if journal.recoveredFrames > 0:
+    logging.info(f"Recovered {journal.recoveredFrames} frames of edits from {JOURNAL_PATH}")
 
 # Create a user interface object and run it
 state = GameState(world)
@@ -20,8 +31,13 @@ theme = Theme()
 tileSize = theme.getTileset("ground").tileSize
 theme.viewSize = (20 * tileSize[0], 15 * tileSize[1])
 user_interface = UserInterface(theme)
-gameMode = EditGameMode(theme, state)
+gameMode = EditGameMode(theme, state, journal, HISTORY_DIRECTORY)
 user_interface.setGameMode(gameMode)
 
 user_interface.run()
-user_interface.quit()
\ No newline at end of file
+user_interface.quit()
+
+# The saved map has all the edits, the journal can start over
+saveWorld(world, MAP_PATH)
+journal.clear()
+journal.dispose()
@@ -0,0 +1,41 @@
+import numpy as np
+
+from core.constants import CellValue
+from core.logic import Logic
+from core.logic.Brush import Brush
+from core.state import World
+from tools.raster import rasterCircle, rasterLine, rasterRectangle
+
+
+def test_raster_shapes():
+    xs, ys = rasterCircle(2)
+    assert len(xs) == 21 and (2, 0) in zip(xs.tolist(), ys.tolist()) and (2, 2) not in zip(xs.tolist(), ys.tolist())
+    xs, ys = rasterLine((0, 0), (6, -3))
+    assert len(xs) == 7 and (xs[-1], ys[-1]) == (6, -3)
+    assert np.all(np.abs(np.diff(xs)) == 1) and np.all(np.abs(np.diff(ys)) <= 1)
+    xs, ys = rasterRectangle((4, 1), (0, 3), False)
+    assert len(xs) == 5 * 3 - 3
+
+
+def test_brush_commands():
+    world = World(64, 48)
+    logic = Logic(world)
+
+    # A circle stamp clipped by the world border is one batch edit
+    minX, minY, mask = Brush("circle", 9).mask((1, 1), (1, 1), world.size)
+    assert (minX, minY, mask.shape) == (0, 0, (6, 6))
+    logic.addCommand(Brush("circle", 9).command("ground", (1, 1), (1, 1), world.size, CellValue.GROUND_EARTH))
+    logic.executeCommands()
+    assert world.ground.countValues((0, 64, 0, 48), [CellValue.GROUND_EARTH]) == np.count_nonzero(mask)
+
+    # A fast drag between two cells paints the whole path
+    logic.addCommand(Brush("square", 1).command("ground", (40, 2), (50, 40), world.size, CellValue.GROUND_EARTH))
+    logic.executeCommands()
+    assert world.ground.countValues((40, 51, 2, 41), [CellValue.GROUND_EARTH]) == 39
+
+    # Shapes between two cells, with the rules of the layer: no trees on the sea
+    logic.addCommand(Brush("filledRectangle", 3).command("ground", (10, 10), (20, 15), world.size, CellValue.GROUND_EARTH))
+    logic.addCommand(Brush("line", 1).command("objects", (5, 12), (30, 12), world.size, CellValue.OBJECTS_TREES))
+    logic.executeCommands()
+    assert world.ground.countValues((9, 22, 9, 17), [CellValue.GROUND_EARTH]) == 13 * 8
+    assert world.objects.countValues((0, 64, 0, 48), [CellValue.OBJECTS_TREES]) == 21 - 9 + 1
@@ -0,0 +1,76 @@
+from core.constants import CellValue
+from core.logic import Command, Logic
+from core.logic.CommandQueue import CommandQueue
+from core.state import World
+
+
+class RecordCommand(Command):
+    def __init__(self, i_priority: int, i_name: str, i_log: list):
+        self.__priority = i_priority
+        self.__name = i_name
+        self.__log = i_log
+
+    def priority(self) -> int:
+        return self.__priority
+
+    def check(self, logic) -> bool:
+        return True
+
+    def execute(self, logic):
+        self.__log.append(self.__name)
+
+
+def test_command_queue_order():
+    log = []
+    queue = CommandQueue()
+    queue.push(RecordCommand(5, "a", log))
+    queue.extend([RecordCommand(1, "b", log), RecordCommand(5, "c", log), RecordCommand(1, "d", log)])
+    assert len(queue) == 4
+    for command in queue.drain():
+        command.execute(None)
+    assert log == ["b", "d", "a", "c"]
+    assert len(queue) == 0
+
+
+def test_same_cell_commands():
+    world = World(5000, 2, "chunked")
+    logic = Logic(world)
+    Command = logic.getSetLayerValueCommand("ground")
+    # Every command of the same cell runs, in submission order
+    logic.addCommands([
+        Command((4500, 1), CellValue.GROUND_EARTH),
+        Command((4500, 1), CellValue.GROUND_SEA),
+        Command((4500, 1), CellValue.GROUND_EARTH),
+    ])
+    logic.executeCommands()
+    assert world.ground.get_cell_value((4500, 1)) == CellValue.GROUND_EARTH
+
+
+def test_time_budget():
+    world = World(512, 512)
+    logic = Logic(world)
+    Command = logic.getSetLayerValueCommand("ground")
+    logic.addCommands([Command((x, 0), CellValue.GROUND_EARTH) for x in range(10)])
+    # Without time, one command runs per call
+    logic.executeCommands(0.0)
+    assert logic.busy and logic.progress == 0.1
+    logic.executeCommands(0.0)
+    assert logic.pendingCount == 8
+    assert world.ground.get_cell_value((1, 0)) == CellValue.GROUND_EARTH
+    assert world.ground.get_cell_value((2, 0)) == CellValue.GROUND_SEA
+    logic.executeCommands()
+    assert not logic.busy and logic.progress is None
+    assert world.ground.maskArea((0, 10, 0, 1), [CellValue.GROUND_EARTH]).all()
+
+    # Fills are set in steps, that continue before the next commands
+    logic.addCommand(Command((0, 5), CellValue.GROUND_EARTH, None, True))
+    logic.addCommand(Command((5, 5), CellValue.GROUND_SEA))
+    steps = 0
+    while True:
+        logic.executeCommands(0.0)
+        steps += 1
+        if not logic.busy:
+            break
+    assert steps > 1
+    assert world.ground.countValues((0, 512, 0, 512), [CellValue.GROUND_EARTH]) == 512 * 512 - 1
+    assert world.ground.get_cell_value((5, 5)) == CellValue.GROUND_SEA
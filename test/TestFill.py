@@ -0,0 +1,124 @@
+from collections import deque
+
+import numpy as np
+import pytest
+
+from core.constants import CellValue, UnitClass
+from core.logic import Logic
+from core.logic.commands import SetLayerCellsCommand
+from core.logic import fill as fillModule
+from core.logic.fill import computeFillArea
+from core.logic.rules import canSetCells, canSetCell, canSetMask
+from core.state import World, Unit
+from tools.labeling import fillRegion, labelRegions
+
+
+def randomWorld(i_seed: int) -> World:
+    world = World(40, 30)
+    rng = np.random.default_rng(i_seed)
+    world.ground.writeArea(0, 0, np.where(rng.random((40, 30)) < 0.8, CellValue.GROUND_EARTH, CellValue.GROUND_SEA))
+    land = world.ground.maskArea((0, 40, 0, 30), [CellValue.GROUND_EARTH])
+    world.impassable.writeMask(0, 0, land & (rng.random((40, 30)) < 0.15), CellValue.IMPASSABLE_RIVER)
+    world.impassable.writeMask(0, 30 // 2, land[:, 15:] & (rng.random((40, 15)) < 0.05), CellValue.IMPASSABLE_MOUNTAIN)
+    free = land & world.impassable.maskArea((0, 40, 0, 30), [CellValue.NONE])
+    world.objects.writeMask(0, 0, free & (rng.random((40, 30)) < 0.2), CellValue.OBJECTS_TREES)
+    return world
+
+
+def referenceFill(i_world: World, i_layerName: str, i_seed, i_value, i_unit=None):
+    # Fill with a chain of single cell commands, like the editor used to
+    logic = Logic(i_world)
+    Command = logic.getSetLayerValueCommand(i_layerName)
+    queue, seen = deque([i_seed]), {i_seed}
+    while queue:
+        x, y = queue.popleft()
+        command = Command((x, y), i_value, i_unit, False)
+        if not command.check(logic):
+            continue
+        command.execute(logic)
+        for cell in [(x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)]:
+            if cell not in seen:
+                seen.add(cell)
+                queue.append(cell)
+
+
+@pytest.mark.parametrize("layerName,value,unitClass", [
+    ("ground", CellValue.GROUND_SEA, None),
+    ("ground", CellValue.GROUND_EARTH, None),
+    ("impassable", CellValue.IMPASSABLE_MOUNTAIN, None),
+    ("impassable", CellValue.NONE, None),
+    ("objects", CellValue.OBJECTS_ROAD_DIRT, None),
+    ("objects", CellValue.NONE, None),
+    ("units", CellValue.UNITS_UNIT, UnitClass.WORKER),
+])
+def test_fill_matches_commands(layerName, value, unitClass):
+    for seed in range(3):
+        expected = randomWorld(seed)
+        actual = randomWorld(seed)
+        for cell in [(5, 5), (20, 15), (39, 29)]:
+            unit = None if unitClass is None else Unit(unitClass)
+            referenceFill(expected, layerName, cell, value, unit)
+            logic = Logic(actual)
+            Command = logic.getSetLayerValueCommand(layerName)
+            logic.addCommand(Command(cell, value, None if unitClass is None else Unit(unitClass), True))
+            logic.executeCommands()
+            for name in expected.layerNames:
+                assert np.array_equal(np.asarray(expected.getLayer(name).cells), np.asarray(actual.getLayer(name).cells))
+
+
+def test_fill_region():
+    mask = np.array([
+        [1, 1, 0, 1],
+        [0, 1, 0, 1],
+        [1, 1, 0, 0],
+        [1, 0, 1, 1],
+    ], dtype=bool)
+    region = fillRegion(mask, (0, 0))
+    assert region.tolist() == [
+        [True, True, False, False],
+        [False, True, False, False],
+        [True, True, False, False],
+        [True, False, False, False],
+    ]
+    assert not fillRegion(mask, (0, 2)).any()
+
+    # Same regions as the labels of the mask
+    mask = np.random.default_rng(3).random((60, 50)) < 0.6
+    labels, _ = labelRegions(mask)
+    for seed in [(0, 0), (30, 25), (59, 49), (12, 40)]:
+        assert np.array_equal(fillRegion(mask, seed), mask[seed] & (labels == labels[seed]))
+
+
+@pytest.mark.parametrize("layerName,value,unitClass", [
+    ("ground", CellValue.GROUND_SEA, None),
+    ("impassable", CellValue.NONE, None),
+    ("objects", CellValue.OBJECTS_ROAD_STONE, None),
+    ("units", CellValue.UNITS_UNIT, UnitClass.WORKER),
+])
+def test_batch_rules(layerName, value, unitClass):
+    world = randomWorld(4)
+    rng = np.random.default_rng(4)
+    xs, ys = rng.integers(-2, 42, 300), rng.integers(-2, 32, 300)
+    unit = None if unitClass is None else Unit(unitClass)
+    # The batch and the single cell paths agree
+    accepted = canSetCells(world, layerName, xs, ys, value, unit)
+    assert accepted.tolist() == [canSetCell(world, layerName, (int(x), int(y)), value, unit) for x, y in zip(xs, ys)]
+
+    logic = Logic(world)
+    logic.addCommand(SetLayerCellsCommand(layerName, xs, ys, value, unit))
+    logic.executeCommands()
+    layer = world.getLayer(layerName)
+    assert all(layer.get_cell_value((int(x), int(y))) == value for x, y in zip(xs[accepted], ys[accepted]))
+
+
+def test_fill_box_growth(monkeypatch):
+    # Fills found from a small box around the seed match the fill of the whole world
+    world = randomWorld(5)
+    box = (0, 40, 0, 30)
+    monkeypatch.setattr(fillModule, "FILL_BOX_SIZE", 4)
+    for seed in [(0, 0), (20, 15), (39, 29), (7, 22)]:
+        expected = fillRegion(canSetMask(world, "objects", box, CellValue.OBJECTS_ROAD_DIRT), seed)
+        minX, minY, region = computeFillArea(world, "objects", seed, CellValue.OBJECTS_ROAD_DIRT)
+        actual = np.zeros(expected.shape, dtype=bool)
+        actual[minX:minX + region.shape[0], minY:minY + region.shape[1]] = region
+        assert np.array_equal(actual, expected)
@@ -0,0 +1,128 @@
+import numpy as np
+
+from core.constants import CellValue, UnitClass, UnitProperty
+from core.logic import Logic
+from core.logic.HistoryLog import HistoryLog
+from core.state import World, Unit
+from .worldhelpers import layerArrays, unitsOf
+
+
+def test_undo_redo_transactions():
+    world = World(32, 24)
+    logic = Logic(world)
+    Command = logic.getSetLayerValueCommand("ground")
+    initial = layerArrays(world)
+
+    # A stroke is a single transaction, even when a cell is set twice
+    logic.beginTransaction()
+    logic.addCommands([Command((x, 3), CellValue.GROUND_EARTH) for x in range(10)])
+    logic.addCommand(Command((4, 3), CellValue.GROUND_SEA))
+    logic.addCommand(Command((4, 3), CellValue.GROUND_EARTH))
+    logic.endTransaction()
+    logic.executeCommands()
+    stroke = layerArrays(world)
+
+    # A fill is another one
+    logic.addCommand(Command((0, 0), CellValue.GROUND_SEA, None, True))
+    logic.addCommand(Command((0, 0), CellValue.GROUND_EARTH, None, True))
+    logic.executeCommands()
+    assert world.ground.countValues((0, 32, 0, 24), [CellValue.GROUND_EARTH]) == 32 * 24
+
+    logic.undo()
+    logic.executeCommands()
+    assert all(np.array_equal(a, b) for a, b in zip(layerArrays(world), stroke))
+    logic.undo()
+    logic.executeCommands()
+    assert all(np.array_equal(a, b) for a, b in zip(layerArrays(world), initial))
+    assert not logic.history.canUndo
+    logic.redo()
+    logic.executeCommands()
+    assert all(np.array_equal(a, b) for a, b in zip(layerArrays(world), stroke))
+
+    # A new edit drops the undone transactions
+    logic.addCommand(Command((20, 20), CellValue.GROUND_EARTH))
+    logic.executeCommands()
+    logic.history.commit()
+    assert not logic.history.canRedo
+
+
+def test_undo_units():
+    world = World(16, 16)
+    world.ground.writeArea(0, 0, np.full([16, 16], CellValue.GROUND_EARTH))
+    logic = Logic(world)
+    Command = logic.getSetLayerValueCommand("units")
+    knight = Unit(UnitClass.KNIGHT, 1)
+    knight.setProperty(UnitProperty.HIT_POINTS, 7)
+    logic.addCommand(Command((2, 2), CellValue.UNITS_UNIT, knight))
+    logic.executeCommands()
+    placed = unitsOf(world)
+
+    # Remove the knight, and fill with workers
+    logic.addCommand(Command((2, 2), CellValue.NONE))
+    logic.addCommand(Command((0, 0), CellValue.UNITS_UNIT, Unit(UnitClass.WORKER), True))
+    logic.executeCommands()
+    assert len(unitsOf(world)) == 16 * 16
+
+    logic.undo()
+    logic.undo()
+    logic.executeCommands()
+    assert unitsOf(world) == placed
+    assert world.units.getUnit((2, 2)).getProperty(UnitProperty.HIT_POINTS) == 7
+    logic.redo()
+    logic.executeCommands()
+    assert unitsOf(world) == {}
+
+
+def test_history_memory_cap():
+    world = World(64, 64)
+    logic = Logic(world, 1000)
+    Command = logic.getSetLayerValueCommand("ground")
+    for y in range(10):
+        logic.addCommands([Command((x, y), CellValue.GROUND_EARTH) for x in range(64)])
+        logic.executeCommands()
+    logic.history.commit()
+    assert 0 < logic.history.nbytes <= 1000
+    undone = 0
+    while logic.history.undo():
+        undone += 1
+    assert 0 < undone < 10
+    assert world.ground.countValues((0, 64, 0, 10), [CellValue.GROUND_EARTH]) == 64 * (10 - undone)
+
+
+def test_history_log(tmp_path):
+    world = World(32, 24)
+    logic = Logic(world)
+    log = HistoryLog(logic.history, str(tmp_path), 3)
+    Ground = logic.getSetLayerValueCommand("ground")
+    Units = logic.getSetLayerValueCommand("units")
+    expected = [(layerArrays(world), unitsOf(world))]
+    for step in range(8):
+        if step == 5:
+            logic.undo()
+        else:
+            logic.beginTransaction()
+            logic.addCommand(Ground((step, step), CellValue.GROUND_EARTH, None, step == 3))
+            logic.addCommand(Units((step, step), CellValue.UNITS_UNIT, Unit(UnitClass.KNIGHT, step)))
+            logic.endTransaction()
+        # Transactions are committed once their commands ran
+        logic.executeCommands()
+        expected.append((layerArrays(world), unitsOf(world)))
+        assert log.revision == step + 1
+    log.dispose()
+    logic.dispose()
+
+    # Reopened logs continue from their last revision, and get the last transaction when the logic is disposed
+    logic = Logic(world, i_historyDirectory=str(tmp_path))
+    logic.beginTransaction()
+    logic.addCommand(Ground((20, 20), CellValue.GROUND_SEA))
+    logic.executeCommands()
+    expected.append((layerArrays(world), unitsOf(world)))
+    log = logic.historyLog
+    assert log.revision == 8
+    logic.dispose()
+    assert log.revision == 9
+    assert log.revisionAt(log.getTime(4)) == 4
+    for revision, (arrays, units) in enumerate(expected):
+        loaded = log.load(revision)
+        assert all(np.array_equal(a, b) for a, b in zip(layerArrays(loaded), arrays))
+        assert unitsOf(loaded) == units
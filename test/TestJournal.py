@@ -0,0 +1,70 @@
+import os
+
+import numpy as np
+
+from core.constants import CellValue, UnitClass, UnitProperty
+from core.logic import Logic
+from core.logic.Journal import Journal
+from core.state import World, Unit, saveWorld, loadWorld
+from .worldhelpers import layerArrays, unitsOf
+
+
+def test_journal_recovery(tmp_path):
+    mapPath, journalPath = str(tmp_path / "map.npz"), str(tmp_path / "map.journal")
+    world = World(48, 32)
+    world.ground.writeArea(0, 0, np.full([48, 32], CellValue.GROUND_EARTH))
+    saveWorld(world, mapPath)
+    journal = Journal(world, journalPath)
+    logic = Logic(world, i_journal=journal)
+    Ground = logic.getSetLayerValueCommand("ground")
+    Units = logic.getSetLayerValueCommand("units")
+
+    # A stroke, a fill, units and an undo, each executed in its own frame
+    logic.addCommands([Ground((x, 4), CellValue.GROUND_SEA) for x in range(48)])
+    logic.executeCommands()
+    logic.addCommand(Ground((0, 20), CellValue.GROUND_SEA, None, True))
+    logic.executeCommands()
+    knight = Unit(UnitClass.KNIGHT, 2)
+    knight.setProperty(UnitProperty.HIT_POINTS, 5)
+    logic.addCommand(Units((30, 2), CellValue.UNITS_UNIT, knight))
+    logic.addCommand(Units((31, 2), CellValue.UNITS_UNIT, Unit(UnitClass.WORKER, 1)))
+    logic.executeCommands()
+    logic.addCommand(Units((31, 2), CellValue.NONE))
+    logic.executeCommands()
+    logic.undo()
+    logic.executeCommands()
+    expected = (layerArrays(world), unitsOf(world))
+    journal.dispose()
+
+    # Crash: the saved map and the journal give back the edited world
+    recovered = loadWorld(mapPath)
+    journal = Journal(recovered, journalPath)
+    assert journal.recoveredFrames == 5
+    assert all(np.array_equal(a, b) for a, b in zip(layerArrays(recovered), expected[0]))
+    assert unitsOf(recovered) == expected[1]
+    journal.dispose()
+
+    # A frame cut by a crash is dropped
+    size = os.path.getsize(journalPath)
+    with open(journalPath, "ab") as file:
+        file.write(b"EDIT\x40\x00\x00\x00partial")
+    journal = Journal(loadWorld(mapPath), journalPath)
+    assert journal.recoveredFrames == 5
+    assert os.path.getsize(journalPath) == size
+
+    # Cleared once the map is saved
+    journal.clear()
+    journal.dispose()
+    journal = Journal(loadWorld(mapPath), journalPath)
+    assert journal.recoveredFrames == 0
+    journal.dispose()
+
+    # A header cut by a crash is written again
+    with open(journalPath, "r+b") as file:
+        file.truncate(3)
+    journal = Journal(loadWorld(mapPath), journalPath)
+    assert journal.recoveredFrames == 0
+    journal.dispose()
+    journal = Journal(loadWorld(mapPath), journalPath)
+    assert journal.recoveredFrames == 0
+    journal.dispose()
@@ -0,0 +1,308 @@
+import os
+
+import numpy as np
+import pytest
+
+from core.constants import CellValue, UnitClass
+from core.state import Layer, World, Unit, ILayerListener, saveWorld, loadWorld
+
+
+def paintLayers(i_layers, i_width, i_height):
+    # Paint the same pseudo-random cells in every layer
+    generator = np.random.default_rng(42)
+    for _ in range(500):
+        x = int(generator.integers(0, i_width))
+        y = int(generator.integers(0, i_height))
+        for layer in i_layers:
+            layer.set_cell_value(x, y, CellValue.GROUND_EARTH)
+
+
+@pytest.mark.parametrize("storage", ["chunked", "memmap", "sparse"])
+def test_storage_matches_dense(storage, tmp_path):
+    # A layer spanning several chunks, with a size that is not a multiple of the chunk size
+    width, height = 150, 70
+    dense = Layer(width, height, CellValue.GROUND_SEA)
+    other = Layer(width, height, CellValue.GROUND_SEA, storage, str(tmp_path / "ground.cells"))
+    paintLayers([dense, other], width, height)
+
+    assert np.array_equal(np.asarray(dense.cells), np.asarray(other.cells))
+    assert np.array_equal(dense.cells[60:130, 5:66], other.cells[60:130, 5:66])
+    assert dense.cells[63, 64] == other.cells[63, 64]
+
+    # Neighbors across chunk borders and the layer border
+    for box in [(0, width, 0, height), (60, 70, 60, 70), (127, 129, 0, 1)]:
+        assert np.array_equal(dense.getAreaNeighbors4(box), other.getAreaNeighbors4(box))
+        assert np.array_equal(dense.getAreaNeighbors8(box), other.getAreaNeighbors8(box))
+    for cell in [(0, 0), (63, 63), (64, 64), (width - 1, height - 1)]:
+        assert dense.getNeighbors4(cell) == other.getNeighbors4(cell)
+        assert dense.getNeighbors8(cell) == other.getNeighbors8(cell)
+
+    # Non-default cells of a region
+    box = (30, 140, 10, 60)
+    expected = sorted(zip(*[a.tolist() for a in dense.getNonDefaultCells(box)]))
+    assert sorted(zip(*[a.tolist() for a in other.getNonDefaultCells(box)])) == expected
+
+
+def test_chunked_allocation():
+    # Only painted chunks use memory
+    world = World(4096, 4096, "chunked")
+    ground = world.ground
+    assert ground.storage.chunkCount == 0
+    assert ground.get_cell_value((4000, 4000)) == CellValue.GROUND_SEA
+
+    ground.set_cell_value(4000, 4000, CellValue.GROUND_EARTH)
+    ground.set_cell_value(10, 10, CellValue.GROUND_SEA)
+    assert ground.storage.chunkCount == 1
+    assert ground.get_cell_value((4000, 4000)) == CellValue.GROUND_EARTH
+
+    # Chunks back to the default value can be released
+    ground.set_cell_value(4000, 4000, CellValue.GROUND_SEA)
+    assert ground.storage.compact() == 1
+    assert ground.storage.chunkCount == 0
+
+
+def test_default_storage_saved_map(tmp_path):
+    # Maps created or loaded by the editor only allocate their painted terrain chunks
+    world = World(1024, 1024)
+    world.ground.set_cell_value(500, 500, CellValue.GROUND_EARTH)
+    path = str(tmp_path / "map.npz")
+    saveWorld(world, path)
+    loaded = loadWorld(path)
+    assert loaded.ground.storage.chunkCount == 1
+    assert loaded.impassable.storage.chunkCount == 0
+    assert loaded.ground.get_cell_value((500, 500)) == CellValue.GROUND_EARTH
+    assert loaded.storageNames == {"ground": "chunked", "impassable": "chunked", "objects": "sparse", "units": "sparse"}
+
+    # Layers are loaded with the storage backends they were saved with
+    saveWorld(World(64, 64, {"objects": "chunked"}), path)
+    assert loadWorld(path).storageNames["objects"] == "chunked"
+    assert loadWorld(path, "dense").storageNames["objects"] == "dense"
+
+
+def test_memmap_persistence(tmp_path):
+    # Edits are kept in the files without any save step
+    directory = str(tmp_path / "world")
+    world = World(300, 200, "memmap", directory)
+    world.ground.set_cell_value(250, 150, CellValue.GROUND_EARTH)
+    world.objects.set_cell_value(250, 150, CellValue.OBJECTS_TREES)
+    world.flush()
+    assert os.path.exists(os.path.join(directory, "ground.cells"))
+
+    reopened = World(300, 200, "memmap", directory)
+    assert reopened.ground.get_cell_value((250, 150)) == CellValue.GROUND_EARTH
+    assert reopened.ground.get_cell_value((0, 0)) == CellValue.GROUND_SEA
+    assert reopened.objects.get_cell_value((250, 150)) == CellValue.OBJECTS_TREES
+
+    # Files of another size are rejected
+    with pytest.raises(ValueError):
+        World(100, 100, "memmap", directory)
+
+
+def test_compact_values():
+    # Cells are stored as uint8 indices, values are converted at the API boundary
+    world = World(20, 10)
+    objects = world.objects
+    assert objects.storage.dtype == np.uint8
+    objects.set_cell_value(3, 4, CellValue.OBJECTS_TREES)
+    objects.set_cell_value(4, 4, CellValue.OBJECTS_ROAD_DIRT)
+    assert objects.get_cell_value((3, 4)) == CellValue.OBJECTS_TREES
+    assert objects.cells[3, 4] == CellValue.OBJECTS_TREES
+    assert objects.cells[0:10, 4].tolist()[3:5] == [CellValue.OBJECTS_TREES, CellValue.OBJECTS_ROAD_DIRT]
+
+    # Neighbor masks match comparisons on the neighbor values
+    box = (0, 20, 0, 10)
+    roads = [CellValue.OBJECTS_ROAD_DIRT, CellValue.OBJECTS_ROAD_STONE]
+    neighbors = objects.getAreaNeighbors4(box)
+    assert np.array_equal(objects.maskAreaNeighbors4(box, roads), np.isin(neighbors, roads))
+    neighbors = objects.getAreaNeighbors8(box)
+    assert np.array_equal(objects.maskAreaNeighbors8(box, roads), np.isin(neighbors, roads))
+
+
+@pytest.mark.parametrize("storage", ["dense", "chunked", "sparse"])
+def test_bulk_access(storage):
+    world = World(150, 100, storage)
+    ground = world.ground
+    rng = np.random.default_rng(1)
+    values = rng.choice([CellValue.GROUND_SEA, CellValue.GROUND_EARTH], size=(70, 90))
+    world.writeArea("ground", 40, 5, values)
+    assert np.array_equal(ground.cells[40:110, 5:95], values)
+
+    xs, ys = rng.integers(0, 150, 500), rng.integers(0, 100, 500)
+    assert np.array_equal(world.gatherValues("ground", xs, ys), np.asarray(ground.cells)[xs, ys])
+
+    world.scatterValues("ground", xs[:10], ys[:10], CellValue.GROUND_EARTH)
+    assert np.all(ground.gatherValues(xs[:10], ys[:10]) == CellValue.GROUND_EARTH)
+
+    mask = np.zeros((10, 10), dtype=bool)
+    mask[2:5, 3] = True
+    world.writeMask("ground", 0, 0, mask, CellValue.GROUND_EARTH)
+    assert np.all(ground.cells[0:10, 0:10][mask] == CellValue.GROUND_EARTH)
+
+    # Units reset by a bulk write are removed
+    units = world.units
+    units.setUnit((5, 5), CellValue.UNITS_UNIT, Unit(UnitClass.WORKER))
+    units.writeMask(5, 5, np.ones((1, 1), dtype=bool), CellValue.NONE)
+    assert units.getUnit((5, 5)) is None
+
+    # Bounds are checked for the whole batch
+    with pytest.raises(ValueError):
+        ground.gatherValues(np.array([0, 150]), np.array([0, 0]))
+    with pytest.raises(ValueError):
+        ground.writeArea(100, 0, values)
+
+
+def test_bulk_writes_remove_units():
+    # Small writes check the written cells, large ones the cells of the units
+    world = World(64, 64)
+    units = world.units
+    for x in range(0, 64, 4):
+        units.setUnit((x, 10), CellValue.UNITS_UNIT, Unit(UnitClass.WORKER))
+    units.scatterValues(np.array([4, 4, 5]), np.array([10, 10, 10]), CellValue.NONE)
+    units.writeMask(8, 10, np.ones((1, 1), dtype=bool), CellValue.NONE)
+    units.writeArea(12, 9, np.full((1, 3), CellValue.NONE))
+    assert [units.getUnit((x, 10)) is None for x in range(0, 20, 4)] == [False, True, True, True, False]
+    units.writeArea(0, 0, np.full((64, 32), CellValue.NONE))
+    assert list(units.units) == []
+
+
+class RecordingListener(ILayerListener):
+    def __init__(self):
+        self.cells = []
+        self.batches = []
+
+    def cellChanged(self, i_layer, i_cell):
+        self.cells.append(i_cell)
+
+    def cellsChanged(self, i_layer, i_cellsBox, i_mask):
+        self.batches.append((i_cellsBox, i_mask.copy()))
+        super().cellsChanged(i_layer, i_cellsBox, i_mask)
+
+
+def test_batched_notifications():
+    world = World(50, 40)
+    ground = world.ground
+    listener = RecordingListener()
+    ground.registerListener(listener)
+
+    # Changes are collected until notifyPendingChanges()
+    ground.notifyCellChanged((3, 4))
+    ground.notifyCellsChanged(np.array([10, 3]), np.array([6, 4]))
+    ground.notifyAreaChanged((20, 22, 30, 31))
+    assert listener.batches == []
+    world.notifyPendingChanges()
+    assert len(listener.batches) == 1
+    cellsBox, mask = listener.batches[0]
+    assert cellsBox == (3, 22, 4, 31)
+    assert mask.sum() == 4
+    assert sorted(listener.cells) == [(3, 4), (10, 6), (20, 30), (21, 30)]
+
+    # Nothing left to notify
+    world.notifyPendingChanges()
+    assert len(listener.batches) == 1
+    ground.removeListener(listener)
+
+    # Distant changes get their own small boxes
+    world = World(1000, 1000)
+    world.ground.registerListener(listener)
+    world.ground.notifyCellChanged((1, 2))
+    world.ground.notifyAreaChanged((990, 995, 996, 998))
+    world.notifyPendingChanges()
+    assert sorted(cellsBox for cellsBox, _ in listener.batches[1:]) == [(1, 2, 2, 3), (990, 995, 996, 998)]
+
+
+def test_summed_area_table():
+    world = World(300, 200, "chunked")
+    objects = world.objects
+    rng = np.random.default_rng(3)
+    trees = rng.random((300, 200)) < 0.3
+    objects.writeMask(0, 0, trees, CellValue.OBJECTS_TREES)
+    table = objects.getSummedAreaTable([CellValue.OBJECTS_TREES])
+    assert objects.getSummedAreaTable([CellValue.OBJECTS_TREES]) is table
+    assert table.count((0, 300, 0, 200)) == trees.sum()
+    assert table.count((10, 74, 20, 84)) == trees[10:74, 20:84].sum()
+
+    # Edits are taken into account on the next count
+    objects.set_cell_value(50, 60, CellValue.NONE)
+    objects.set_cell_value(51, 60, CellValue.OBJECTS_TREES)
+    trees[50, 60], trees[51, 60] = False, True
+    objects.writeArea(200, 100, np.full((30, 40), CellValue.OBJECTS_TREES))
+    trees[200:230, 100:140] = True
+    assert table.count((0, 50, 0, 200)) == trees[0:50, :].sum()
+    for box in [(40, 60, 50, 70), (190, 300, 90, 200), (0, 300, 0, 200)]:
+        minX, maxX, minY, maxY = box
+        assert objects.countValues(box, [CellValue.OBJECTS_TREES]) == trees[minX:maxX, minY:maxY].sum()
+    assert table.fraction((200, 230, 100, 140)) == 1.0
+
+
+def test_value_index():
+    world = World(300, 200, "sparse")
+    objects = world.objects
+    objects.set_cell_value(10, 10, CellValue.OBJECTS_TREES)
+    index = objects.getValueIndex()
+    objects.scatterValues(np.array([150, 290, 20]), np.array([100, 190, 15]), CellValue.OBJECTS_TREES)
+    objects.set_cell_value(20, 15, CellValue.OBJECTS_ROAD_DIRT)
+
+    xs, ys = objects.findCells(CellValue.OBJECTS_TREES)
+    assert sorted(zip(xs.tolist(), ys.tolist())) == [(10, 10), (150, 100), (290, 190)]
+    assert index.count(CellValue.OBJECTS_ROAD_DIRT) == 1
+    assert index.nearest(CellValue.OBJECTS_TREES, (200, 150)) == (150, 100)
+    assert index.nearest(CellValue.OBJECTS_TREES, (299, 199)) == (290, 190)
+    assert index.nearest(CellValue.OBJECTS_TREES, (200, 150), 10) is None
+
+    objects.set_cell_value(150, 100, CellValue.NONE)
+    assert index.nearest(CellValue.OBJECTS_TREES, (200, 150)) == (290, 190)
+    assert index.count(CellValue.OBJECTS_TREES) == 2
+
+
+def test_scatter_duplicate_cells():
+    # A cell written twice in a batch gets its last value, and is indexed once
+    world = World(100, 100)
+    objects = world.objects
+    index = objects.getValueIndex()
+    xs, ys = np.array([5, 7, 5, 9]), np.array([5, 7, 5, 9])
+    objects.scatterValues(xs, ys, [CellValue.OBJECTS_TREES, CellValue.OBJECTS_TREES, CellValue.OBJECTS_ROAD_DIRT,
+                                   CellValue.OBJECTS_TREES])
+    assert objects.get_cell_value((5, 5)) == CellValue.OBJECTS_ROAD_DIRT
+    assert index.count(CellValue.OBJECTS_TREES) == 2
+    assert index.count(CellValue.OBJECTS_ROAD_DIRT) == 1
+    objects.scatterValues(xs, ys, CellValue.NONE)
+    assert index.count(CellValue.OBJECTS_TREES) == 0 and index.count(CellValue.OBJECTS_ROAD_DIRT) == 0
+
+
+@pytest.mark.parametrize("storage", ["dense", "chunked", "sparse"])
+def test_snapshot(storage):
+    world = World(200, 150, storage)
+    world.ground.writeArea(0, 0, np.full((100, 100), CellValue.GROUND_EARTH))
+    world.objects.set_cell_value(10, 10, CellValue.OBJECTS_TREES)
+    unit = Unit(UnitClass.WORKER, 1)
+    world.units.setUnit((20, 20), CellValue.UNITS_UNIT, unit)
+    expected = np.asarray(world.ground.cells).copy()
+
+    snapshot = world.snapshot()
+    world.ground.writeArea(50, 50, np.full((100, 100), CellValue.GROUND_SEA))
+    world.objects.set_cell_value(10, 10, CellValue.NONE)
+    unit.playerId = 2
+    world.units.setUnit((20, 20), CellValue.NONE)
+
+    # The snapshot keeps the values at the time it was taken
+    assert np.array_equal(np.asarray(snapshot.ground.cells), expected)
+    assert snapshot.objects.get_cell_value((10, 10)) == CellValue.OBJECTS_TREES
+    assert snapshot.units.getUnit((20, 20)).playerId == 1
+    assert world.ground.get_cell_value((60, 60)) == CellValue.GROUND_SEA
+
+    with pytest.raises(ValueError):
+        snapshot.ground.set_cell_value(0, 0, CellValue.GROUND_SEA)
+
+
+def test_chunked_snapshot_shares_chunks():
+    world = World(256, 256, "chunked")
+    ground = world.ground
+    ground.writeArea(0, 0, np.full((256, 256), CellValue.GROUND_EARTH))
+    snapshot = world.snapshot().ground
+    assert snapshot.storage.getChunk(1, 1) is ground.storage.getChunk(1, 1)
+
+    # Only the written chunk is copied
+    ground.set_cell_value(70, 70, CellValue.GROUND_SEA)
+    assert snapshot.storage.getChunk(1, 1) is not ground.storage.getChunk(1, 1)
+    assert snapshot.storage.getChunk(2, 2) is ground.storage.getChunk(2, 2)
+    assert snapshot.get_cell_value((70, 70)) == CellValue.GROUND_EARTH
@@ -0,0 +1,49 @@
+import numpy as np
+
+from core.constants import CellValue
+from core.logic.selection import computeWand, countMaskValues
+from core.state import World
+from tools.labeling import labelRegions
+
+
+def test_label_regions():
+    mask = np.array([
+        [1, 1, 0, 0, 1],
+        [0, 1, 0, 1, 0],
+        [0, 1, 1, 0, 0],
+        [1, 0, 0, 0, 1],
+    ], dtype=bool)
+    labels, count = labelRegions(mask)
+    assert count == 5
+    assert np.array_equal(labels > 0, mask)
+    assert labels[0, 0] == labels[2, 2] != labels[1, 3]
+    # Diagonals join the regions that touch by a corner
+    labels, count = labelRegions(mask, 8)
+    assert count == 2
+    assert labels[0, 4] == labels[1, 3] == labels[2, 2] == labels[3, 0] != labels[3, 4]
+
+    # A snake is a single region, joined over several passes
+    snake = np.zeros([63, 50], dtype=bool)
+    snake[::2, :] = True
+    snake[1::4, -1] = snake[3::4, 0] = True
+    labels, count = labelRegions(snake)
+    assert count == 1 and np.all(labels[snake] == 1)
+
+def test_wand():
+    world = World(40, 30)
+    # Two islands, with a river across the first one
+    world.ground.writeArea(2, 2, np.full([10, 10], CellValue.GROUND_EARTH))
+    world.ground.writeArea(20, 5, np.full([8, 4], CellValue.GROUND_EARTH))
+    world.impassable.writeArea(6, 2, np.full([1, 10], CellValue.IMPASSABLE_RIVER))
+
+    island = computeWand(world, (3, 3), ["ground"])
+    assert np.count_nonzero(island) == 100 and not island[21, 6]
+    # The same values in all the layers: the part of the island on one side of the river
+    side = computeWand(world, (3, 3), world.layerNames)
+    assert np.count_nonzero(side) == 4 * 10
+    river = computeWand(world, (6, 5), ["impassable"])
+    assert np.count_nonzero(river) == 10
+
+    counts = countMaskValues(world, 0, 0, island)
+    assert counts["impassable"] == {CellValue.NONE: 90, CellValue.IMPASSABLE_RIVER: 10}
+    assert not np.any(computeWand(world, (-1, 0), ["ground"]))
@@ -0,0 +1,68 @@
+import numpy as np
+
+from core.constants import CellValue, UnitClass, UnitProperty
+from core.logic import Logic
+from core.logic.Stamp import Stamp
+from core.logic.commands import PasteStampCommand
+from core.state import World, Unit
+
+
+def makeVillage() -> World:
+    """A land world with a vertical river at x=4, a bridge at (4, 3), trees and a knight."""
+    world = World(16, 12)
+    world.ground.writeArea(0, 0, np.full([16, 12], CellValue.GROUND_EARTH))
+    world.impassable.writeArea(4, 0, np.full([1, 12], CellValue.IMPASSABLE_RIVER))
+    world.objects.set_cell_value(4, 3, CellValue.OBJECTS_ROAD_DIRT)
+    world.objects.set_cell_value(2, 1, CellValue.OBJECTS_TREES)
+    knight = Unit(UnitClass.KNIGHT, 1)
+    knight.setProperty(UnitProperty.HIT_POINTS, 9)
+    world.units.setUnit((1, 2), CellValue.UNITS_UNIT, knight)
+    return world
+
+
+def test_stamp_transforms():
+    world = makeVillage()
+    stamp = Stamp.capture(world, 0, 0, np.ones([6, 4], dtype=bool))
+    rotated = stamp.rotate()
+    assert rotated.size == (4, 6)
+    assert np.array_equal(rotated.getValues("objects"), np.rot90(stamp.getValues("objects")))
+    assert rotated.getValues("units")[1, 1] == CellValue.UNITS_UNIT
+    mirrored = stamp.mirror(0)
+    assert np.array_equal(mirrored.getValues("impassable"), stamp.getValues("impassable")[::-1])
+    assert np.array_equal(stamp.rotate(4).getValues("ground"), stamp.getValues("ground"))
+
+    # Units follow their cells
+    target = World(16, 12)
+    target.ground.writeArea(0, 0, np.full([16, 12], CellValue.GROUND_EARTH))
+    logic = Logic(target)
+    logic.addCommand(PasteStampCommand(rotated.mirror(1), 8, 0))
+    logic.executeCommands()
+    assert target.units.getUnit((8 + 1, 6 - 1 - 1)).getProperty(UnitProperty.HIT_POINTS) == 9
+
+
+def test_paste_stamp():
+    world = makeVillage()
+    stamp = Stamp.capture(world, 0, 0, np.ones([6, 6], dtype=bool))
+    target = World(16, 12)
+    target.ground.writeArea(0, 0, np.full([16, 12], CellValue.GROUND_EARTH))
+    logic = Logic(target)
+
+    # Pasted as one batch, clipped to the world, with the bridge on the pasted river
+    logic.addCommand(PasteStampCommand(stamp, 10, 7))
+    logic.executeCommands()
+    assert target.objects.get_cell_value((12, 8)) == CellValue.OBJECTS_TREES
+    assert target.units.getUnit((11, 9)).getProperty(UnitProperty.HIT_POINTS) == 9
+    assert target.impassable.countValues((0, 16, 0, 12), [CellValue.IMPASSABLE_RIVER]) == 5
+    assert target.objects.get_cell_value((14, 10)) == CellValue.OBJECTS_ROAD_DIRT
+
+    # A bridge alone is not on a straight river, it is rejected with the rules of the layers
+    bridge = Stamp.capture(world, 4, 3, np.ones([1, 1], dtype=bool))
+    logic.addCommand(PasteStampCommand(bridge, 1, 1))
+    logic.executeCommands()
+    assert target.impassable.get_cell_value((1, 1)) == CellValue.NONE
+
+    # Undone at once
+    logic.undo()
+    logic.executeCommands()
+    assert target.impassable.countValues((0, 16, 0, 12), [CellValue.IMPASSABLE_RIVER]) == 0
+    assert target.units.getUnit((11, 9)) is None
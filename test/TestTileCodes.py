@@ -0,0 +1,28 @@
+import numpy as np
+
+from core.constants import CellValue
+from core.state import World
+from tools.tilecodes import code4np, code8np
+
+
+def test_codes_follow_edits():
+    world = World(40, 30, "chunked")
+    seaCodes = world.getTileCodes({"ground": [CellValue.GROUND_SEA]}, 8)
+    riverCodes = world.getTileCodes({
+        "impassable": [CellValue.IMPASSABLE_RIVER],
+        "ground": [CellValue.GROUND_SEA],
+    }, 4)
+    assert world.getTileCodes({"ground": [CellValue.GROUND_SEA]}, 8) is seaCodes
+
+    # Single cell and bulk writes
+    world.ground.writeArea(5, 5, np.full((20, 15), CellValue.GROUND_EARTH))
+    world.ground.set_cell_value(10, 10, CellValue.GROUND_SEA)
+    world.impassable.scatterValues(np.arange(6, 20), np.full(14, 12), CellValue.IMPASSABLE_RIVER)
+    world.impassable.set_cell_value(8, 12, CellValue.NONE)
+
+    box = (0, 40, 0, 30)
+    expected = code8np(world.ground.maskAreaNeighbors8(box, [CellValue.GROUND_SEA]))
+    assert np.array_equal(seaCodes.codes, expected)
+    masks = world.impassable.maskAreaNeighbors4(box, [CellValue.IMPASSABLE_RIVER])
+    masks |= world.ground.maskAreaNeighbors4(box, [CellValue.GROUND_SEA])
+    assert np.array_equal(riverCodes.codes, code4np(masks))
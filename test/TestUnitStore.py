@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from core.constants import CellValue, UnitClass, UnitProperty
+from core.state import World, Unit, UnitStore
+from core.state.UnitStore import stagingStore
+
+
+def test_unit_handle():
+    unit = Unit(UnitClass.BOWMAN, 2)
+    assert unit.playerId == 2
+    assert unit.unitClass == UnitClass.BOWMAN
+    assert unit.getProperty(UnitProperty.MAX_ACTION_POINTS) == 4
+    assert not unit.hasProperty(UnitProperty.BUILDING_ATTACK)
+    with pytest.raises(KeyError):
+        unit.getProperty(UnitProperty.BUILDING_ATTACK)
+    with pytest.raises(ValueError):
+        Unit(UnitClass.NONE)
+
+    # Placed units move to the store of the layer, and keep their data
+    world = World(20, 20)
+    units = world.units
+    unit.setProperty(UnitProperty.HIT_POINTS, 7)
+    units.setUnit((3, 4), CellValue.UNITS_UNIT, unit)
+    assert unit.store is units.unitStore
+    assert unit.coords == (3, 4)
+    assert units.getUnit((3, 4)) is unit
+    assert unit.getProperty(UnitProperty.HIT_POINTS) == 7
+
+    # The same unit placed twice is copied
+    units.setUnit((5, 4), CellValue.UNITS_UNIT, unit)
+    copy = units.getUnit((5, 4))
+    assert copy is not unit and copy.coords == (5, 4) and copy.getProperty(UnitProperty.HIT_POINTS) == 7
+
+    # Removed units are detached, their slot is reused
+    slot = unit.slot
+    units.setUnit((3, 4), CellValue.NONE)
+    assert unit.store is not units.unitStore and unit.coords is None
+    assert unit.getProperty(UnitProperty.HIT_POINTS) == 7
+    units.setUnit((6, 6), CellValue.UNITS_UNIT, Unit(UnitClass.WORKER))
+    assert units.getUnit((6, 6)).slot == slot
+    assert units.unitStore.count == 2
+
+    # Units out of a layer share the staging store, their slot is released with them
+    assert unit.store is stagingStore
+    count = stagingStore.count
+    staged = [Unit(UnitClass.KNIGHT) for _ in range(10)] + [unit.copy()]
+    assert stagingStore.count == count + 11
+    del staged
+    assert stagingStore.count == count
+
+
+def test_batch_operations():
+    store = UnitStore(2)
+    units = [Unit(UnitClass.WORKER, i % 2, store) for i in range(100)]
+    assert store.count == 100 and store.capacity >= 100
+    for i, unit in enumerate(units):
+        store.setCoords(unit.slot, (i, 0))
+
+    # Reset the action points of a player
+    slots = store.select(i_playerId=1)
+    store.resetProperty(slots, UnitProperty.ACTION_POINTS, UnitProperty.MAX_ACTION_POINTS)
+    assert all(unit.getProperty(UnitProperty.ACTION_POINTS) == 4 * unit.playerId for unit in units)
+
+    # Damage the units of an area
+    store.setProperty(store.select(), UnitProperty.HIT_POINTS, 5)
+    store.addToProperty(store.select(i_cellsBox=(10, 20, 0, 1)), UnitProperty.HIT_POINTS, -8, 0)
+    hitPoints = np.array([unit.getProperty(UnitProperty.HIT_POINTS) for unit in units])
+    assert np.array_equal(np.flatnonzero(hitPoints == 0), np.arange(10, 20))
+
+
+def test_unit_index():
+    world = World(100, 100)
+    units = world.units
+    for x in range(0, 100, 10):
+        for y in range(0, 100, 10):
+            units.setUnit((x, y), CellValue.UNITS_UNIT, Unit(UnitClass.WORKER, 1 + (x // 10) % 2))
+    index = units.getUnitIndex()
+    units.setUnit((55, 55), CellValue.UNITS_UNIT, Unit(UnitClass.KNIGHT, 3))
+    units.setUnit((0, 0), CellValue.NONE)
+
+    assert sorted(coords for coords, _ in index.inBox((0, 25, 0, 15))) == [(0, 10), (10, 0), (10, 10), (20, 0), (20, 10)]
+    assert sorted(coords for coords, _ in index.inBox((0, 25, 0, 15), 2)) == [(10, 0), (10, 10)]
+    assert sorted(coords for coords, _ in index.inRadius((50, 50), 10)) == [(40, 50), (50, 40), (50, 50), (50, 60), (55, 55), (60, 50)]
+    assert len(index.unitsOf(3)) == 1
+
+    nearest = index.nearest((52, 52), 3, i_enemyOf=3)
+    assert [coords for coords, _ in nearest] == [(50, 50), (50, 60), (60, 50)]
+    assert index.nearest((90, 90), 1, i_playerId=3)[0][0] == (55, 55)
+    assert index.nearest((1, 1), 1)[0][0] in [(0, 10), (10, 0)]
@@ -0,0 +1,56 @@
+import numpy as np
+
+from core.constants import CellValue, UnitClass
+from core.state import World, Unit
+
+
+def paint(i_world: World):
+    i_world.ground.writeArea(10, 10, np.full((50, 40), CellValue.GROUND_EARTH))
+    i_world.objects.set_cell_value(20, 20, CellValue.OBJECTS_TREES)
+    i_world.units.setUnit((30, 30), CellValue.UNITS_UNIT, Unit(UnitClass.KNIGHT, 1))
+
+
+def test_world_hash():
+    world = World(200, 100, "chunked")
+    assert world.hash == 0
+    paint(world)
+    hashBefore = world.hash
+    assert hashBefore != 0
+
+    # Same content, different history and storage
+    other = World(200, 100, "sparse")
+    other.ground.set_cell_value(150, 90, CellValue.GROUND_EARTH)
+    assert other.hash != 0
+    paint(other)
+    other.ground.set_cell_value(150, 90, CellValue.GROUND_SEA)
+    assert other.hash == world.hash
+
+    # Hashes created on an existing world match incremental ones
+    third = World(200, 100)
+    paint(third)
+    assert third.hash == world.hash
+
+    # Changes are seen by the world hash and by the hash of their chunk only
+    chunkHash = world.hashes.getChunkHash(1, 0)
+    world.objects.set_cell_value(70, 5, CellValue.OBJECTS_TREES)
+    assert world.hash != hashBefore
+    assert world.hashes.getChunkHash(1, 0) != chunkHash
+    assert world.hashes.getRegionHash((0, 64, 0, 100)) == third.hashes.getRegionHash((0, 64, 0, 100))
+    world.objects.set_cell_value(70, 5, CellValue.NONE)
+    assert world.hash == hashBefore
+
+    world.units.setUnit((30, 30), CellValue.NONE)
+    assert world.hash != hashBefore
+
+
+def test_world_hash_duplicate_cells():
+    # A cell written twice in a scatter batch is hashed with its last value only
+    world = World(100, 100)
+    hashBefore = world.hash
+    world.ground.scatterValues(np.array([5, 5, 6]), np.array([5, 5, 6]),
+                               [CellValue.GROUND_EARTH, CellValue.GROUND_SEA, CellValue.GROUND_EARTH])
+    expected = World(100, 100)
+    expected.ground.set_cell_value(6, 6, CellValue.GROUND_EARTH)
+    assert world.hash == expected.hash
+    world.ground.set_cell_value(6, 6, CellValue.GROUND_SEA)
+    assert world.hash == hashBefore
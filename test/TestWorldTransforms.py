@@ -0,0 +1,64 @@
+import numpy as np
+
+from core.constants import CellValue, UnitClass
+from core.state import World, Unit
+
+
+def makeWorld() -> World:
+    world = World(12, 8)
+    ground = np.full([12, 8], CellValue.GROUND_SEA)
+    ground[1:10, 2:7] = CellValue.GROUND_EARTH
+    world.ground.writeArea(0, 0, ground)
+    world.objects.set_cell_value(2, 3, CellValue.OBJECTS_TREES)
+    world.units.setUnit((3, 4), CellValue.UNITS_UNIT, Unit(UnitClass.KNIGHT, 1))
+    return world
+
+
+def test_rotate_mirror():
+    world = makeWorld()
+    world.getTileCodes({"ground": [CellValue.GROUND_SEA]}, 4)
+    rotated = world.rotate()
+    assert rotated.size == (8, 12)
+    assert np.array_equal(np.asarray(rotated.ground.cells), np.rot90(np.asarray(world.ground.cells)))
+    # Units and cells move together
+    units = np.asarray(rotated.units.cells)
+    assert units[8 - 1 - 4, 3] == CellValue.UNITS_UNIT
+    assert rotated.units.getUnit((8 - 1 - 4, 3)).unitClass == UnitClass.KNIGHT
+    assert rotated.rotate(3).hash == world.hash
+
+    mirrored = world.mirror(0)
+    assert mirrored.objects.get_cell_value((12 - 1 - 2, 3)) == CellValue.OBJECTS_TREES
+    assert mirrored.units.getUnit((12 - 1 - 3, 4)) is not None
+    assert mirrored.mirror(0).hash == world.hash
+
+
+def test_crop_pad_resize():
+    world = makeWorld()
+    cropped = world.crop((2, 6, 3, 8))
+    assert cropped.size == (4, 5)
+    assert cropped.objects.get_cell_value((0, 0)) == CellValue.OBJECTS_TREES
+    assert cropped.units.getUnit((1, 1)) is not None
+    padded = world.pad(2, 1, 3, 0)
+    assert padded.size == (17, 9)
+    assert padded.ground.get_cell_value((0, 0)) == CellValue.GROUND_SEA
+    assert padded.units.getUnit((5, 5)) is not None
+    assert padded.pad(-2, -1, -3, 0).hash == world.hash
+
+    doubled = world.resize(24, 16)
+    assert np.array_equal(np.asarray(doubled.ground.cells)[::2, ::2], np.asarray(world.ground.cells))
+    assert len(list(doubled.units.units)) == 1 and doubled.units.getUnit((6, 8)) is not None
+    halved = world.resize(6, 4)
+    assert np.array_equal(np.asarray(halved.ground.cells), np.asarray(world.ground.cells)[::2, ::2])
+    assert len(list(halved.units.units)) == 1
+
+
+def test_transforms_keep_storage(tmp_path):
+    world = makeWorld()
+    assert world.rotate().storageNames == world.storageNames
+    assert world.crop((0, 4, 0, 4)).storageNames == world.storageNames
+    dense = World(12, 8, "dense")
+    assert set(dense.mirror(1).storageNames.values()) == {"dense"}
+    # Memory-mapped layers have no directory in the new world
+    mapped = World(12, 8, {"ground": "memmap", "units": "sparse"}, str(tmp_path))
+    assert mapped.pad(1, 1, 1, 1).storageNames == {"ground": "chunked", "impassable": "dense", "objects": "dense",
+                                                   "units": "sparse"}
@@ -0,0 +1,15 @@
+import numpy as np
+
+from core.constants import UnitProperty
+from core.state import World
+
+
+def layerArrays(i_world: World) -> list:
+    """Get a copy of the cells of each layer, to compare the states of a world."""
+    return [np.asarray(layer.cells).copy() for layer in i_world.layers]
+
+
+def unitsOf(i_world: World) -> dict:
+    """Get the class, player and hit points of the unit of each cell, to compare the units of worlds."""
+    return {coords: (unit.unitClass, unit.playerId, unit.getProperty(UnitProperty.HIT_POINTS))
+            for coords, unit in i_world.units.units}
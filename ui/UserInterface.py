@@ -170,7 +170,16 @@ class UserInterface:
     
     def processInput(self):
         """Process all input events"""
+        # Motion events are coalesced: the mouse moves once per frame, or before a button or wheel event
+        pendingMotion: Optional[pygame.event.Event] = None
         for event in pygame.event.get():
+            if event.type == pygame.MOUSEMOTION:
+                pendingMotion = event
+                continue
+            if pendingMotion is not None and event.type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP,
+                                                            pygame.MOUSEWHEEL):
+                self.__processMouseEvent(pendingMotion)
+                pendingMotion = None
             if event.type == pygame.QUIT:
                 self.__running = False
                 break
@@ -179,9 +188,10 @@ class UserInterface:
                     self.__running = False
                     break
                 self.__processKeyEvent(event)
-            elif event.type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP, 
-                               pygame.MOUSEWHEEL, pygame.MOUSEMOTION):
+            elif event.type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP, pygame.MOUSEWHEEL):
                 self.__processMouseEvent(event)
+        if pendingMotion is not None and self.__running:
+            self.__processMouseEvent(pendingMotion)
         
         # Update mouse focus after processing all events
         self.__updateMouseFocus()
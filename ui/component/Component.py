@@ -206,6 +206,11 @@ class Component(Listenable[IComponentListener]):
         """Notify all listeners that the mouse entered a cell."""
         for listener in self.listeners:
             listener.worldCellEntered(i_cell, i_mouse, i_dragging)
+
+    def notifyWorldMouseReleased(self) -> None:
+        """Notify all listeners that the mouse was released over the world."""
+        for listener in self.listeners:
+            listener.worldMouseReleased()
             
     def notifyMainBrushSelected(self, i_layerName: str, i_value: Union[int, str], i_unitClass: Optional[UnitClass]) -> None:
         """Notify all listeners that the main brush was selected."""
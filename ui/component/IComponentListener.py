@@ -17,6 +17,10 @@ class IComponentListener(ABC):
     def worldCellEntered(self, cell: Tuple[int, int], mouse: Mouse, dragging: bool):
         """Called when the mouse enters a cell in the world"""
         pass
+
+    def worldMouseReleased(self):
+        """Called when a mouse button is released over the world, or the mouse leaves it while dragging"""
+        pass
     
     def mainBrushSelected(self, layerName: str, value: Union[int, str], unitClass: Optional[UnitClass] = None):
         """Called when the main brush is selected"""
@@ -57,19 +57,18 @@ class MinimapFrame(FrameComponent, ILayerListener):
         )
 
         for name, layer in layers:
-            cells = layer.cells[cellsSlice]
             if name == "units":
                 playerColors = self.theme.playerColors
-                validCells = cells == CellValue.UNITS_UNIT
-                cellCoords = np.transpose(np.nonzero(validCells))
-                for cell in cellCoords:
-                    cellX = int(cellMinX + cell[0])
-                    cellY = int(cellMinY + cell[1])
+                xs, ys, values = layer.getNonDefaultCells((cellMinX, cellMaxX, cellMinY, cellMaxY))
+                for cellX, cellY, value in zip(xs.tolist(), ys.tolist(), values.tolist()):
+                    if value != CellValue.UNITS_UNIT:
+                        continue
                     unit = layer.getUnit((cellX, cellY))
                     if unit is not None:
                         color = playerColors[unit.playerId]
-                        minimapArray[cell[0], cell[1], :] = color
+                        minimapArray[cellX - cellMinX, cellY - cellMinY, :] = color
             else:
+                cells = layer.cells[cellsSlice]
                 colorMap = self.__colors[name]
                 colors = colorMap[cells]
                 transparent = minimapArray[..., 3] == 0
@@ -169,3 +168,6 @@ class MinimapFrame(FrameComponent, ILayerListener):
         cellMinX, cellMaxX = max(cellX, 0), min(cellX + 1, i_layer.width)
         cellMinY, cellMaxY = max(cellY, 0), min(cellY + 1, i_layer.height)
         self.__renderMinimap((cellMinX, cellMaxX, cellMinY, cellMaxY))
+
+    def cellsChanged(self, i_layer: Layer, i_cellsBox: Tuple[int, int, int, int], i_mask: np.ndarray):
+        self.__renderMinimap(i_cellsBox)
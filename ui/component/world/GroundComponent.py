@@ -3,7 +3,6 @@ import numpy as np
 
 from core.constants import CellValue
 from core.state import World
-from tools.tilecodes import code8np
 from .LayerComponent import LayerComponent
 from ...theme.Theme import Theme
 
@@ -13,6 +12,7 @@ class GroundComponent(LayerComponent):
         # Initialize the GroundComponent with theme and world
         super().__init__(i_theme, i_world, "ground")
         self.__code2rect = self.tileset.getCode8Rects(0, 0)
+        self.__seaCodes = i_world.getTileCodes({"ground": [CellValue.GROUND_SEA]}, 8)
 
     def render(self, surface: Surface):
         super().render(surface)
@@ -21,7 +21,6 @@ class GroundComponent(LayerComponent):
 
         renderer = self.createRenderer(surface)
         cellsSlice = renderer.cellsSlice
-        cellsBox = renderer.cellsBox
 
         # Ground / Sea
         noise = self.noise[cellsSlice]
@@ -31,9 +30,7 @@ class GroundComponent(LayerComponent):
             surface.blit(tileset, dest, rects[rectIndex])
 
         # Sea borders
-        neighbors = self.layer.getAreaNeighbors8(cellsBox)
-        masks = neighbors == CellValue.GROUND_SEA
-        codes = code8np(masks)
+        codes = self.__seaCodes.codes[cellsSlice]
 
         cells = self.layer.cells[cellsSlice]
         valid = cells == CellValue.GROUND_SEA
@@ -2,8 +2,8 @@ import numpy as np
 from pygame import Surface
 
 from core.constants import CellValue, Direction
+from core.constants.Direction import directions
 from core.state import World
-from tools.tilecodes import code4np
 from .LayerComponent import LayerComponent
 from ...theme.Theme import Theme
 
@@ -16,6 +16,12 @@ class ImpassableComponent(LayerComponent):
         super().__init__(i_theme, i_world, "impassable")
 # Get the ground layer to check for sea connections
         self.__ground = i_world.getLayer("ground")
+        # Codes of rivers, and of the cells rivers connect to (rivers, mountains and sea)
+        self.__riverCodes = i_world.getTileCodes({"impassable": [CellValue.IMPASSABLE_RIVER]}, 4)
+        self.__riverBorderCodes = i_world.getTileCodes({
+            "impassable": [CellValue.IMPASSABLE_RIVER, CellValue.IMPASSABLE_MOUNTAIN],
+            "ground": [CellValue.GROUND_SEA],
+        }, 4)
         # Get lookup table for 4-connected river tiles
         self.__river_code2rect = self.tileset.getCode4Rects(0, 1)
         # Get river mouth tiles (where rivers connect to sea)
@@ -33,7 +39,6 @@ class ImpassableComponent(LayerComponent):
 
         renderer = self.createRenderer(surface)
         cellsSlice = renderer.cellsSlice
-        cellsBox = renderer.cellsBox
         cells = self.layer.cells[cellsSlice]
 
         # Default
@@ -46,12 +51,7 @@ class ImpassableComponent(LayerComponent):
             surface.blit(tileset, dest, rects[rectIndex])
 
         # Rivers
-        neighbors = self.layer.getAreaNeighbors4(cellsBox)
-        masks = neighbors == CellValue.IMPASSABLE_RIVER
-        masks |= neighbors == CellValue.IMPASSABLE_MOUNTAIN
-        groundNeighbors = self.__ground.getAreaNeighbors4(cellsBox)
-        masks |= groundNeighbors == CellValue.GROUND_SEA
-        codes = code4np(masks)
+        codes = self.__riverBorderCodes.codes[cellsSlice]
 
         valid = cells == CellValue.IMPASSABLE_RIVER
         for dest, value, cell in renderer.coords(valid):
@@ -62,7 +62,7 @@ class ImpassableComponent(LayerComponent):
         groundCells = self.__ground.cells[cellsSlice]
         valid = cells == CellValue.NONE
         valid &= groundCells == CellValue.GROUND_SEA
-        codes = code4np(neighbors == CellValue.IMPASSABLE_RIVER)
+        codes = self.__riverCodes.codes[cellsSlice]
         valid &= codes != 0
         cellMinX, _, cellMinY, _ = renderer.cellsBox
         for dest, _, cell in renderer.coords(valid):
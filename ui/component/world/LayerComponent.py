@@ -3,6 +3,7 @@ LayerComponent.py renders a specific game world layer using its corresponding ti
 """
 
 import random
+import numpy as np
 from pygame import SRCALPHA
 from pygame.surface import Surface
 from typing import Tuple, List, Optional, Generator
@@ -139,6 +140,11 @@ class LayerComponent(Component, ILayerListener, IComponentListener):
         if layer == self.__layer:
             self.__needRefresh = True  # Mark for refresh when a cell changes
 
+    def cellsChanged(self, layer: Layer, cellsBox: Tuple[int, int, int, int], mask: np.ndarray):
+        """Called once for a batch of changed cells."""
+        if layer == self.__layer:
+            self.__needRefresh = True
+
     def viewChanged(self, view: Tuple[int, int]):
         if view != self.__view:
             self.__needRefresh = True
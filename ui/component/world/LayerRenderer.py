@@ -57,4 +57,22 @@ class LayerRenderer:
                 value = CellValue(cells[cellRelX, cellRelY])
                 destX = cellRelX * tileWidth - viewX % tileWidth  # Screen x-coordinate
                 destY = cellRelY * tileHeight - viewY % tileHeight  # Screen y-coordinate
-                yield (destX, destY), value, (cellRelX, cellRelY)
\ No newline at end of file
+                yield (destX, destY), value, (cellRelX, cellRelY)
+
+    def coordsAt(self, cellXs: np.ndarray, cellYs: np.ndarray, values: np.ndarray):
+        """Generate rendering coordinates for a list of cells, like coords().
+
+        Args:
+            cellXs, cellYs: World coordinates of the cells, inside the visible area
+            values: Values of the cells
+        """
+        tileWidth, tileHeight = self.tileSize
+        viewX, viewY = self.view
+        cellMinX, _, cellMinY, _ = self.cellsBox
+
+        for cellX, cellY, value in zip(cellXs.tolist(), cellYs.tolist(), values.tolist()):
+            cellRelX = cellX - cellMinX
+            cellRelY = cellY - cellMinY
+            destX = cellRelX * tileWidth - viewX % tileWidth  # Screen x-coordinate
+            destY = cellRelY * tileHeight - viewY % tileHeight  # Screen y-coordinate
+            yield (destX, destY), CellValue(value), (cellRelX, cellRelY)
@@ -3,7 +3,6 @@ from pygame import Surface
 
 from core.constants import CellValue, Direction
 from core.state import World
-from tools.tilecodes import mask4, combine4, code4, code4np
 from .LayerComponent import LayerComponent
 from ...theme.Theme import Theme
 
@@ -28,6 +27,11 @@ class ObjectsComponent(LayerComponent):
             CellValue.OBJECTS_ROAD_DIRT: self.__bridgeDirtRects[1],
             CellValue.OBJECTS_ROAD_STONE: self.__bridgeStoneRects[1],
         }
+        # Codes of roads, and of rivers for bridges
+        self.__roadCodes = i_world.getTileCodes({
+            "objects": [CellValue.OBJECTS_ROAD_DIRT, CellValue.OBJECTS_ROAD_STONE],
+        }, 4)
+        self.__riverCodes = i_world.getTileCodes({"impassable": [CellValue.IMPASSABLE_RIVER]}, 4)
         # Get lookup tables for road tiles
         self.__roadDirt_code2rect = self.tileset.getCode4Rects(0, 3)
         self.__roadStone_code2rect = self.tileset.getCode4Rects(4, 3)
@@ -38,58 +42,43 @@ class ObjectsComponent(LayerComponent):
         tilesRects = self.tileset.getTilesRects()
 
         renderer = self.createRenderer(surface)
-        cellsSlice = renderer.cellsSlice
         cellsBox = renderer.cellsBox
-        cells = self.layer.cells[cellsSlice]
-        impassableCells = self.__impassableLayer.cells[cellsSlice]
+        cellMinX, _, cellMinY, _ = cellsBox
+
+        # Only visit the cells with an object
+        xs, ys, values = self.layer.getNonDefaultCells(cellsBox)
+        impassableValues = self.__impassableLayer.cells[renderer.cellsSlice][xs - cellMinX, ys - cellMinY]
+        roads = (values == CellValue.OBJECTS_ROAD_DIRT) | (values == CellValue.OBJECTS_ROAD_STONE)
+        rivers = impassableValues == CellValue.IMPASSABLE_RIVER
 
         # Default
-        valid = cells != CellValue.NONE
-        valid &= cells != CellValue.OBJECTS_ROAD_DIRT
-        valid &= cells != CellValue.OBJECTS_ROAD_STONE
-        noise = self.noise[cellsSlice]
-        for dest, value, cell in renderer.coords(valid):
+        valid = ~roads
+        noise = self.noise[renderer.cellsSlice]
+        for dest, value, cell in renderer.coordsAt(xs[valid], ys[valid], values[valid]):
             rects = tilesRects[value]
             rectIndex = int(noise[cell]) % len(rects)
             surface.blit(tileset, dest, rects[rectIndex])
 
         # Road border codes
-        neighbors = self.layer.getAreaNeighbors4(cellsBox)
-        masks = neighbors == CellValue.OBJECTS_ROAD_DIRT
-        masks |= neighbors == CellValue.OBJECTS_ROAD_STONE
-        codes = code4np(masks)
-
-        # Dirt roads (without bridges)
-        valid = cells == CellValue.OBJECTS_ROAD_DIRT
-        valid &= impassableCells != CellValue.IMPASSABLE_RIVER
-        for dest, value, cell in renderer.coords(valid):
-            rect = self.__roadDirt_code2rect[codes[cell]]
-            surface.blit(tileset, dest, rect)
+        codes = self.__roadCodes.codes[renderer.cellsSlice]
 
-        # Stone roads (without bridges)
-        valid = cells == CellValue.OBJECTS_ROAD_STONE
-        valid &= impassableCells != CellValue.IMPASSABLE_RIVER
-        for dest, value, cell in renderer.coords(valid):
-            rect = self.__roadStone_code2rect[codes[cell]]
+        # Roads (without bridges)
+        valid = roads & ~rivers
+        for dest, value, cell in renderer.coordsAt(xs[valid], ys[valid], values[valid]):
+            if value == CellValue.OBJECTS_ROAD_DIRT:
+                rect = self.__roadDirt_code2rect[codes[cell]]
+            else:
+                rect = self.__roadStone_code2rect[codes[cell]]
             surface.blit(tileset, dest, rect)
 
         # River codes
-        neighbors = self.__impassableLayer.getAreaNeighbors4(cellsBox)
-        codes = code4np(neighbors == CellValue.IMPASSABLE_RIVER)
-
-        # Cells with a road and a river
-        valid = cells == CellValue.OBJECTS_ROAD_DIRT
-        valid |= cells == CellValue.OBJECTS_ROAD_STONE
-        valid &= impassableCells == CellValue.IMPASSABLE_RIVER
-
-        # Horizontal bridges
-        horizontal = valid & (codes == 6)
-        for dest, value, cell in renderer.coords(horizontal):
-            rect = self.__horizontalBrigdes[value]
-            surface.blit(tileset, dest, rect)
+        codes = self.__riverCodes.codes[renderer.cellsSlice]
 
-        # Vertical bridges
-        horizontal = valid & (codes == 9)
-        for dest, value, cell in renderer.coords(horizontal):
-            rect = self.__verticalBrigdes[value]
-            surface.blit(tileset, dest, rect)
\ No newline at end of file
+        # Cells with a road and a river: horizontal or vertical bridges
+        valid = roads & rivers
+        for dest, value, cell in renderer.coordsAt(xs[valid], ys[valid], values[valid]):
+            code = codes[cell]
+            if code == 6:
+                surface.blit(tileset, dest, self.__horizontalBrigdes[value])
+            elif code == 9:
+                surface.blit(tileset, dest, self.__verticalBrigdes[value])
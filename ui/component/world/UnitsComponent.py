@@ -20,12 +20,12 @@ class UnitsComponent(LayerComponent):
         tilesRects = self.tileset.getTilesRects()
 
         renderer = self.createRenderer(surface)
-        cellsSlice = renderer.cellsSlice
         cellMinX, _, cellMinY, _ = renderer.cellsBox
-        cells = self.layer.cells[cellsSlice]
 
-        valid = cells == CellValue.UNITS_UNIT
-        for dest, value, cell in renderer.coords(valid):
+        # Only visit the cells with a unit
+        xs, ys, values = self.layer.getNonDefaultCells(renderer.cellsBox)
+        valid = values == CellValue.UNITS_UNIT
+        for dest, value, cell in renderer.coordsAt(xs[valid], ys[valid], values[valid]):
             cellX, cellY = cellMinX + cell[0], cellMinY + cell[1]
             unit = self.layer.getUnit((cellX, cellY))
             if unit is not None:
@@ -1,5 +1,10 @@
 from typing import Tuple, Optional, List
 
+import numpy as np
+import pygame
+from pygame import Rect
+from pygame.surface import Surface
+
 from core.state import World, Layer, ILayerListener
 from tools.vector import vectorDivI, vectorAddI
 from ui.Mouse import Mouse
@@ -18,6 +23,8 @@ class WorldComponent(CompositeComponent, IUIEventHandler, ILayerListener):
         self.__view = (0, 0)
         self.__previousCell: Optional[Tuple[int, int]] = None
         self.__mouseButtonDown = False
+        # Box of cells (minX, maxX, minY, maxY) outlined over the world, like a selection
+        self.__selection: Optional[Tuple[int, int, int, int]] = None
         
         # Create layer components using the factory
         self.__layers: List[Layer] = []
@@ -44,6 +51,23 @@ class WorldComponent(CompositeComponent, IUIEventHandler, ILayerListener):
     def view(self) -> Tuple[int, int]:
         return self.__view
     
+    @property
+    def selection(self) -> Optional[Tuple[int, int, int, int]]:
+        return self.__selection
+
+    @selection.setter
+    def selection(self, i_selection: Optional[Tuple[int, int, int, int]]):
+        self.__selection = i_selection
+
+    def render(self, i_surface: Surface):
+        super().render(i_surface)
+        if self.__selection is not None:
+            minX, maxX, minY, maxY = self.__selection
+            tileWidth, tileHeight = self.__tileSize
+            left, top = vectorAddI(self.topLeft, (minX * tileWidth - self.__view[0], minY * tileHeight - self.__view[1]))
+            rect = Rect(left, top, (maxX - minX) * tileWidth, (maxY - minY) * tileHeight)
+            pygame.draw.rect(i_surface, (255, 255, 255), rect, width=1)
+
     def __computeCellCoordinates(self, i_pixel: Tuple[int, int]) -> Optional[Tuple[int, int]]:
         """Convert pixel coordinates to cell coordinates"""
         pixel = vectorAddI(i_pixel, self.__view)
@@ -57,6 +81,10 @@ class WorldComponent(CompositeComponent, IUIEventHandler, ILayerListener):
         for layerComponent in self.__layerComponents:
             layerComponent.cellChanged(i_layer, i_cell)
 
+    def cellsChanged(self, i_layer: Layer, i_cellsBox: Tuple[int, int, int, int], i_mask: np.ndarray):
+        for layerComponent in self.__layerComponents:
+            layerComponent.cellsChanged(i_layer, i_cellsBox, i_mask)
+
     # Component listener
     def viewChanged(self, view: Tuple[int, int]):
         super().viewChanged(view)
@@ -88,6 +116,7 @@ class WorldComponent(CompositeComponent, IUIEventHandler, ILayerListener):
     def mouseButtonUp(self, i_mouse: Mouse) -> bool:
         """Handle mouse button release"""
         self.__mouseButtonDown = False
+        self.notifyWorldMouseReleased()
         return True
     
     def mouseEnter(self, i_mouse: Mouse) -> bool:
@@ -97,6 +126,8 @@ class WorldComponent(CompositeComponent, IUIEventHandler, ILayerListener):
     
     def mouseLeave(self) -> bool:
         """Handle mouse leaving the component area"""
+        if self.__mouseButtonDown:
+            self.notifyWorldMouseReleased()
         self.__mouseButtonDown = False
         return True
     
@@ -1,11 +1,19 @@
 import random
+import numpy as np
 import pygame
+from pygame.surface import Surface
 from typing import Tuple, Union, Optional
 
 
 from core.constants import CellValue, CellValueRanges, UnitClass
 from core.state import World, Unit, GameState
 from core.logic import Logic
+from core.logic.Journal import Journal
+from core.logic.Brush import Brush, BRUSH_SHAPES, BRUSH_MAX_SIZE
+from core.logic.Stamp import Stamp
+from core.logic.commands import PasteStampCommand, SetLayerMaskCommand
+from core.logic.fill import cropMask
+from core.logic.selection import computeWand, countMaskValues
 from tools.vector import vectorMulI, vectorSubI, vectorClampI
 from ..Mouse import Mouse
 from ..theme.Theme import Theme
@@ -16,15 +24,25 @@ from ..component.frame.MinimapFrame import MinimapFrame
 from ..component.world.WorldComponent import WorldComponent
 from ..component.frame.PaletteFrame import PaletteFrame
 
+# Time given to the commands each frame, in seconds, the rest of the work goes to the next frames
+COMMANDS_TIME_BUDGET = 0.004
+
+# Tools of a stroke
+BRUSH_TOOL = "brush"
+SELECT_TOOL = "select"
+WAND_TOOL = "wand"
+PASTE_TOOL = "paste"
+
 
 class EditGameMode(GameMode, IComponentListener):
     """Game mode for editing the world"""
 
-    def __init__(self, i_theme: Theme, i_state: GameState):
+    def __init__(self, i_theme: Theme, i_state: GameState, i_journal: Optional[Journal] = None,
+                 i_historyDirectory: Optional[str] = None):
         super().__init__(i_theme)
         self.__state = i_state
         self.__world = i_state.world
-        self.__logic = Logic(self.__world)
+        self.__logic = Logic(self.__world, i_journal=i_journal, i_historyDirectory=i_historyDirectory)
         self.__font = i_theme.getFont("default")
 
         # Create world component
@@ -54,6 +72,18 @@ class EditGameMode(GameMode, IComponentListener):
         self.__secondaryBrushValue :Union[int, str] = CellValue.GROUND_SEA
         self.__mainBrushUnitClass: Optional[UnitClass] = None
         self.__secondaryBrushUnitClass: Optional[UnitClass] = None
+        self.__brush = Brush()
+
+        # Stroke in progress: tool and mouse buttons of the stroke, and its first and last cells
+        self.__strokeTool: Optional[str] = None
+        self.__strokeMouse: Optional[Mouse] = None
+        self.__strokeStart = (0, 0)
+        self.__strokeEnd = (0, 0)
+
+        # Shift+drag selects a box of cells, copied to a stamp that the next clicks paste.
+        # Ctrl+click selects the region of the clicked cell (magic wand), as a mask at (minX, minY).
+        self.__stamp: Optional[Stamp] = None
+        self.__selection: Optional[Tuple[int, int, np.ndarray]] = None
 
         # Register as listener
         self.__worldComponent.registerListener(self)
@@ -62,13 +92,29 @@ class EditGameMode(GameMode, IComponentListener):
 
     def update(self):
         """Update game state"""
-        self.__logic.executeCommands()
+        self.__logic.executeCommands(COMMANDS_TIME_BUDGET)
+
+    def render(self, i_surface: Surface):
+        super().render(i_surface)
+
+        # Show the brush, and the progress of the commands that take several frames
+        texts = [f"Brush: {self.__brush.shape} {self.__brush.size}"]
+        progress = self.__logic.progress
+        if progress is not None:
+            texts.append(f"Working... {int(progress * 100)}% ({self.__logic.pendingCount} commands left)")
+        y = 0
+        for text in texts:
+            textSurface = self.__font.render(text, False, (255, 255, 255), (0, 0, 0))
+            i_surface.blit(textSurface, (i_surface.get_width() - textSurface.get_width(), y))
+            y += textSurface.get_height()
 
     def dispose(self):
         """Clean up resources"""
         self.__worldComponent.removeListener(self)
         self.__paletteFrame.removeListener(self)
         super().dispose()
+        self.__logic.dispose()
+        self.__world.flush()
         
     def keyDown(self, i_key: int) -> bool:
         """Handle key press event."""
@@ -82,42 +128,167 @@ class EditGameMode(GameMode, IComponentListener):
             print("Auto-tiling disabled")
             self.__worldComponent.setAutoTiling(False)
             return True
+        elif i_key == pygame.K_b:
+            # Next brush shape
+            shapeIndex = (BRUSH_SHAPES.index(self.__brush.shape) + 1) % len(BRUSH_SHAPES)
+            self.__brush = Brush(BRUSH_SHAPES[shapeIndex], self.__brush.size)
+            return True
+        elif i_key in [pygame.K_EQUALS, pygame.K_PLUS, pygame.K_KP_PLUS]:
+            # Larger brush, odd sizes keep the brush centered
+            self.__brush = Brush(self.__brush.shape, min(2 * self.__brush.size + 1, BRUSH_MAX_SIZE))
+            return True
+        elif i_key in [pygame.K_MINUS, pygame.K_KP_MINUS]:
+            self.__brush = Brush(self.__brush.shape, max((self.__brush.size - 1) // 2, 1))
+            return True
+        elif i_key == pygame.K_r and self.__stamp is not None:
+            # Rotate the stamp
+            self.__stamp = self.__stamp.rotate()
+            self.__showStamp(self.__strokeEnd)
+            return True
+        elif i_key == pygame.K_m and self.__stamp is not None:
+            # Mirror the stamp
+            self.__stamp = self.__stamp.mirror(0)
+            return True
+        elif i_key == pygame.K_x and (self.__stamp is not None or self.__selection is not None):
+            # Back to the brush
+            self.__stamp = None
+            self.__selection = None
+            self.__worldComponent.selection = None
+            return True
+        elif i_key in [pygame.K_c, pygame.K_f, pygame.K_DELETE, pygame.K_i] and self.__selection is not None:
+            self.__editSelection(i_key)
+            return True
+        elif pygame.key.get_mods() & pygame.KMOD_CTRL:
+            # Ctrl+Z to undo, Ctrl+Y or Ctrl+Shift+Z to redo
+            if i_key == pygame.K_y or (i_key == pygame.K_z and pygame.key.get_mods() & pygame.KMOD_SHIFT):
+                self.__logic.redo()
+                return True
+            elif i_key == pygame.K_z:
+                self.__logic.undo()
+                return True
         return False
 
     # Component Listener methods
-    def __updateCell(self, i_cell: Tuple[int, int], i_mouse: Mouse):
-        """Update cell based on mouse input"""
-        if i_mouse.button1 or i_mouse.button2:
+    def __getBrush(self, i_main: bool) -> Tuple[str, Union[int, str], Optional[Unit]]:
+        """Get the layer, value and unit of the main or of the secondary brush"""
+        if i_main:
             # Add cell value
             brushLayer = self.__mainBrushLayer
             brushValue = self.__mainBrushValue
             brushUnitClass = self.__mainBrushUnitClass
-            fill = i_mouse.button2
-        elif i_mouse.button3:
+        else:
             # Remove cell value
             brushLayer = self.__secondaryBrushLayer
             brushValue = self.__secondaryBrushValue
             brushUnitClass = self.__secondaryBrushUnitClass
-            fill = False
-        else:
-            return
-
-        # Create and add command
-        Command = self.__logic.getSetLayerValueCommand(brushLayer)
         brushUnit = None
         if brushUnitClass is not None:
             brushUnit = Unit(brushUnitClass, self.__state.currentPlayerId)
-        command = Command(i_cell, brushValue, brushUnit, fill)
+        return brushLayer, brushValue, brushUnit
+
+    def __selectBrush(self, i_mouse: Mouse) -> Optional[Tuple[str, Union[int, str], Optional[Unit]]]:
+        """Get the layer, value and unit of the brush of the pressed mouse button"""
+        if i_mouse.button1 or i_mouse.button2:
+            return self.__getBrush(True)
+        elif i_mouse.button3:
+            return self.__getBrush(False)
+        return None
+
+    def __paint(self, i_start: Tuple[int, int], i_end: Tuple[int, int], i_mouse: Mouse):
+        """Set the brush value in the cells of the brush from start to end, or fill from start"""
+        brush = self.__selectBrush(i_mouse)
+        if brush is None:
+            return
+        brushLayer, brushValue, brushUnit = brush
+        if i_mouse.button2:
+            Command = self.__logic.getSetLayerValueCommand(brushLayer)
+            command = Command(i_start, brushValue, brushUnit, True)
+        else:
+            command = self.__brush.command(brushLayer, i_start, i_end, self.__world.size, brushValue, brushUnit)
         self.__logic.addCommand(command)
 
+    def __selectionBox(self) -> Tuple[int, int, int, int]:
+        """Get the box of cells between the first and the last cell of the stroke"""
+        (startX, startY), (endX, endY) = self.__strokeStart, self.__strokeEnd
+        return min(startX, endX), max(startX, endX) + 1, min(startY, endY), max(startY, endY) + 1
+
+    def __showStamp(self, i_cell: Tuple[int, int]):
+        """Outline the cells where the stamp would be pasted"""
+        width, height = self.__stamp.size
+        self.__worldComponent.selection = (i_cell[0], i_cell[0] + width, i_cell[1], i_cell[1] + height)
+
+    def __select(self, i_minX: int, i_minY: int, i_mask: np.ndarray):
+        """Select the cells of a mask at (minX, minY), and outline them"""
+        self.__selection = (i_minX, i_minY, i_mask)
+        width, height = i_mask.shape
+        self.__worldComponent.selection = (i_minX, i_minX + width, i_minY, i_minY + height)
+
+    def __selectRegion(self, i_cell: Tuple[int, int], i_allLayers: bool):
+        """Select the cells connected to a cell with the same value in the main brush layer, or in all the layers"""
+        layerNames = self.__world.layerNames if i_allLayers else [self.__mainBrushLayer]
+        self.__select(*cropMask(computeWand(self.__world, i_cell, layerNames)))
+
+    def __editSelection(self, i_key: int):
+        """Copy, fill, delete or count the selected cells"""
+        minX, minY, mask = self.__selection
+        if i_key == pygame.K_c:
+            self.__stamp = Stamp.capture(self.__world, minX, minY, mask)
+        elif i_key in [pygame.K_f, pygame.K_DELETE]:
+            # Fill with the main brush, or delete with the secondary brush
+            brushLayer, brushValue, brushUnit = self.__getBrush(i_key == pygame.K_f)
+            self.__logic.addCommand(SetLayerMaskCommand(brushLayer, minX, minY, mask, brushValue, brushUnit))
+        elif i_key == pygame.K_i:
+            for name, counts in countMaskValues(self.__world, minX, minY, mask).items():
+                print(f"Selection {name}: " + ", ".join(f"{CellValue(value).name} x{count}" for value, count in counts.items()))
+
     def worldCellClicked(self, i_cell: Tuple[int, int], i_mouse: Mouse):
         """Handle world cell click"""
-        self.__updateCell(i_cell, i_mouse)
+        # The edits of a stroke are undone together
+        self.__logic.beginTransaction()
+        self.__strokeMouse = i_mouse
+        self.__strokeStart = self.__strokeEnd = i_cell
+        if i_mouse.button1 and pygame.key.get_mods() & pygame.KMOD_CTRL:
+            self.__strokeTool = WAND_TOOL
+            self.__selectRegion(i_cell, bool(pygame.key.get_mods() & pygame.KMOD_SHIFT))
+        elif i_mouse.button1 and pygame.key.get_mods() & pygame.KMOD_SHIFT:
+            self.__strokeTool = SELECT_TOOL
+            self.__worldComponent.selection = self.__selectionBox()
+        elif i_mouse.button1 and self.__stamp is not None:
+            self.__strokeTool = PASTE_TOOL
+            self.__logic.addCommand(PasteStampCommand(self.__stamp, i_cell[0], i_cell[1]))
+        else:
+            self.__strokeTool = BRUSH_TOOL
+            if self.__brush.stamped or i_mouse.button2:
+                self.__paint(i_cell, i_cell, i_mouse)
 
     def worldCellEntered(self, i_cell: Tuple[int, int], i_mouse: Mouse, i_dragging: bool):
         """Handle mouse entering a world cell"""
-        if i_dragging:
-            self.__updateCell(i_cell, i_mouse)
+        if self.__stamp is not None and self.__strokeTool != SELECT_TOOL:
+            self.__showStamp(i_cell)
+        if not i_dragging:
+            return
+        previousCell, self.__strokeEnd = self.__strokeEnd, i_cell
+        if self.__strokeTool == SELECT_TOOL:
+            self.__worldComponent.selection = self.__selectionBox()
+        elif self.__strokeTool == BRUSH_TOOL:
+            if i_mouse.button2:
+                self.__paint(i_cell, i_cell, i_mouse)
+            elif self.__brush.stamped:
+                # The brush is stamped along the path from the previous cell, so fast drags leave no gaps
+                self.__paint(previousCell, i_cell, i_mouse)
+
+    def worldMouseReleased(self):
+        """Handle the end of a stroke"""
+        if self.__strokeTool == SELECT_TOOL:
+            # Select and copy the box of cells of the stroke, in all the layers
+            minX, maxX, minY, maxY = self.__selectionBox()
+            self.__select(minX, minY, np.ones([maxX - minX, maxY - minY], dtype=bool))
+            self.__stamp = Stamp.capture(self.__world, minX, minY, self.__selection[2])
+        elif self.__strokeTool == BRUSH_TOOL and not self.__brush.stamped and not self.__strokeMouse.button2:
+            # Lines and rectangles go from the first to the last cell of the stroke
+            self.__paint(self.__strokeStart, self.__strokeEnd, self.__strokeMouse)
+        self.__strokeTool = None
+        self.__logic.endTransaction()
             
     def mainBrushSelected(self, i_layerName: str, i_value: Union[int, str], i_unitClass: Optional[UnitClass] = None):
         """Called when the main brush is selected from palette"""